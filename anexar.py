@@ -9,7 +9,7 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "condominio_portaria.settings")
 django.setup()
 
 # ✅ Só depois disso podemos importar coisas do seu projeto
-from integrations.allvisitorlogs import sf_connect
+from integrations.session import sf_connect
 from simple_salesforce import Salesforce
 
 sf = sf_connect()
@@ -0,0 +1,10 @@
+# condominio/api.py
+# API REST (DRF) separada de portaria.views: só quem registra as rotas importa rest_framework
+from rest_framework import viewsets, permissions
+from condominio.models import Bloco
+from condominio.serializers import BlocoSerializer
+
+class BlocoViewSet(viewsets.ModelViewSet):
+    queryset = Bloco.objects.all()
+    serializer_class = BlocoSerializer
+    permission_classes = [permissions.AllowAny]  # ajuste conforme sua necessidade
@@ -35,6 +35,11 @@ DATABASES = {
     "default": env.db("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
 }
 
+# Cache compartilhado entre web, Celery e scripts (sessão Salesforce etc.)
+CACHES = {
+    "default": env.cache("CACHE_URL", default="redis://localhost:6379/1"),
+}
+
 # Internacionalização
 LANGUAGE_CODE = "pt-br"
 TIME_ZONE = "America/Sao_Paulo"
@@ -69,6 +74,10 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Identifica a view/condomínio nas chamadas ao Salesforce (contagem e orçamento)
+    "integrations.governanca.OrigemSalesforceMiddleware",
+    # request.escopo: admin/condomínios permitidos, calculado uma vez e guardado na sessão
+    "portaria.escopo.EscopoAcessoMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -129,7 +138,27 @@ from celery.schedules import crontab
 
 CELERY_BEAT_SCHEDULE = {
     'atualiza-acesso-salesforce': {
-        'task': 'app.tasks.atualiza_acesso_salesforce_task',
+        'task': 'portaria.tasks.atualiza_acesso_salesforce_task',
         'schedule': 300.0,  # a cada 5 minutos (300 segundos)
     },
+    'processar-fila-integracao': {
+        'task': 'portaria.tasks.processar_fila_integracao',
+        'schedule': 60.0,  # retentativas da fila de integração (backoff controlado por Tentativas)
+    },
+    'sincronizar-visitor-logs': {
+        'task': 'portaria.tasks.sincronizar_visitor_logs_task',
+        'schedule': 120.0,  # réplica da tela de visitantes pré-aprovados
+    },
+    'atualizar-senhas-encomendas': {
+        'task': 'portaria.tasks.atualizar_senhas_encomendas',
+        'schedule': 300.0,
+    },
+    'processar-boletos-pendentes': {
+        'task': 'portaria.tasks.processar_boletos_pendentes_task',
+        'schedule': 60.0,  # retentativas dos boletos do webhook REDA
+    },
+    'reconciliar-contadores': {
+        'task': 'portaria.tasks.reconciliar_contadores_task',
+        'schedule': 3600.0,  # corrige divergências dos contadores do dashboard (hoje e ontem)
+    },
 }
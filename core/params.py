@@ -1,35 +1,68 @@
 # core/params.py
-#from django.core.cache import cache
-#from portaria.models import Parametro
-
-#def get_param(name: str, default=None, ttl=60):
-#    key = f"param:{name}"
-#    val = cache.get(key)
-#    if val is None:
-#        val = (Parametro.objects
-#               .filter(ParametroNome=name)
-#               .values_list("ParametroValor", flat=True)
-#               .first())
-#        cache.set(key, val, ttl)
-#    return val if val is not None else default
+"""
+Parâmetros do sistema (tabela Parametro) em memória.
+
+Todos os parâmetros são carregados com uma única query na primeira leitura e
+ficam no processo. Salvar/excluir um Parametro (admin ou código) incrementa
+uma versão no cache compartilhado (portaria/signals.py, core/versao_cache.py);
+cada processo compara a versão no máximo a cada VERIFICAR_A_CADA segundos e
+recarrega, então credenciais novas valem sem reiniciar. Nada é lido do banco na importação.
+
+Grupo dá acesso preguiçoso a um conjunto de parâmetros com prefixo comum:
+
+    SF = Grupo("SF_", padroes=settings.SF)
+    SF.USERNAME   # Parametro "SF_USERNAME" ou settings.SF["USERNAME"]
+"""
+from typing import Dict, Mapping, Optional
 
 from django.db.utils import OperationalError, ProgrammingError
 
+from core.versao_cache import Recarregavel
+
+VERIFICAR_A_CADA = 5
+
+
+def _carregar() -> Optional[Dict[str, str]]:
+    from portaria.models import Parametro
+
+    try:
+        return dict(Parametro.objects.values_list("ParametroNome", "ParametroValor"))
+    except (OperationalError, ProgrammingError):
+        # Banco não disponível ou tabela não criada ainda: tenta de novo na próxima leitura
+        return None
+
+
+_parametros = Recarregavel("params:versao", _carregar, VERIFICAR_A_CADA)
+
+
+def todos() -> Dict[str, str]:
+    """Todos os parâmetros {nome: valor}, recarregados se alguém os alterou."""
+    valores = _parametros.obter()
+    return valores if valores is not None else {}
+
 
 def get_param(key, default=None):
     """
-    Busca um parâmetro da tabela Parametro.
+    Valor do parâmetro `key` da tabela Parametro.
     Se o banco ainda não estiver pronto (sem tabela/migrações), retorna o default.
     """
-    try:
-        from portaria.models import Parametro
-        val = (
-            Parametro.objects
-            .filter(ParametroNome=key)             # ✅ corrige nome do campo
-            .values_list("ParametroValor", flat=True)  # ✅ pega o valor certo
-            .first()
-        )
-        return val if val is not None else default
-    except (OperationalError, ProgrammingError):
-        # Banco não disponível ou tabela não criada ainda
-        return default
+    val = todos().get(key)
+    return val if val is not None else default
+
+
+def invalidar() -> None:
+    """Chamada quando um Parametro muda: todos os processos recarregam."""
+    _parametros.invalidar()
+
+
+class Grupo:
+    """Parâmetros com prefixo comum, lidos a cada acesso (sempre o valor atual)."""
+
+    def __init__(self, prefixo: str, padroes: Optional[Mapping[str, str]] = None):
+        self._prefixo = prefixo
+        self._padroes = padroes or {}
+
+    def __getattr__(self, nome: str):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return get_param(f"{self._prefixo}{nome}") or self._padroes.get(nome)
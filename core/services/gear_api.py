@@ -1,40 +1,53 @@
-import requests
-from params import get_param
+from core.params import Grupo
 from django.conf import settings
+from integrations.resilience import BREAKER_GEAR, ResilientSession
+
+# Compartilhada entre as instâncias: keep-alive, timeout e circuit breaker
+_http = ResilientSession(BREAKER_GEAR)
+
+# GEAR_API_BASE_URL / GEAR_API_TOKEN da tabela Parametro, lidos a cada uso
+GEAR_PARAMS = Grupo("GEAR_API_", padroes={"BASE_URL": "xx", "TOKEN": "xx"})
 
 class GearApi:
-    def __init__(self):
-        self.base_url = get_param("GEAR_API_BASE_URL", "xx")
-        self.api_token = get_param("GEAR_API_TOKEN", "xx")
-        self.headers = {
+    @property
+    def base_url(self):
+        return GEAR_PARAMS.BASE_URL
+
+    @property
+    def api_token(self):
+        return GEAR_PARAMS.TOKEN
+
+    @property
+    def headers(self):
+        return {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json",
         }
 
     def get(self, endpoint, params=None):
         url = f"{self.base_url}{endpoint}"
-        resp = requests.get(url, headers=self.headers, params=params)
+        resp = _http.get(url, headers=self.headers, params=params)
         if resp.status_code >= 400:
             raise Exception(f"Erro GET {endpoint}: {resp.status_code} - {resp.text}")
         return resp.json()
 
     def post(self, endpoint, data=None):
         url = f"{self.base_url}{endpoint}"
-        resp = requests.post(url, headers=self.headers, json=data)
+        resp = _http.post(url, headers=self.headers, json=data)
         if resp.status_code >= 400:
             raise Exception(f"Erro POST {endpoint}: {resp.status_code} - {resp.text}")
         return resp.json()
 
     def put(self, endpoint, data=None):
         url = f"{self.base_url}{endpoint}"
-        resp = requests.put(url, headers=self.headers, json=data)
+        resp = _http.put(url, headers=self.headers, json=data)
         if resp.status_code >= 400:
             raise Exception(f"Erro PUT {endpoint}: {resp.status_code} - {resp.text}")
         return resp.json()
 
     def delete(self, endpoint):
         url = f"{self.base_url}{endpoint}"
-        resp = requests.delete(url, headers=self.headers)
+        resp = _http.delete(url, headers=self.headers)
         if resp.status_code >= 400:
             raise Exception(f"Erro DELETE {endpoint}: {resp.status_code} - {resp.text}")
         return resp.json()
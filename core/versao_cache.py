@@ -0,0 +1,70 @@
+# core/versao_cache.py
+"""
+Invalidação entre processos por número de versão no cache compartilhado.
+
+Quem altera um dado chama incrementar(chave); quem guarda uma cópia em
+memória compara a versão que carregou com a atual e recarrega se mudou.
+Usado pelo mapa de Ids (integrations/idmap.py), pelos parâmetros
+(core/params.py), pelo escopo de acesso (portaria/escopo.py) e pelo cache de
+SOQL (integrations/query_cache.py).
+"""
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from django.core.cache import cache
+
+T = TypeVar("T")
+
+
+def atual(chave: str) -> int:
+    """Versão atual (cria com 1 se ainda não existir)."""
+    return cache.get_or_set(chave, 1, None)
+
+
+def incrementar(chave: str) -> None:
+    """Nova versão: cópias carregadas com a anterior deixam de valer."""
+    if not cache.add(chave, 2, None):
+        try:
+            cache.incr(chave)
+        except ValueError:
+            # A chave expirou/foi despejada entre o add e o incr
+            cache.set(chave, 2, None)
+
+
+class Recarregavel(Generic[T]):
+    """
+    Valor carregado uma vez e guardado no processo. A versão no cache é
+    conferida no máximo a cada `verificar_a_cada` segundos; se outro processo
+    a incrementou, o valor é recarregado. `carregar` pode devolver None
+    (ex.: banco indisponível): nada é guardado e a próxima leitura tenta de novo.
+    """
+
+    def __init__(self, chave: str, carregar: Callable[[], Optional[T]], verificar_a_cada: float = 5):
+        self.chave = chave
+        self.carregar = carregar
+        self.verificar_a_cada = verificar_a_cada
+        self._lock = threading.Lock()
+        self._valor: Optional[T] = None
+        self._versao = None
+        self._verificado_em = 0.0
+
+    def obter(self) -> Optional[T]:
+        agora = time.monotonic()
+        if self._valor is not None and agora - self._verificado_em < self.verificar_a_cada:
+            return self._valor
+
+        with self._lock:
+            versao = atual(self.chave)
+            if self._valor is None or versao != self._versao:
+                valor = self.carregar()
+                if valor is None:
+                    return None
+                self._valor, self._versao = valor, versao
+            self._verificado_em = agora
+            return self._valor
+
+    def invalidar(self) -> None:
+        """Descarta a cópia deste processo e avisa os outros."""
+        self._valor = None
+        incrementar(self.chave)
@@ -1,35 +1,22 @@
 import os
+import sys
 from typing import List, Dict, Optional
 from simple_salesforce import Salesforce
 import json
-from core.params import get_param
+from integrations.bulk_extract import campos_bulk, extrair
+from integrations.metadata import field_names
+from integrations.session import sf_connect
 
-SF_USERNAME = get_param("SF_USERNAME", "xx")
-SF_PASSWORD = get_param("SF_PASSWORD", "xx")
-SF_TOKEN    = get_param("SF_TOKEN", "xx")
-SF_DOMAIN   = get_param("SF_DOMAIN", "xx")
 SOBJECT = "reda__Visitor_Log__c"
 JSON_OUT = "visitor_logs_dump.json"
+BULK_OUT = "visitor_logs_dump.ndjson.gz"
 
 CREATED_DATE_FILTER: Optional[str] = None  
 LIMIT_RESULTS: Optional[int] = None
 
 
-def sf_connect() -> Salesforce:
-    return Salesforce(
-        username=SF_USERNAME,
-        password=SF_PASSWORD,
-        security_token=SF_TOKEN,
-        domain=SF_DOMAIN
-    )
-
 def get_all_fields(sf: Salesforce, sobject: str) -> List[str]:
-    desc = sf.__getattr__(sobject).describe()
-    fields = [f["name"] for f in desc["fields"]]
-    if "Id" in fields:
-        fields.remove("Id")
-        fields = ["Id"] + fields
-    return fields
+    return field_names(sf, sobject)
 
 def build_where_clause(created_filter: Optional[str]) -> str:
     """
@@ -54,6 +41,17 @@ def query_chunk(sf: Salesforce, sobject: str, field_list: List[str], where_claus
         soql += f" LIMIT {int(limit)}"
     return sf.query_all(soql).get("records", [])
 
+def main_bulk():
+    """Mesma exportação via Bulk API 2.0, gravando em streaming (NDJSON gzip, retomável)."""
+    sf = sf_connect()
+    fields = campos_bulk(sf, SOBJECT)
+    soql = f"SELECT {', '.join(fields)} FROM {SOBJECT}{build_where_clause(CREATED_DATE_FILTER)}"
+    if LIMIT_RESULTS:
+        soql += f" LIMIT {int(LIMIT_RESULTS)}"
+    print(f"[INFO] Campos totais: {len(fields)}")
+    resultado = extrair(sf, soql, BULK_OUT)
+    print(f"[OK] Exportado {resultado['registros']} registros para {BULK_OUT}")
+
 def main():
     sf = sf_connect()
 
@@ -76,4 +74,7 @@ def main():
     print(f"[OK] Exportado {len(recs)} registros para {JSON_OUT}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--bulk" in sys.argv:
+        main_bulk()
+    else:
+        main()
\ No newline at end of file
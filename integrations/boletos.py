@@ -0,0 +1,223 @@
+# integrations/boletos.py
+"""
+Envio assíncrono dos boletos recebidos pelo webhook para a biblioteca REDA.
+
+O webhook só grava o arquivo (BoletoRecebido) e responde 202; os workers do
+Celery fazem o upload em streaming, com os Ids de Account e da pasta
+'Boletos' em cache.
+"""
+import os
+from datetime import timedelta
+from typing import Dict
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from simple_salesforce import SalesforceMalformedRequest
+
+from integrations.salesforce_file import criar_content_version
+from integrations.session import sf_connect
+from integrations.soql import escape
+from portaria.models import BoletoRecebido, StatusBoleto
+
+IDS_TTL = 60 * 60 * 24
+# Boleto em PROCESSANDO há mais que isso: o worker morreu, volta para a fila
+RESERVA = timedelta(minutes=10)
+
+# Biblioteca REDA: Account e pastas fixas do condomínio (Cubatão)
+ACCOUNT_BIBLIOTECA = "001Np00001V9FQUIA3"
+PASTA_PAI = "a1mNp0000011y9dIAA"
+PASTA_TEMPLATE = "a1mNp0000011y4nIAA"
+
+
+# Token do status_url devolvido pelo webhook: só quem enviou consulta o job/lote
+_SALT_STATUS = "integrations.boletos.status"
+
+
+def token_status(chave) -> str:
+    return signing.dumps(str(chave), salt=_SALT_STATUS)
+
+
+def token_status_valido(token, chave) -> bool:
+    if not token:
+        return False
+    try:
+        return signing.loads(token, salt=_SALT_STATUS) == str(chave)
+    except signing.BadSignature:
+        return False
+
+
+class BoletoInvalido(Exception):
+    """Erro definitivo (não adianta tentar de novo)."""
+
+
+def normalizar_documento(documento: str) -> str:
+    return (
+        documento.strip()
+        .replace(".", "")
+        .replace("-", "")
+        .replace("/", "")
+        .replace(" ", "")
+    )
+
+
+def _account(sf, documento: str) -> dict:
+    key = f"sf_account_doc:{documento}"
+    acc = cache.get(key)
+    if acc is None:
+        recs = sf.query(f"""
+            SELECT Id, Name
+            FROM Account
+            WHERE DocumentoTxt__c = '{escape(documento)}'
+            LIMIT 1
+        """)["records"]
+        if not recs:
+            raise BoletoInvalido(f"Nenhum Account encontrado para {documento}")
+        acc = {"Id": recs[0]["Id"], "Name": recs[0]["Name"]}
+        cache.set(key, acc, IDS_TTL)
+    return acc
+
+
+def _pasta_boletos(sf) -> str:
+    key = f"sf_pasta_boletos:{ACCOUNT_BIBLIOTECA}"
+    folder_id = cache.get(key)
+    if folder_id is None:
+        recs = sf.query(
+            "SELECT Id FROM redafe__Folder__c WHERE redafe__File_Folder_Label__c = 'Boletos' "
+            f"and redafe__Account__c = '{ACCOUNT_BIBLIOTECA}' and redafe__Parent_Folder__c = '{PASTA_PAI}' LIMIT 1"
+        )["records"]
+        if not recs:
+            raise BoletoInvalido("Pasta 'Boletos' não encontrada no REDA")
+        folder_id = recs[0]["Id"]
+        cache.set(key, folder_id, IDS_TTL)
+    return folder_id
+
+
+def _enviar(sf, boleto: BoletoRecebido) -> Dict[str, str]:
+    account = _account(sf, boleto.documento)
+    account_id = ACCOUNT_BIBLIOTECA
+    boletos_folder_id = _pasta_boletos(sf)
+
+    # 🔹 Cria ContentVersion (upload em streaming, publicado direto na pasta 'Boletos').
+    #    Numa nova tentativa o upload já feito é reaproveitado: só falta vincular.
+    content_version_id = boleto.content_version_id
+    if not content_version_id:
+        content_version_id = criar_content_version(sf, boleto.arquivo.path, {
+            "Title": boleto.nome_arquivo.replace(".pdf", ""),
+            "PathOnClient": boleto.nome_arquivo,
+            "FirstPublishLocationId": boletos_folder_id,
+            "redafe__Template_Folder_Id__c": PASTA_TEMPLATE,
+        })
+        boleto.content_version_id = content_version_id
+        boleto.save(update_fields=["content_version_id"])
+
+    content_doc_id = sf.query(
+        f"SELECT ContentDocumentId FROM ContentVersion WHERE Id = '{content_version_id}'"
+    )["records"][0]["ContentDocumentId"]
+
+    # 🔹 Move o arquivo para a pasta 'Boletos'
+    try:
+        sf.ContentFolderItem.create({
+            "ContentDocumentId": content_doc_id,
+            "ParentContentFolderId": boletos_folder_id,
+        })
+    except SalesforceMalformedRequest as e:
+        print(f"Aviso: não foi possível mover para a pasta Boletos ({e.content})")
+
+    # 🔹 Vincula o arquivo ao Account
+    sf.ContentDocumentLink.create({
+        "ContentDocumentId": content_doc_id,
+        "LinkedEntityId": account_id,
+        "ShareType": "V",
+        "Visibility": "AllUsers",
+    })
+
+    return {
+        "account_id": account_id,
+        "account_name": account["Name"],
+        "boletos_folder_id": boletos_folder_id,
+        "content_document_id": content_doc_id,
+    }
+
+
+def processar_boleto(boleto_id, sf=None) -> str:
+    """Processa um boleto pendente. Retorna o status final."""
+    # Reserva atômica: só um worker passa daqui para o mesmo boleto
+    agora = timezone.now()
+    reservado = (
+        BoletoRecebido.objects
+        .filter(_disponiveis(agora), pk=boleto_id)
+        .update(status=StatusBoleto.PROCESSANDO, reservado_em=agora)
+    )
+    if not reservado:
+        return BoletoRecebido.objects.filter(pk=boleto_id).values_list("status", flat=True).first()
+
+    boleto = BoletoRecebido.objects.get(pk=boleto_id)
+    try:
+        boleto.resultado = _enviar(sf or sf_connect(), boleto)
+        boleto.status = StatusBoleto.CONCLUIDO
+        boleto.erro = ""
+        boleto.processado_em = timezone.now()
+        # O arquivo só ficava em disco até chegar ao Salesforce
+        boleto.arquivo.delete(save=False)
+    except BoletoInvalido as e:
+        boleto.status = StatusBoleto.ERRO
+        boleto.erro = str(e)
+        boleto.processado_em = timezone.now()
+    except Exception as e:
+        boleto.tentativas += 1
+        boleto.erro = str(e)[:2000]
+        if boleto.tentativas >= BoletoRecebido.MAX_TENTATIVAS:
+            boleto.status = StatusBoleto.ERRO
+            boleto.processado_em = timezone.now()
+        else:
+            boleto.status = StatusBoleto.PENDENTE
+        print(f"⚠️ Erro ao enviar boleto {boleto.pk} (tentativa {boleto.tentativas}): {e}")
+    boleto.save()
+    return boleto.status
+
+
+def _disponiveis(agora) -> Q:
+    """Pendentes e reservas vencidas (worker morto entre a reserva e o save)."""
+    return Q(status=StatusBoleto.PENDENTE) | Q(
+        status=StatusBoleto.PROCESSANDO, reservado_em__lt=agora - RESERVA
+    ) | Q(status=StatusBoleto.PROCESSANDO, reservado_em__isnull=True)
+
+
+def processar_pendentes(limite: int = 100) -> int:
+    ids = list(
+        BoletoRecebido.objects
+        .filter(_disponiveis(timezone.now()))
+        .order_by("criado_em")
+        .values_list("id", flat=True)[:limite]
+    )
+    if not ids:
+        return 0
+    sf = sf_connect()
+    for boleto_id in ids:
+        processar_boleto(boleto_id, sf=sf)
+    return len(ids)
+
+
+def enfileirar_boleto(documento: str, arquivo, lote=None) -> BoletoRecebido:
+    """Grava o boleto em disco e agenda o envio após o commit."""
+    boleto = BoletoRecebido.objects.create(
+        documento=normalizar_documento(documento),
+        arquivo=arquivo,
+        nome_arquivo=os.path.basename(arquivo.name),
+        lote=lote,
+    )
+    transaction.on_commit(lambda: _disparar_worker(boleto.pk))
+    return boleto
+
+
+def _disparar_worker(boleto_id):
+    from portaria.tasks import processar_boleto_task
+
+    try:
+        processar_boleto_task.delay(str(boleto_id))
+    except Exception as e:
+        # Broker fora do ar: processar_boletos_pendentes (beat) envia depois
+        print(f"⚠️ Não foi possível disparar o envio do boleto {boleto_id}: {e}")
@@ -0,0 +1,180 @@
+# integrations/bulk_extract.py
+"""
+Extração em massa via Bulk API 2.0 (jobs/query).
+
+Cria o job, acompanha até JobComplete e baixa as páginas de resultado (CSV)
+direto para o disco, em NDJSON ou CSV compactado com gzip. Cada página é um
+membro gzip separado e, ao terminar uma página, o Sforce-Locator seguinte e o
+tamanho do arquivo são gravados em <destino>.state.json: se o processo cair,
+a próxima execução corta o arquivo no último ponto bom e continua do locator.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from simple_salesforce.util import exception_handler
+
+from integrations.metadata import describe_fields
+
+FORMATOS = ("ndjson", "csv")
+REGISTROS_POR_PAGINA = 50000
+ESPERA_INICIAL = 2
+ESPERA_MAXIMA = 30
+
+# Tipos compostos não são aceitos pela Bulk API (vêm separados nos subcampos)
+TIPOS_COMPOSTOS = {"address", "location"}
+
+
+def campos_bulk(sf, sobject: str) -> List[str]:
+    return [f["name"] for f in describe_fields(sf, sobject) if f.get("type") not in TIPOS_COMPOSTOS]
+
+
+def _request(sf, method: str, path: str, **kwargs):
+    """Chamada à API com uma renovação de sessão em 401."""
+    url = f"{sf.base_url}{path}"
+    for tentativa in range(2):
+        result = sf.session.request(method, url, headers=sf.headers, **kwargs)
+        if result.status_code == 401 and tentativa == 0:
+            sf._refresh_session()
+            continue
+        break
+    if result.status_code >= 300:
+        exception_handler(result, name=path)
+    return result
+
+
+def criar_job(sf, soql: str, incluir_excluidos: bool = False) -> str:
+    result = _request(sf, "POST", "jobs/query", json={
+        "operation": "queryAll" if incluir_excluidos else "query",
+        "query": " ".join(soql.split()),
+        "contentType": "CSV",
+        "columnDelimiter": "COMMA",
+        "lineEnding": "LF",
+    })
+    return result.json()["id"]
+
+
+def aguardar_job(sf, job_id: str, timeout: Optional[int] = None) -> dict:
+    inicio = time.monotonic()
+    espera = ESPERA_INICIAL
+    while True:
+        info = _request(sf, "GET", f"jobs/query/{job_id}").json()
+        estado = info.get("state")
+        if estado == "JobComplete":
+            return info
+        if estado in ("Failed", "Aborted"):
+            raise RuntimeError(f"Job {job_id} terminou como {estado}: {info.get('errorMessage')}")
+        if timeout and time.monotonic() - inicio > timeout:
+            raise TimeoutError(f"Job {job_id} não terminou em {timeout}s (estado {estado})")
+        print(f"⏳ Job {job_id}: {estado}, {info.get('numberRecordsProcessed', 0)} registros processados")
+        time.sleep(espera)
+        espera = min(espera * 2, ESPERA_MAXIMA)
+
+
+def _ler_estado(caminho: str) -> Optional[dict]:
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _gravar_estado(caminho: str, estado: dict) -> None:
+    tmp = f"{caminho}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    os.replace(tmp, caminho)
+
+
+def _gravar_pagina(resp, destino: str, formato: str, com_cabecalho: bool) -> int:
+    """Copia uma página CSV do Bulk API para o destino sem montá-la em memória."""
+    resp.raw.decode_content = True
+    # O TextIOWrapper lê adiante; sem isso o urllib3 fecha o stream no fim do corpo
+    resp.raw.auto_close = False
+    texto = io.TextIOWrapper(resp.raw, encoding="utf-8", newline="")
+    leitor = csv.reader(texto)
+    cabecalho = next(leitor, None)
+    if cabecalho is None:
+        return 0
+
+    n = 0
+    with gzip.open(destino, "at", encoding="utf-8", newline="") as out:
+        if formato == "csv":
+            escritor = csv.writer(out, lineterminator="\n")
+            if com_cabecalho:
+                escritor.writerow(cabecalho)
+            for linha in leitor:
+                escritor.writerow(linha)
+                n += 1
+        else:
+            for linha in leitor:
+                # No CSV do Bulk API, campo vazio é null
+                out.write(json.dumps(
+                    {k: (v if v != "" else None) for k, v in zip(cabecalho, linha)},
+                    ensure_ascii=False,
+                ))
+                out.write("\n")
+                n += 1
+    return n
+
+
+def extrair(sf, soql: str, destino: str, formato: str = "ndjson", incluir_excluidos: bool = False,
+            registros_por_pagina: int = REGISTROS_POR_PAGINA, timeout: Optional[int] = None) -> Dict:
+    """
+    Executa a query via Bulk API 2.0 e grava o resultado em destino (gzip).
+    Retoma de <destino>.state.json quando a query for a mesma.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+
+    arquivo_estado = f"{destino}.state.json"
+    estado = _ler_estado(arquivo_estado)
+    if estado and estado.get("soql") == soql and estado.get("formato") == formato:
+        print(f"↩️ Retomando job {estado['job_id']} ({estado['registros']} registros já gravados)")
+        # Descarta o que foi escrito depois da última página completa
+        if os.path.exists(destino):
+            with open(destino, "r+b") as f:
+                f.truncate(estado["bytes"])
+    else:
+        if os.path.exists(destino):
+            os.remove(destino)
+        estado = {
+            "job_id": criar_job(sf, soql, incluir_excluidos),
+            "soql": soql,
+            "formato": formato,
+            "locator": None,
+            "registros": 0,
+            "bytes": 0,
+        }
+        _gravar_estado(arquivo_estado, estado)
+        print(f"🚀 Job Bulk API criado: {estado['job_id']}")
+
+    aguardar_job(sf, estado["job_id"], timeout=timeout)
+
+    while True:
+        params = {"maxRecords": registros_por_pagina}
+        if estado["locator"]:
+            params["locator"] = estado["locator"]
+        resp = _request(sf, "GET", f"jobs/query/{estado['job_id']}/results", params=params, stream=True)
+        try:
+            n = _gravar_pagina(resp, destino, formato, com_cabecalho=estado["registros"] == 0)
+            locator = resp.headers.get("Sforce-Locator")
+        finally:
+            resp.close()
+
+        estado["registros"] += n
+        estado["locator"] = locator if locator and locator != "null" else None
+        estado["bytes"] = os.path.getsize(destino) if os.path.exists(destino) else 0
+        _gravar_estado(arquivo_estado, estado)
+        print(f"  … {estado['registros']} registros gravados em {destino}")
+
+        if not estado["locator"]:
+            break
+
+    os.remove(arquivo_estado)
+    print(f"✅ Extração concluída: {estado['registros']} registros em {destino}")
+    return {"job_id": estado["job_id"], "registros": estado["registros"], "arquivo": destino}
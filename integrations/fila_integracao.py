@@ -0,0 +1,122 @@
+# integrations/fila_integracao.py
+"""
+Outbox de integração das encomendas com o Salesforce.
+
+A recepção só grava a Encomenda e uma linha em FilaIntegracao (mesma
+transação). Um worker do Celery drena a fila em lotes: cria o Ticket,
+anexa os arquivos e busca as senhas, com backoff exponencial por Tentativas.
+"""
+from datetime import timedelta
+from typing import Dict
+
+from django.db import transaction
+from django.utils import timezone
+
+from integrations.session import sf_connect
+from integrations.sf_tickets import anexar_arquivos_encomenda, buscar_senhas_tickets, sync_encomenda_to_salesforce
+from portaria.models import Encomenda, FilaIntegracao
+
+LOTE = 20
+BACKOFF_BASE = 30          # segundos; 30s, 60s, 2min, 4min...
+BACKOFF_MAX = 60 * 60
+# Tempo de "reserva" de um item enquanto um worker o processa
+RESERVA = timedelta(minutes=10)
+
+
+def _backoff(tentativas: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (tentativas - 1), BACKOFF_MAX))
+
+
+def enfileirar_encomenda(encomenda) -> FilaIntegracao:
+    """Cria o item da fila; deve ser chamado dentro da transação que salva a Encomenda."""
+    item, _ = FilaIntegracao.objects.get_or_create(Encomenda=encomenda)
+    transaction.on_commit(_disparar_worker)
+    return item
+
+
+def _disparar_worker():
+    from portaria.tasks import processar_fila_integracao
+
+    try:
+        processar_fila_integracao.delay()
+    except Exception as e:
+        # Broker fora do ar: o beat drena a fila na próxima execução
+        print(f"⚠️ Não foi possível disparar a fila de integração: {e}")
+
+
+def _reservar_lote(limite: int):
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            FilaIntegracao.objects
+            .select_for_update(skip_locked=True)
+            .filter(integrado_em__isnull=True, Tentativas__lt=FilaIntegracao.MAX_TENTATIVAS, proxima_tentativa__lte=agora)
+            .order_by("proxima_tentativa")
+            .values_list("id", flat=True)[:limite]
+        )
+        FilaIntegracao.objects.filter(id__in=ids).update(proxima_tentativa=agora + RESERVA)
+    return list(
+        FilaIntegracao.objects
+        .filter(id__in=ids)
+        .select_related("Encomenda__condominio", "Encomenda__unidade", "Encomenda__destinatario")
+    )
+
+
+def _integrar(item: FilaIntegracao) -> None:
+    encomenda = item.Encomenda
+    if not encomenda.salesforce_ticket_id:
+        resultado = sync_encomenda_to_salesforce(encomenda, anexar=False)
+        if not resultado or not resultado.get("id"):
+            raise RuntimeError("Salesforce não retornou o Id do Ticket.")
+        # Grava o Id antes dos anexos para que uma nova tentativa não duplique o Ticket
+        encomenda.salesforce_ticket_id = resultado["id"]
+        encomenda.SenhaRetirada = resultado.get("senha") or encomenda.SenhaRetirada
+        encomenda.save(update_fields=["salesforce_ticket_id", "SenhaRetirada"])
+
+    # Progresso por arquivo fica no item (gravado por processar_fila mesmo na falha)
+    anexar_arquivos_encomenda(encomenda, encomenda.salesforce_ticket_id, enviados=item.anexos_enviados)
+
+
+def processar_fila(limite: int = LOTE) -> Dict[str, int]:
+    itens = _reservar_lote(limite)
+    if not itens:
+        return {"integradas": 0, "falhas": 0}
+
+    integradas = []
+    falhas = 0
+    for item in itens:
+        try:
+            _integrar(item)
+            item.integrado_em = timezone.now()
+            item.ultimo_erro = ""
+            integradas.append(item)
+        except Exception as e:
+            falhas += 1
+            item.Tentativas += 1
+            item.proxima_tentativa = timezone.now() + _backoff(item.Tentativas)
+            item.ultimo_erro = str(e)[:2000]
+            print(f"⚠️ Falha ao integrar encomenda {item.Encomenda_id} (tentativa {item.Tentativas}): {e}")
+        item.save(update_fields=["Tentativas", "integrado_em", "proxima_tentativa", "ultimo_erro", "anexos_enviados"])
+
+    _atualizar_senhas([i.Encomenda for i in integradas if not i.Encomenda.SenhaRetirada])
+
+    print(f"📦 Fila de integração: {len(integradas)} integradas, {falhas} falhas.")
+    return {"integradas": len(integradas), "falhas": falhas}
+
+
+def _atualizar_senhas(encomendas) -> None:
+    """Uma única query para as senhas dos Tickets recém-criados."""
+    if not encomendas:
+        return
+    try:
+        senhas = buscar_senhas_tickets(sf_connect(), [e.salesforce_ticket_id for e in encomendas])
+    except Exception as e:
+        print(f"⚠️ Erro ao buscar senhas no Salesforce: {e}")
+        return
+    alteradas = []
+    for e in encomendas:
+        senha = senhas.get(e.salesforce_ticket_id[:15])
+        if senha:
+            e.SenhaRetirada = senha
+            alteradas.append(e)
+    Encomenda.objects.bulk_update(alteradas, ["SenhaRetirada"])
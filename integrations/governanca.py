@@ -0,0 +1,197 @@
+# integrations/governanca.py
+"""
+Controle do consumo da API do Salesforce.
+
+Toda chamada feita pela sessão compartilhada é contada por dia, por origem
+(nome da view ou da task) e por condomínio, e o header Sforce-Limit-Info
+("api-usage=25/15000") atualiza o saldo diário da org. A origem fica num
+ContextVar, preenchido pelo OrigemSalesforceMiddleware (views) e pelo
+decorator tarefa_salesforce (tasks do Celery).
+
+Com o saldo baixo as origens de prioridade menor são barradas com
+OrcamentoApiBaixo (um ServicoIndisponivel: as views já caem para o cache ou
+para os dados locais) e as tasks são adiadas para a próxima execução do beat.
+Chamadas críticas da portaria (criação de Visitor Log) passam sempre.
+"""
+import functools
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from integrations.resilience import ServicoIndisponivel
+
+CRITICA = "critica"
+NORMAL = "normal"
+BAIXA = "baixa"
+
+# Fração mínima do limite diário que precisa restar para cada prioridade
+SALDO_MINIMO = {
+    BAIXA: getattr(settings, "SF_API_SALDO_MINIMO_BAIXA", 0.25),
+    NORMAL: getattr(settings, "SF_API_SALDO_MINIMO_NORMAL", 0.10),
+    CRITICA: 0,
+}
+
+PRIORIDADES = {
+    # Portaria: não pode esperar
+    "acesso_create": CRITICA,
+    # Trabalho que pode esperar ou sair do cache
+    "atualiza_acesso_salesforce": BAIXA,
+    "get_all_fields": BAIXA,
+    "visitantes_preaprovados_api": BAIXA,
+    "portaria.tasks.atualiza_acesso_salesforce_task": BAIXA,
+    "portaria.tasks.sincronizar_propriedades_task": BAIXA,
+    "portaria.tasks.atualizar_senhas_encomendas": BAIXA,
+    **getattr(settings, "SF_API_PRIORIDADES", {}),
+}
+
+TTL_CONTADORES = 60 * 60 * 24 * 8
+_LIMIT_INFO = re.compile(r"api-usage=(\d+)/(\d+)")
+_K_LIMITE = "sfapi:limite"
+
+_origem: ContextVar[str] = ContextVar("sf_origem", default="desconhecida")
+_condominio: ContextVar[str] = ContextVar("sf_condominio", default="")
+
+
+class OrcamentoApiBaixo(ServicoIndisponivel):
+    def __init__(self, origem: str, saldo: float):
+        super().__init__("salesforce")
+        self.origem = origem
+        self.saldo = saldo
+        self.args = (f"Saldo da API do Salesforce baixo ({saldo:.0%}); '{origem}' adiada",)
+
+
+# -- origem --------------------------------------------------------------------
+def origem_atual() -> str:
+    return _origem.get()
+
+
+@contextmanager
+def origem(nome: str, condominio: Optional[str] = None):
+    t1 = _origem.set(nome)
+    t2 = _condominio.set(str(condominio or ""))
+    try:
+        yield
+    finally:
+        _origem.reset(t1)
+        _condominio.reset(t2)
+
+
+def prioridade(nome: Optional[str] = None) -> str:
+    return PRIORIDADES.get(nome or origem_atual(), NORMAL)
+
+
+# -- saldo ---------------------------------------------------------------------
+def saldo() -> Optional[float]:
+    """Fração restante do limite diário (0..1), ou None se ainda não sabemos."""
+    info = cache.get(_K_LIMITE)
+    if not info or not info["max"]:
+        return None
+    return max(0.0, 1 - info["usado"] / info["max"])
+
+
+def permitir(nome: Optional[str] = None) -> bool:
+    restante = saldo()
+    return restante is None or restante >= SALDO_MINIMO[prioridade(nome)]
+
+
+def verificar() -> None:
+    """Levanta OrcamentoApiBaixo se a origem atual não deve gastar API agora."""
+    if not permitir():
+        raise OrcamentoApiBaixo(origem_atual(), saldo())
+
+
+# -- contadores ----------------------------------------------------------------
+def _contar(dia: str, tipo: str, indice: str, nome: str) -> None:
+    key = f"sfapi:{dia}:{tipo}:{nome}"
+    if cache.add(key, 1, TTL_CONTADORES):
+        # Primeira chamada do dia para este nome (só um processo ganha o add):
+        # recebe uma posição própria no índice via incr, que é atômico
+        key_total = f"sfapi:{dia}:{indice}:n"
+        cache.add(key_total, 0, TTL_CONTADORES)
+        try:
+            posicao = cache.incr(key_total)
+        except ValueError:
+            cache.set(key_total, 1, TTL_CONTADORES)
+            posicao = 1
+        cache.set(f"sfapi:{dia}:{indice}:{posicao}", nome, TTL_CONTADORES)
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, TTL_CONTADORES)
+
+
+def registrar(resp) -> None:
+    """Conta a chamada e atualiza o saldo a partir do Sforce-Limit-Info."""
+    dia = date.today().isoformat()
+    _contar(dia, "origem", "origens", origem_atual())
+    if _condominio.get():
+        _contar(dia, "condominio", "condominios", _condominio.get())
+
+    m = _LIMIT_INFO.search(resp.headers.get("Sforce-Limit-Info", ""))
+    if m:
+        cache.set(_K_LIMITE, {"usado": int(m.group(1)), "max": int(m.group(2))}, 60 * 60)
+
+
+def uso(dia: Optional[str] = None) -> Dict:
+    """Contadores do dia: {"origens": {...}, "condominios": {...}, "limite": {...}}."""
+    dia = dia or date.today().isoformat()
+    resultado = {"dia": dia, "limite": cache.get(_K_LIMITE), "saldo": saldo()}
+    for tipo, indice in (("origem", "origens"), ("condominio", "condominios")):
+        total = cache.get(f"sfapi:{dia}:{indice}:n") or 0
+        posicoes = cache.get_many([f"sfapi:{dia}:{indice}:{i}" for i in range(1, total + 1)])
+        nomes = list(dict.fromkeys(posicoes.values()))
+        valores = cache.get_many([f"sfapi:{dia}:{tipo}:{n}" for n in nomes])
+        resultado[indice] = {
+            n: valores.get(f"sfapi:{dia}:{tipo}:{n}", 0) for n in nomes
+        }
+    return resultado
+
+
+# -- views e tasks -------------------------------------------------------------
+class OrigemSalesforceMiddleware:
+    """Marca as chamadas ao Salesforce com o nome da view e o condomínio filtrado."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Sob WSGI a thread é reaproveitada: restaura o contexto ao fim do request
+        t1 = _origem.set("desconhecida")
+        t2 = _condominio.set("")
+        try:
+            return self.get_response(request)
+        finally:
+            _origem.reset(t1)
+            _condominio.reset(t2)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        nome = (match.url_name if match else None) or view_func.__name__
+        condominio = request.GET.get("condominio") or request.POST.get("condominio") or ""
+        _origem.set(nome)
+        _condominio.set(str(condominio))
+        return None
+
+
+def tarefa_salesforce(func):
+    """
+    Para tasks do Celery: identifica a origem pelo nome da task e, se o saldo
+    estiver baixo para a prioridade dela, adia (o beat roda de novo depois).
+    """
+    nome = f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with origem(nome):
+            if not permitir():
+                print(f"⏸️ {nome} adiada: saldo da API do Salesforce em {saldo():.0%}")
+                return {"adiado": True}
+            return func(*args, **kwargs)
+
+    return wrapper
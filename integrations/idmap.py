@@ -0,0 +1,130 @@
+# integrations/idmap.py
+"""
+Mapa em memória entre as PKs locais e os Ids do Salesforce.
+
+Condomínio ↔ sf_property_id, Unidade ↔ sf_unidade_id (e o condomínio da
+unidade), Morador ↔ sf_contact_id e Morador ↔ sf_opportunity_id. É carregado
+do banco de uma vez (uma query por modelo) e fica no processo; as buscas nos
+dois sentidos não vão ao banco.
+
+Os Ids são normalizados para 18 caracteres, então tanto o Id de 15 (case
+sensitive) quanto o de 18 encontram o mesmo registro.
+
+Invalidação: os signals de save/delete de Condominio, Bloco, Unidade e
+Morador (portaria/signals.py) chamam invalidar(), que limpa o mapa do
+processo e incrementa uma versão no cache (core/versao_cache.py). Os outros processos comparam a
+versão no máximo a cada VERIFICAR_A_CADA segundos. bulk_create/bulk_update
+não disparam signals: quem os usa chama invalidar() depois.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from condominio.models import Condominio, Morador, Unidade
+from core.versao_cache import Recarregavel
+
+VERIFICAR_A_CADA = 5
+_SUFIXO = "ABCDEFGHIJKLMNOPQRSTUVWXYZ012345"
+
+
+def id18(sf_id: Optional[str]) -> str:
+    """Id do Salesforce com 18 caracteres ("" se vazio/inválido)."""
+    sf_id = (sf_id or "").strip()
+    if len(sf_id) == 18:
+        return sf_id
+    if len(sf_id) != 15:
+        return ""
+    # Cada bloco de 5 chars vira um bit por maiúscula → letra do sufixo
+    sufixo = ""
+    for i in range(0, 15, 5):
+        bits = sum(1 << j for j, c in enumerate(sf_id[i:i + 5]) if "A" <= c <= "Z")
+        sufixo += _SUFIXO[bits]
+    return sf_id + sufixo
+
+
+class Bidirecional:
+    """pk ↔ Id do Salesforce. Um Id pode apontar para várias pks (ex.: oportunidade)."""
+
+    __slots__ = ("_para_sf", "_para_pk")
+
+    def __init__(self, pares: Iterable[Tuple[int, str]]):
+        self._para_sf: Dict[int, str] = {}
+        self._para_pk: Dict[str, List[int]] = {}
+        for pk, sf_id in pares:
+            sf_id = id18(sf_id)
+            if sf_id:
+                self._para_sf[pk] = sf_id
+                self._para_pk.setdefault(sf_id, []).append(pk)
+
+    def sf(self, pk) -> str:
+        try:
+            return self._para_sf.get(int(pk), "")
+        except (TypeError, ValueError):
+            return ""
+
+    def pk(self, sf_id: Optional[str]) -> Optional[int]:
+        pks = self._para_pk.get(id18(sf_id))
+        return pks[0] if pks else None
+
+    def pks(self, sf_id: Optional[str]) -> List[int]:
+        return list(self._para_pk.get(id18(sf_id), ()))
+
+    def sf_ids(self) -> List[str]:
+        return list(self._para_pk)
+
+    def __len__(self):
+        return len(self._para_sf)
+
+
+class MapaIds:
+    __slots__ = ("condominios", "unidades", "contatos", "oportunidades", "condominio_da_unidade")
+
+    def __init__(self):
+        self.condominios = Bidirecional(
+            Condominio.objects.exclude(sf_property_id="").values_list("id", "sf_property_id")
+        )
+        unidades = list(Unidade.objects.values_list("id", "sf_unidade_id", "bloco__condominio_id"))
+        self.unidades = Bidirecional((pk, sf_id) for pk, sf_id, _ in unidades)
+        self.condominio_da_unidade: Dict[int, int] = {pk: c for pk, _, c in unidades}
+
+        moradores = list(Morador.objects.values_list("id", "sf_contact_id", "sf_opportunity_id"))
+        self.contatos = Bidirecional((pk, contato) for pk, contato, _ in moradores)
+        self.oportunidades = Bidirecional((pk, opp) for pk, _, opp in moradores)
+
+
+def _carregar() -> MapaIds:
+    atual = MapaIds()
+    print(f"🗺️ Mapa de Ids carregado: {len(atual.condominios)} condomínios, "
+          f"{len(atual.unidades)} unidades, {len(atual.contatos)} moradores")
+    return atual
+
+
+_mapa = Recarregavel("idmap:versao", _carregar, VERIFICAR_A_CADA)
+
+
+def mapa() -> MapaIds:
+    """Mapa atual do processo (recarrega se outro processo invalidou)."""
+    return _mapa.obter()
+
+
+def invalidar() -> None:
+    _mapa.invalidar()
+
+
+# -- atalhos -------------------------------------------------------------------
+def condominio_sf(pk) -> str:
+    return mapa().condominios.sf(pk)
+
+
+def condominio_pk(sf_id: Optional[str]) -> Optional[int]:
+    return mapa().condominios.pk(sf_id)
+
+
+def unidade_sf(pk) -> str:
+    return mapa().unidades.sf(pk)
+
+
+def unidade_pk(sf_id: Optional[str]) -> Optional[int]:
+    return mapa().unidades.pk(sf_id)
+
+
+def morador_pk(contact_id: Optional[str]) -> Optional[int]:
+    return mapa().contatos.pk(contact_id)
@@ -1,4 +1,4 @@
-from integrations.allvisitorlogs import sf_connect, get_all_fields, build_where_clause, query_chunk, SOBJECT
+from integrations.session import sf_connect
 
 
 def lista_contact_roles(request):
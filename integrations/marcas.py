@@ -0,0 +1,21 @@
+# integrations/marcas.py
+"""Leitura/gravação dos high-water marks das sincronizações incrementais."""
+from datetime import datetime
+from typing import Optional
+
+from portaria.models import MarcaSincronizacao
+
+
+def ler_marca(nome: str) -> Optional[datetime]:
+    return (
+        MarcaSincronizacao.objects
+        .filter(nome=nome)
+        .values_list("ultima_modificacao", flat=True)
+        .first()
+    )
+
+
+def gravar_marca(nome: str, valor: Optional[datetime]) -> None:
+    if valor is None:
+        return
+    MarcaSincronizacao.objects.update_or_create(nome=nome, defaults={"ultima_modificacao": valor})
@@ -0,0 +1,83 @@
+# integrations/metadata.py
+"""
+Cache do describe() dos sObjects do Salesforce.
+
+Guarda só o que usamos de cada campo (name, type, referenceTo), chaveado por
+sObject e versão da API, em dois níveis: memória do processo e cache
+compartilhado (Redis). O describe muda raramente; para forçar a atualização
+use `manage.py refresh_sf_metadata`.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+DESCRIBE_TTL = getattr(settings, "SF_DESCRIBE_TTL", 60 * 60 * 24)
+# A cópia em memória expira antes para que um refresh chegue a todos os processos
+LOCAL_TTL = 60 * 10
+
+# Objetos usados pelas integrações (default do refresh_sf_metadata)
+SOBJECTS_PADRAO = [
+    "reda__Visitor_Log__c", "reda__Ticket__c", "reda__Property__c",
+    "reda__Vehicle__c", "reda__Booking__c", "Account", "Contact",
+]
+
+_local: Dict[str, Tuple[float, List[dict]]] = {}
+
+
+def _key(sf, sobject: str) -> str:
+    return f"sf_describe:v{sf.sf_version}:{sobject}"
+
+
+def _buscar(sf, sobject: str) -> List[dict]:
+    desc = sf.restful(f"sobjects/{sobject}/describe")
+    return [
+        {"name": f["name"], "type": f.get("type"), "referenceTo": f.get("referenceTo") or []}
+        for f in desc.get("fields", [])
+    ]
+
+
+def describe_fields(sf, sobject: str, refresh: bool = False) -> List[dict]:
+    """Campos do sObject ({name, type, referenceTo}), via cache."""
+    key = _key(sf, sobject)
+    agora = time.monotonic()
+
+    if not refresh:
+        hit = _local.get(key)
+        if hit and hit[0] > agora:
+            return hit[1]
+        fields = cache.get(key)
+        if fields is not None:
+            _local[key] = (agora + LOCAL_TTL, fields)
+            return fields
+
+    fields = _buscar(sf, sobject)
+    cache.set(key, fields, DESCRIBE_TTL)
+    _local[key] = (agora + LOCAL_TTL, fields)
+    return fields
+
+
+def field_names(sf, sobject: str) -> List[str]:
+    """Nomes de todos os campos, com Id primeiro."""
+    fields = [f["name"] for f in describe_fields(sf, sobject)]
+    if "Id" in fields:
+        fields.remove("Id")
+        fields = ["Id"] + fields
+    return fields
+
+
+def pick_field(sf, sobject: str, candidates) -> Optional[str]:
+    """Primeira opção de candidates que existir no objeto (ou None)."""
+    if isinstance(candidates, str):
+        candidates = [candidates]
+    available = {f["name"] for f in describe_fields(sf, sobject)}
+    for c in candidates:
+        if c in available:
+            return c
+    return None
+
+
+def refresh(sf, sobjects: Iterable[str] = SOBJECTS_PADRAO) -> Dict[str, int]:
+    """Recarrega o describe dos objetos informados. Retorna {sobject: nº de campos}."""
+    return {s: len(describe_fields(sf, s, refresh=True)) for s in sobjects}
@@ -0,0 +1,152 @@
+# integrations/query_cache.py
+"""
+Cache dos resultados de SOQL das telas de consulta (Tickets, Visitor Logs,
+Veículos, Reservas).
+
+A chave é o SOQL normalizado + o conjunto de condomínios que o usuário pode
+ver, com TTL por objeto. Cada objeto tem um número de versão no cache: as
+escritas no Salesforce (criar/atualizar/excluir) chamam invalidar(objeto),
+que incrementa a versão e torna todas as entradas antigas inalcançáveis.
+O Salesforce só é chamado (e só conectamos) quando não há entrada válida, e
+misses simultâneos são coalescidos por integrations.singleflight.
+
+As entradas ficam guardadas por STALE_FATOR x o TTL: vencidas, ainda são
+servidas quando o orçamento da API não permite a origem atual gastar uma
+chamada (integrations.governanca) ou quando o Salesforce está indisponível.
+"""
+import hashlib
+import pickle
+import re
+import time
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import versao_cache
+from integrations import governanca, singleflight
+from integrations.resilience import ServicoIndisponivel
+from integrations.session import sf_connect
+
+TTL_PADRAO = 60
+TTL_POR_OBJETO = {
+    "reda__Ticket__c": 60,
+    "reda__Visitor_Log__c": 60,
+    "reda__Booking__c": 120,
+    "reda__Vehicle__c": 600,
+    **getattr(settings, "SF_QUERY_CACHE_TTL", {}),
+}
+
+# Por quanto tempo (em múltiplos do TTL) uma entrada vencida ainda pode ser servida
+STALE_FATOR = getattr(settings, "SF_QUERY_CACHE_STALE_FATOR", 10)
+
+# Limite rígido de memória, independente da configuração do Redis: cada objeto
+# tem SLOTS_POR_OBJETO posições fixas no cache e uma entrada nova ocupa a
+# posição do hash da sua chave (substituindo o que estiver lá). O total fica
+# em no máximo objetos x SLOTS_POR_OBJETO x MAX_BYTES_ENTRADA, e versões
+# antigas invalidadas não acumulam: são sobrescritas.
+MAX_BYTES_ENTRADA = getattr(settings, "SF_QUERY_CACHE_MAX_ENTRADA", 1024 * 1024)
+SLOTS_POR_OBJETO = getattr(settings, "SF_QUERY_CACHE_SLOTS", 128)
+
+_SUBQUERY = re.compile(r"\([^()]*\)")
+_FROM = re.compile(r"\bFROM\s+(\w+)", re.IGNORECASE)
+
+
+def normalizar(soql: str) -> str:
+    return " ".join(soql.split())
+
+
+def objeto_da_query(soql: str) -> Optional[str]:
+    """sObject do FROM principal (ignora subqueries entre parênteses)."""
+    s = soql
+    while True:
+        sem_sub = _SUBQUERY.sub("", s)
+        if sem_sub == s:
+            break
+        s = sem_sub
+    m = _FROM.search(s)
+    return m.group(1) if m else None
+
+
+def _versao(objeto: str) -> int:
+    return versao_cache.atual(f"sfq:ver:{objeto}")
+
+
+def hash_escopo(escopo) -> str:
+    if escopo is None:
+        return "-"
+    if hasattr(escopo, "values_list"):
+        escopo = escopo.values_list("pk", flat=True)
+    ids = ",".join(str(i) for i in sorted(escopo))
+    return hashlib.sha1(ids.encode()).hexdigest()[:12]
+
+
+def chave(soql: str, escopo=None, objeto: Optional[str] = None) -> str:
+    soql = normalizar(soql)
+    objeto = objeto or objeto_da_query(soql) or "?"
+    digest = hashlib.sha1(soql.encode()).hexdigest()
+    return f"sfq:{objeto}:v{_versao(objeto)}:{hash_escopo(escopo)}:{digest}"
+
+
+def _slot(key: str, objeto: str) -> str:
+    posicao = int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % SLOTS_POR_OBJETO
+    return f"sfq:{objeto}:slot:{posicao}"
+
+
+def _ler(key: str, objeto: str):
+    """(expira, resultado) guardado para a chave, ou None (slot vazio ou de outra chave)."""
+    guardado = cache.get(_slot(key, objeto))
+    if guardado is None or guardado[0] != key:
+        return None
+    return guardado[1], guardado[2]
+
+
+def _cabe(tamanho: int) -> bool:
+    return tamanho <= MAX_BYTES_ENTRADA
+
+
+def cached(soql: str, buscar: Callable[[], dict], escopo=None, objeto: Optional[str] = None,
+           ttl: Optional[int] = None) -> dict:
+    """Resultado de buscar() para este SOQL/escopo, vindo do cache quando possível."""
+    objeto = objeto or objeto_da_query(soql) or "?"
+    ttl = ttl or TTL_POR_OBJETO.get(objeto, TTL_PADRAO)
+    key = chave(soql, escopo, objeto)
+    hit = _ler(key, objeto)
+    if hit is not None:
+        expira, resultado = hit
+        if time.time() < expira:
+            return resultado
+        if not governanca.permitir():
+            print(f"♻️ Saldo da API baixo: servindo {objeto} do cache vencido")
+            return resultado
+
+    def buscar_e_gravar():
+        resultado = buscar()
+        if _cabe(len(pickle.dumps(resultado, pickle.HIGHEST_PROTOCOL))):
+            cache.set(_slot(key, objeto), (key, time.time() + ttl, resultado), ttl * STALE_FATOR)
+        return resultado
+
+    try:
+        # Misses simultâneos da mesma chave viram uma única chamada ao Salesforce
+        return singleflight.fazer(key, buscar_e_gravar)
+    except ServicoIndisponivel:
+        if hit is None:
+            raise
+        print(f"♻️ Salesforce indisponível: servindo {objeto} do cache vencido")
+        return hit[1]
+
+
+def query_all_cached(soql: str, escopo=None, sf=None, objeto: Optional[str] = None,
+                     ttl: Optional[int] = None) -> dict:
+    """sf.query_all(soql) com cache; sem sf, só conecta no miss."""
+    return cached(
+        soql,
+        lambda: (sf or sf_connect()).query_all(soql),
+        escopo=escopo, objeto=objeto, ttl=ttl,
+    )
+
+
+def invalidar(*objetos: str) -> None:
+    """Chamada depois de escrever no Salesforce: descarta o cache dos objetos."""
+    for objeto in objetos:
+        versao_cache.incrementar(f"sfq:ver:{objeto}")
@@ -0,0 +1,239 @@
+# integrations/registros.py
+"""
+Decodificação dos registros do Salesforce em objetos tipados.
+
+Cada sObject usado pelas telas e sincronizações tem uma dataclass com
+__slots__ (menos memória que o dict aninhado devolvido pela API, ainda mais
+em query_all com milhares de linhas). A decodificação é feita uma única vez:
+
+- relacionamentos são achatados ("reda__Property__r.Name" → unidade_nome);
+- datas/horas viram datetime aware em UTC (parse_sf_datetime) e os templates
+  convertem para São Paulo com o filtro local_sp;
+- textos nulos viram "" e `attributes` é descartado.
+
+O mapeamento atributo → campo fica em CAMPOS; quem monta a query com nomes de
+campo descobertos em runtime (pick_field) pode sobrescrevê-lo por chamada:
+VisitorLogSF.decodificar(registros, visitante="Contact__c").
+"""
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Tuple
+
+from integrations.soql import parse_sf_datetime
+
+_TEXTO, _DATA, _VALOR = 0, 1, 2
+
+# Cache por classe: ((atributo, partes do caminho, tipo), ...)
+_Plano = Tuple[Tuple[str, Tuple[str, ...], int], ...]
+
+
+def _tipo(anotacao) -> int:
+    if anotacao is str:
+        return _TEXTO
+    if anotacao is datetime or anotacao == Optional[datetime]:
+        return _DATA
+    return _VALOR
+
+
+class _Registro:
+    __slots__ = ()
+    CAMPOS: ClassVar[Dict[str, str]] = {}
+    _plano: ClassVar[Optional[_Plano]] = None
+
+    @classmethod
+    def _montar_plano(cls, sobrescritos: Dict[str, Optional[str]]) -> _Plano:
+        tipos = {f.name: _tipo(f.type) for f in fields(cls)}
+        plano = []
+        for atributo, campo in {**cls.CAMPOS, **sobrescritos}.items():
+            if campo:
+                plano.append((atributo, tuple(campo.split(".")), tipos[atributo]))
+        return tuple(plano)
+
+    @classmethod
+    def decodificar(cls, registros: Iterable[dict], **campos: Optional[str]) -> List[Any]:
+        """Lista de objetos a partir dos registros crus (campo=None ignora o atributo)."""
+        if campos:
+            plano = cls._montar_plano(campos)
+        else:
+            if cls._plano is None:
+                cls._plano = cls._montar_plano({})
+            plano = cls._plano
+
+        objetos = []
+        for r in registros:
+            valores = {}
+            for atributo, caminho, tipo in plano:
+                v = r
+                for parte in caminho:
+                    v = v.get(parte) if v else None
+                if tipo == _TEXTO:
+                    v = v or ""
+                elif tipo == _DATA:
+                    v = parse_sf_datetime(v)
+                valores[atributo] = v
+            objetos.append(cls(**valores))
+        return objetos
+
+    @classmethod
+    def de_registro(cls, r: dict, **campos: Optional[str]):
+        return cls.decodificar((r,), **campos)[0]
+
+
+@dataclass(slots=True)
+class VisitorLogSF(_Registro):
+    id: str = ""
+    nome: str = ""
+    telefone: str = ""
+    visitante: str = ""
+    contato_nome: str = ""
+    property_id: str = ""
+    unidade_nome: str = ""
+    region_id: str = ""
+    tipo_acesso: str = ""
+    resultado: str = ""
+    status: str = ""
+    permitido_ate: Optional[datetime] = None
+    criado_em: Optional[datetime] = None
+    modificado_em: Optional[datetime] = None
+    excluido: Optional[bool] = None
+
+    CAMPOS: ClassVar[Dict[str, str]] = {
+        "id": "Id",
+        "nome": "reda__Guest_Name__c",
+        "telefone": "reda__Guest_Phone__c",
+        "visitante": "reda__Visitor_Name__c",
+        "contato_nome": "reda__Contact__r.Name",
+        "property_id": "reda__Property__c",
+        "unidade_nome": "reda__Property__r.Name",
+        "region_id": "reda__Property__r.reda__Region__c",
+        "tipo_acesso": "reda__Access_Type__c",
+        "resultado": "reda__Result__c",
+        "status": "reda__Status__c",
+        "permitido_ate": "reda__Permitted_Till_Datetime__c",
+        "criado_em": "CreatedDate",
+        "modificado_em": "SystemModstamp",
+        "excluido": "IsDeleted",
+    }
+
+
+@dataclass(slots=True)
+class TicketSF(_Registro):
+    id: str = ""
+    nome: str = ""
+    status: str = ""
+    property_id: str = ""
+    pacote: str = ""
+    destinatario: str = ""
+    criado_em: Optional[datetime] = None
+    modificado_em: Optional[datetime] = None
+
+    CAMPOS: ClassVar[Dict[str, str]] = {
+        "id": "Id",
+        "nome": "Name",
+        "status": "reda__Status__c",
+        "property_id": "reda__Property__c",
+        "pacote": "reda__Package_Name__c",
+        "destinatario": "reda__Package_For__c",
+        "criado_em": "CreatedDate",
+        "modificado_em": "LastModifiedDate",
+    }
+
+
+TIPO_VEICULO_PT = {
+    "Car": "Carro",
+    "Motorcycle": "Motocicleta",
+    "Truck": "Caminhão",
+    "Bicycle": "Bicicleta",
+    "Scooter": "Scooter",
+    "Van": "Van",
+}
+
+
+@dataclass(slots=True)
+class VeiculoSF(_Registro):
+    id: str = ""
+    placa: str = ""
+    marca: str = ""
+    modelo: str = ""
+    tipo: str = ""
+    cor: str = ""
+    opportunity_id: str = ""
+    region_id: str = ""
+    propriedade_nome: str = ""
+    unidade: str = ""
+
+    CAMPOS: ClassVar[Dict[str, str]] = {
+        "id": "Id",
+        "placa": "Name",
+        "marca": "Brand__c",
+        "modelo": "reda__Model__c",
+        "tipo": "Type__c",
+        "cor": "reda__Color__c",
+        "opportunity_id": "reda__Opportunity__c",
+        "region_id": "reda__Opportunity__r.reda__Region__c",
+        "propriedade_nome": "reda__Opportunity__r.reda__Property__r.Name",
+        "unidade": "Vehicle_Unit__c",
+    }
+
+    @property
+    def tipo_pt(self) -> str:
+        return TIPO_VEICULO_PT.get(self.tipo, self.tipo)
+
+
+STATUS_RESERVA_PT = {
+    "Pending": "Pendente",
+    "Confirmed": "Confirmada",
+    "Cancelled": "Cancelada",
+    "Completed": "Concluída",
+    "Rejected": "Recusada",
+    "In Progress": "Em andamento",
+    "Draft": "Rascunho",
+}
+
+
+@dataclass(slots=True)
+class ReservaSF(_Registro):
+    id: str = ""
+    propriedade_nome: str = ""
+    unidade: str = ""
+    contato_nome: str = ""
+    descricao: str = ""
+    inicio: Optional[datetime] = None
+    fim: Optional[datetime] = None
+    valor: Optional[float] = None
+    status: str = ""
+    region_id: str = ""
+    opportunity_id: str = ""
+
+    CAMPOS: ClassVar[Dict[str, str]] = {
+        "id": "Id",
+        "propriedade_nome": "reda__Property__r.Name",
+        "unidade": "Opportunity_property__c",
+        "contato_nome": "Contact__r.Name",
+        "descricao": "reda__Description__c",
+        "inicio": "reda__Start_Datetime__c",
+        "fim": "reda__End_Datetime__c",
+        "valor": "reda__Total_Booking_Amount__c",
+        "status": "reda__Status__c",
+        "region_id": "reda__Property__r.reda__Region__c",
+        "opportunity_id": "reda__Opportunity__c",
+    }
+
+    @property
+    def status_pt(self) -> str:
+        return STATUS_RESERVA_PT.get(self.status, self.status)
+
+
+@dataclass(slots=True)
+class PropriedadeSF(_Registro):
+    id: str = ""
+    nome: str = ""
+    region_id: str = ""
+    lease_id: str = ""
+
+    CAMPOS: ClassVar[Dict[str, str]] = {
+        "id": "Id",
+        "nome": "Name",
+        "region_id": "reda__Region__c",
+        "lease_id": "reda__Active_Lease__c",
+    }
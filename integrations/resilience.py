@@ -0,0 +1,153 @@
+# integrations/resilience.py
+"""
+Timeouts e circuit breaker para as chamadas HTTP externas (Salesforce, Gear).
+
+ResilientSession é um requests.Session que sempre envia timeout e consulta o
+breaker antes de cada chamada. O estado do breaker fica no cache do Django
+(Redis), então todos os workers do gunicorn e do Celery abrem e fecham o
+circuito juntos. Com o circuito aberto as chamadas falham na hora com
+ServicoIndisponivel, e as telas caem para os dados locais.
+"""
+import time
+from typing import Callable, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+# (connect, read) em segundos
+TIMEOUT_PADRAO: Tuple[float, float] = (
+    getattr(settings, "HTTP_CONNECT_TIMEOUT", 3.05),
+    getattr(settings, "HTTP_READ_TIMEOUT", 20),
+)
+
+
+class ServicoIndisponivel(RuntimeError):
+    """Circuito aberto: o serviço externo está fora e não vamos esperar por ele."""
+
+    def __init__(self, servico: str, ate: Optional[float] = None):
+        self.servico = servico
+        self.ate = ate
+        super().__init__(f"{servico} indisponível (circuito aberto)")
+
+
+class SalesforceIndisponivel(ServicoIndisponivel):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Abre depois de `limite` falhas em `janela` segundos e fica aberto por
+    `pausa` segundos. Passada a pausa, uma única chamada de teste (half-open)
+    é liberada: se der certo o circuito fecha, se falhar abre de novo.
+    """
+
+    def __init__(self, nome: str, limite: int = 5, janela: int = 60, pausa: int = 30,
+                 excecao=ServicoIndisponivel):
+        self.nome = nome
+        self.limite = limite
+        self.janela = janela
+        self.pausa = pausa
+        self.excecao = excecao
+
+    @property
+    def _k_falhas(self):
+        return f"cb:{self.nome}:falhas"
+
+    @property
+    def _k_aberto(self):
+        return f"cb:{self.nome}:aberto_ate"
+
+    @property
+    def _k_teste(self):
+        return f"cb:{self.nome}:teste"
+
+    def aberto(self) -> bool:
+        return cache.get(self._k_aberto) is not None
+
+    def verificar(self, reservar_teste: bool = True) -> None:
+        """
+        Levanta a exceção do breaker se a chamada não puder ser feita agora.
+        reservar_teste=False só consulta (não consome a chamada de teste).
+        """
+        aberto_ate = cache.get(self._k_aberto)
+        if aberto_ate is None:
+            return
+        if time.time() < aberto_ate:
+            raise self.excecao(self.nome, aberto_ate)
+        # Pausa encerrada: só um processo faz a chamada de teste
+        if reservar_teste and not cache.add(self._k_teste, 1, self.pausa):
+            raise self.excecao(self.nome, aberto_ate)
+
+    def sucesso(self) -> None:
+        estado = cache.get_many([self._k_falhas, self._k_aberto])
+        if not estado:
+            return
+        if self._k_aberto in estado:
+            print(f"✅ Circuito {self.nome} fechado")
+        cache.delete_many([self._k_falhas, self._k_aberto, self._k_teste])
+
+    def falha(self) -> None:
+        if cache.get(self._k_aberto) is not None:
+            # Falhou a chamada de teste: reabre
+            self._abrir()
+            return
+        cache.add(self._k_falhas, 0, self.janela)
+        try:
+            falhas = cache.incr(self._k_falhas)
+        except ValueError:
+            cache.set(self._k_falhas, 1, self.janela)
+            falhas = 1
+        if falhas >= self.limite:
+            self._abrir()
+
+    def _abrir(self) -> None:
+        # O registro dura mais que a pausa para a chamada de teste saber que está half-open
+        cache.set(self._k_aberto, time.time() + self.pausa, self.pausa * 10)
+        cache.delete_many([self._k_falhas, self._k_teste])
+        print(f"🚨 Circuito {self.nome} aberto por {self.pausa}s")
+
+
+class ResilientSession(requests.Session):
+    """
+    requests.Session com timeout padrão e circuit breaker.
+    antes() roda antes de cada chamada (pode levantar para barrá-la) e
+    depois(resp) recebe cada resposta.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, timeout=TIMEOUT_PADRAO,
+                 antes: Optional[Callable[[], None]] = None,
+                 depois: Optional[Callable[[requests.Response], None]] = None):
+        super().__init__()
+        self.breaker = breaker
+        self.timeout = timeout
+        self.antes = antes
+        self.depois = depois
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        if self.antes:
+            self.antes()
+        self.breaker.verificar()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.breaker.falha()
+            raise
+        if resp.status_code >= 500:
+            self.breaker.falha()
+        else:
+            self.breaker.sucesso()
+        if self.depois:
+            self.depois(resp)
+        return resp
+
+
+BREAKER_SALESFORCE = CircuitBreaker(
+    "salesforce",
+    limite=getattr(settings, "SF_BREAKER_LIMITE", 5),
+    pausa=getattr(settings, "SF_BREAKER_PAUSA", 30),
+    excecao=SalesforceIndisponivel,
+)
+BREAKER_GEAR = CircuitBreaker("gear")
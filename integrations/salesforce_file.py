@@ -1,41 +1,178 @@
-import base64
+import contextvars
+import json
 import os
-from simple_salesforce import Salesforce
-from integrations.allvisitorlogs import sf_connect
-
-def anexar_arquivo_salesforce(file_path, ticket_id, titulo="Anexo"):
-    """Envia um arquivo local para a Opportunity no Salesforce."""
-    sf = sf_connect()
-    if not os.path.exists(file_path):
-        print(f"⚠️ Arquivo não encontrado: {file_path}")
-        return None
-
-    with open(file_path, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode("utf-8")
-
-    # Cria ContentVersion
-    filename = os.path.basename(file_path)
-    content_data = {
-        "Title": titulo,
-        "PathOnClient": filename,
-        "VersionData": encoded,
-    }
-
-    response = sf.ContentVersion.create(content_data)
-    content_version_id = response.get("id")
-    print(f"✅ ContentVersion criado: {content_version_id}")
-
-    # Obtém o ContentDocumentId
-    query = f"SELECT ContentDocumentId FROM ContentVersion WHERE Id = '{content_version_id}'"
-    result = sf.query(query)
-    content_doc_id = result["records"][0]["ContentDocumentId"]
-
-    # Faz o vínculo com a Opportunity
-    link_data = {
-        "ContentDocumentId": content_doc_id,
-        "LinkedEntityId": ticket_id,
-        "ShareType": "V",
-        "Visibility": "AllUsers",
-    }
-    sf.ContentDocumentLink.create(link_data)
-    print(f"🔗 Arquivo {filename} vinculado à Opportunity {ticket_id}")
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from simple_salesforce.util import exception_handler
+
+from integrations.session import sf_connect
+from integrations.soql import soql_in
+
+UPLOADS_SIMULTANEOS = 5
+BLOCO = 64 * 1024
+
+
+class MultipartArquivo:
+    """
+    Corpo multipart/form-data (entity_content JSON + VersionData binário) lido
+    sob demanda do disco. Expõe __len__ para o requests enviar Content-Length
+    sem montar o corpo em memória nem codificar o arquivo em base64.
+    """
+
+    def __init__(self, entity: dict, file_path: str, filename: str):
+        self.boundary = uuid.uuid4().hex
+        head = (
+            f"--{self.boundary}\r\n"
+            'Content-Disposition: form-data; name="entity_content"\r\n'
+            "Content-Type: application/json\r\n\r\n"
+            f"{json.dumps(entity)}\r\n"
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="VersionData"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self._partes = [head, file_path, tail]
+        self._tamanho = len(head) + os.path.getsize(file_path) + len(tail)
+        self._atual = None
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._tamanho
+
+    def _proxima_parte(self):
+        if self._atual is not None and hasattr(self._atual, "close"):
+            self._atual.close()
+        if not self._partes:
+            self._atual = None
+            return
+        parte = self._partes.pop(0)
+        self._atual = open(parte, "rb") if isinstance(parte, str) else _Bytes(parte)
+
+    def read(self, size: int = -1) -> bytes:
+        size = BLOCO if size is None or size < 0 else size
+        if self._atual is None:
+            self._proxima_parte()
+        while self._atual is not None:
+            dados = self._atual.read(size)
+            if dados:
+                return dados
+            self._proxima_parte()
+        return b""
+
+
+class _Bytes:
+    def __init__(self, dados: bytes):
+        self._dados = memoryview(dados)
+
+    def read(self, size: int) -> bytes:
+        pedaco, self._dados = self._dados[:size], self._dados[size:]
+        return bytes(pedaco)
+
+
+_renovacao = threading.Lock()
+
+
+def _renovar_sessao(sf, sessao_expirada: str) -> None:
+    """
+    Renova a sessão do cliente compartilhado pelos uploads paralelos: um
+    thread por vez, e só se ninguém renovou desde que esta sessão levou 401.
+    """
+    with _renovacao:
+        if sf.session_id == sessao_expirada:
+            sf._refresh_session()
+
+
+def criar_content_version(sf, file_path: str, dados: dict) -> str:
+    """
+    Cria um ContentVersion com upload multipart em streaming. Retorna o Id.
+    Em 401 renova a sessão e reenvia com um corpo novo (o anterior já foi consumido).
+    """
+    entity = {"PathOnClient": os.path.basename(file_path), **dados}
+    for tentativa in range(2):
+        body = MultipartArquivo(entity, file_path, os.path.basename(file_path))
+        sessao = sf.session_id
+        headers = {**sf.headers, "Content-Type": body.content_type}
+        result = sf.session.request("POST", f"{sf.base_url}sobjects/ContentVersion/", data=body, headers=headers)
+        if result.status_code == 401 and tentativa == 0:
+            _renovar_sessao(sf, sessao)
+            continue
+        break
+    if result.status_code >= 300:
+        exception_handler(result, name="ContentVersion")
+    return result.json()["id"]
+
+
+def anexar_arquivos_salesforce(arquivos: Sequence[Tuple[str, str]], entidade_id: str, sf=None,
+                               enviados: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Envia vários arquivos [(caminho, título), ...] e vincula todos a entidade_id.
+    Uploads em paralelo na mesma sessão; depois uma query para os
+    ContentDocumentId e um único composite/sobjects com os ContentDocumentLink.
+    `enviados` ({caminho: ContentVersion Id}) é atualizado a cada upload
+    concluído, mesmo se outro falhar; caminhos que já estão nele não são
+    enviados de novo. Retorna os ContentDocumentId vinculados.
+    """
+    existentes = [(p, t) for p, t in arquivos if os.path.exists(p)]
+    for p, _ in arquivos:
+        if not os.path.exists(p):
+            print(f"⚠️ Arquivo não encontrado: {p}")
+    if not existentes:
+        return []
+
+    enviados = {} if enviados is None else enviados
+    pendentes = [(p, t) for p, t in existentes if p not in enviados]
+    sf = sf or sf_connect()
+    if pendentes:
+        with ThreadPoolExecutor(max_workers=min(UPLOADS_SIMULTANEOS, len(pendentes))) as pool:
+            # Threads do pool não herdam ContextVars (origem/condomínio da governança):
+            # cada upload roda numa cópia do contexto de quem chamou
+            futuros = [
+                pool.submit(contextvars.copy_context().run, criar_content_version, sf, p, {"Title": t})
+                for p, t in pendentes
+            ]
+            erro = None
+            for (p, _), futuro in zip(pendentes, futuros):
+                try:
+                    enviados[p] = futuro.result()
+                except Exception as e:
+                    erro = erro or e
+        if erro:
+            raise erro
+    version_ids = [enviados[p] for p, _ in existentes]
+    print(f"✅ ContentVersion criados: {version_ids}")
+
+    docs = sf.query(
+        f"SELECT Id, ContentDocumentId FROM ContentVersion WHERE Id IN {soql_in(version_ids)}"
+    )["records"]
+    doc_ids = [d["ContentDocumentId"] for d in docs]
+
+    resultado = sf.restful("composite/sobjects", method="POST", json={
+        "allOrNone": True,
+        "records": [
+            {
+                "attributes": {"type": "ContentDocumentLink"},
+                "ContentDocumentId": doc_id,
+                "LinkedEntityId": entidade_id,
+                "ShareType": "V",
+                "Visibility": "AllUsers",
+            }
+            for doc_id in doc_ids
+        ],
+    })
+    erros = [r.get("errors") for r in resultado or [] if not r.get("success")]
+    if erros:
+        raise RuntimeError(f"Falha ao vincular arquivos a {entidade_id}: {erros}")
+    print(f"🔗 {len(doc_ids)} arquivo(s) vinculados a {entidade_id}")
+    return doc_ids
+
+
+def anexar_arquivo_salesforce(file_path, ticket_id, titulo="Anexo", sf=None) -> Optional[str]:
+    """Envia um arquivo local e vincula ao registro informado (Ticket/Opportunity)."""
+    doc_ids = anexar_arquivos_salesforce([(file_path, titulo)], ticket_id, sf=sf)
+    return doc_ids[0] if doc_ids else None
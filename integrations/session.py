@@ -0,0 +1,95 @@
+# integrations/session.py
+"""
+Sessão Salesforce compartilhada.
+
+O session id e a instância ficam no cache do Django (Redis), então web,
+workers do Celery e scripts de linha de comando reaproveitam o mesmo login.
+Um novo login só acontece quando a sessão expira no cache ou quando o
+Salesforce responde 401 (INVALID_SESSION_ID).
+"""
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from simple_salesforce import Salesforce, SalesforceLogin
+
+from core.params import Grupo
+from integrations import governanca
+from integrations.resilience import BREAKER_SALESFORCE, ResilientSession
+
+SESSION_CACHE_KEY = "sf_session_v1"
+SESSION_LOCK_KEY = "sf_session_v1:lock"
+# Timeout padrão de sessão do Salesforce é 2h; renovamos antes disso ou no 401
+SESSION_TTL = getattr(settings, "SF_SESSION_TTL", 60 * 60 * 2)
+LOCK_TTL = 30
+
+# Um único requests.Session por processo reaproveita as conexões HTTP (keep-alive);
+# todas as chamadas (login inclusive) passam pelo timeout, pelo circuit breaker
+# e pela contagem/orçamento de API (integrations.governanca)
+_http = ResilientSession(BREAKER_SALESFORCE, antes=governanca.verificar, depois=governanca.registrar)
+
+# Parâmetros SF_* (tabela Parametro) com fallback para settings.SF, lidos no login
+SF_PARAMS = Grupo("SF_", padroes=getattr(settings, "SF", {}))
+
+
+def _credentials() -> dict:
+    """Credenciais vindas de Parametro, com fallback para settings.SF."""
+    username = SF_PARAMS.USERNAME
+    password = SF_PARAMS.PASSWORD
+    token = SF_PARAMS.TOKEN
+    domain = (SF_PARAMS.DOMAIN or "login").strip()
+    if not (username and password and token):
+        raise RuntimeError("Credenciais do Salesforce ausentes. Configure SF_USERNAME/SF_PASSWORD/SF_TOKEN.")
+    return {"username": username, "password": password, "security_token": token, "domain": domain}
+
+
+def _login() -> Tuple[str, str]:
+    session_id, instance = SalesforceLogin(session=_http, **_credentials())
+    cache.set(SESSION_CACHE_KEY, {"session_id": session_id, "instance": instance}, SESSION_TTL)
+    print(f"🔐 Nova sessão Salesforce criada ({instance})")
+    return session_id, instance
+
+
+def get_session(stale_session_id: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Retorna (session_id, instance) do cache; faz login apenas se não houver
+    sessão ou se a sessão em cache for a mesma que acabou de receber 401.
+    """
+    cached = cache.get(SESSION_CACHE_KEY)
+    if cached and cached["session_id"] != stale_session_id:
+        return cached["session_id"], cached["instance"]
+
+    # Evita que vários processos façam login ao mesmo tempo
+    if cache.add(SESSION_LOCK_KEY, 1, LOCK_TTL):
+        try:
+            return _login()
+        finally:
+            cache.delete(SESSION_LOCK_KEY)
+
+    # Outro processo está logando: aguarda a sessão nova aparecer no cache
+    deadline = time.monotonic() + LOCK_TTL
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        cached = cache.get(SESSION_CACHE_KEY)
+        if cached and cached["session_id"] != stale_session_id:
+            return cached["session_id"], cached["instance"]
+    return _login()
+
+
+def invalidate_session() -> None:
+    cache.delete(SESSION_CACHE_KEY)
+
+
+def sf_connect() -> Salesforce:
+    """
+    Cliente Salesforce usando a sessão compartilhada.
+    No 401 o simple_salesforce chama _salesforce_login_partial, que aqui
+    busca a sessão renovada (ou renova) no cache compartilhado.
+    Com o circuito aberto levanta SalesforceIndisponivel sem tocar na rede.
+    """
+    BREAKER_SALESFORCE.verificar(reservar_teste=False)
+    session_id, instance = get_session()
+    sf = Salesforce(session_id=session_id, instance=instance, session=_http)
+    sf._salesforce_login_partial = lambda: get_session(stale_session_id=sf.session_id)
+    return sf
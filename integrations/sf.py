@@ -1,22 +1,13 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterator, List, Optional
 from simple_salesforce import Salesforce
 from django.conf import settings
-
-def sf_connect() -> Salesforce:
-    return Salesforce(
-        username=settings.SF["USERNAME"],
-        password=settings.SF["PASSWORD"],
-        security_token=settings.SF["TOKEN"],
-        domain=settings.SF["DOMAIN"],
-    )
+from integrations.metadata import field_names
+from integrations.session import sf_connect
+from integrations.soql import soql_datetime
 
 def get_all_fields(sf: Salesforce, sobject: str) -> List[str]:
-    desc = getattr(sf, sobject).describe()
-    fields = [f["name"] for f in desc["fields"]]
-    if "Id" in fields:
-        fields.remove("Id")
-        fields = ["Id"] + fields
-    return fields
+    return field_names(sf, sobject)
 
 def build_where_clause(created_filter: Optional[str]) -> str:
     if not created_filter:
@@ -27,15 +18,28 @@ def build_where_clause(created_filter: Optional[str]) -> str:
         return f" WHERE CreatedDate = {cf}"
     return f" WHERE CreatedDate >= {created_filter}"
 
-def fetch_visitor_logs(created_filter: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
-    sf = sf_connect()
+def iter_visitor_logs(created_filter: Optional[str] = None, limit: Optional[int] = None,
+                      since: Optional[datetime] = None, sf: Optional[Salesforce] = None,
+                      ordenar: bool = False) -> Iterator[dict]:
+    """
+    Percorre os Visitor Logs página a página (query_all_iter), sem carregar tudo
+    em memória. Com since, traz só o que mudou desde então. Com since ou
+    ordenar=True, vem em ordem de SystemModstamp (quem grava marca por lote precisa disso).
+    """
+    sf = sf or sf_connect()
     sobject = settings.SF["SOBJECT"]
     fields = get_all_fields(sf, sobject)
-    where_clause = build_where_clause(created_filter)
-    soql = f"SELECT {', '.join(fields)} FROM {sobject}{where_clause}"
+    soql = f"SELECT {', '.join(fields)} FROM {sobject}{build_where_clause(created_filter)}"
+    if since:
+        soql += " AND " if " WHERE " in soql else " WHERE "
+        soql += f"SystemModstamp >= {soql_datetime(since)}"
+    if since or ordenar:
+        soql += " ORDER BY SystemModstamp"
     if limit:
         soql += f" LIMIT {int(limit)}"
-    recs = sf.query_all(soql).get("records", [])
-    for r in recs:
+    for r in sf.query_all_iter(soql):
         r.pop("attributes", None)
-    return recs
+        yield r
+
+def fetch_visitor_logs(created_filter: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    return list(iter_visitor_logs(created_filter=created_filter, limit=limit))
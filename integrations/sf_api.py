@@ -1,47 +1,16 @@
 from typing import Dict, Iterable, Optional, List
-from django.core.cache import cache
 from simple_salesforce import Salesforce
-from condominio.models import Condominio
-from portaria.models import Parametro  # ajuste se seu Parametro estiver em outro app
-
-PARAM_TTL = 60
-PARAM_KEYS = ["SF_USERNAME", "SF_PASSWORD", "SF_TOKEN", "SF_DOMAIN"]
-
-def _fetch_params(keys: Iterable[str]) -> Dict[str, Optional[str]]:
-    rows = (Parametro.objects
-            .filter(ParametroNome__in=list(keys))
-            .values_list("ParametroNome", "ParametroValor"))
-    return {k: v for k, v in rows}
-
-def get_params(keys: Iterable[str]) -> Dict[str, Optional[str]]:
-    keys = list(keys)
-    cache_key = "sf_params_v1"
-    blob = cache.get(cache_key) or {}
-    missing = [k for k in keys if k not in blob]
-    if missing:
-        fresh = _fetch_params(missing)
-        blob.update(fresh)
-        cache.set(cache_key, blob, PARAM_TTL)
-    return {k: blob.get(k) for k in keys}
-
-def sf_connect() -> Salesforce:
-    p = get_params(PARAM_KEYS)
-    username = p.get("SF_USERNAME")
-    password = p.get("SF_PASSWORD")
-    token    = p.get("SF_TOKEN")
-    domain   = (p.get("SF_DOMAIN") or "login").strip()
-    if not (username and password and token):
-        raise RuntimeError("Credenciais SF ausentes em Parametro (SF_USERNAME, SF_PASSWORD, SF_TOKEN).")
-    return Salesforce(username=username, password=password, security_token=token, domain=domain)
+from integrations import idmap
+from integrations.metadata import pick_field
+from integrations.query_cache import query_all_cached
+from integrations.registros import TicketSF, VisitorLogSF
+from integrations.session import sf_connect
 
 # Helpers de filtro
 def resolve_sf_property_id(condominio_id: Optional[int]) -> Optional[str]:
     if not condominio_id:
         return None
-    try:
-        return Condominio.objects.only("sf_property_id").get(pk=condominio_id).sf_property_id or None
-    except Condominio.DoesNotExist:
-        return None
+    return idmap.condominio_sf(condominio_id) or None
 
 from datetime import datetime
 from django.utils.timezone import make_naive
@@ -51,8 +20,7 @@ def _iso(dt: datetime) -> str:
     dt = make_naive(dt) if hasattr(dt, "tzinfo") and dt.tzinfo else dt
     return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-def fetch_tickets(*, sf_property_id: Optional[str], dt_ini: Optional[datetime], dt_fim: Optional[datetime], q: str = "", limit: int = 500) -> List[dict]:
-    sf = sf_connect()
+def fetch_tickets(*, sf_property_id: Optional[str], dt_ini: Optional[datetime], dt_fim: Optional[datetime], q: str = "", limit: int = 500, escopo=None) -> List[TicketSF]:
     fields = [
         "Id", "Name", "CreatedDate", "LastModifiedDate",
         "reda__Status__c", "reda__Property__c",
@@ -77,38 +45,18 @@ def fetch_tickets(*, sf_property_id: Optional[str], dt_ini: Optional[datetime],
       ORDER BY CreatedDate DESC
       LIMIT {int(limit)}
     """
-    recs = sf.query_all(soql).get("records", [])
-    for r in recs:
-        r.pop("attributes", None)
-    return recs
-
-# --- NOVO helper: escolher campos que existem via describe --------------------
-def _pick_fields(sf_obj, candidates):
-    """
-    Retorna a primeira opção de candidates que existir no objeto (ou None).
-    candidates pode ser string ou lista de strings (ordem de preferência).
-    """
-    if isinstance(candidates, str):
-        candidates = [candidates]
-    # faça um describe só uma vez
-    desc = sf_obj.describe()
-    available = {f["name"] for f in desc.get("fields", [])}
-    for c in candidates:
-        if c in available:
-            return c
-    return None
-
+    return TicketSF.decodificar(query_all_cached(soql, escopo=escopo).get("records", []))
 
 # --- SUBSTITUA sua fetch_visitor_logs por esta versão robusta -----------------
-def fetch_visitor_logs(*, sf_property_id: Optional[str], dt_ini: Optional[datetime], dt_fim: Optional[datetime], q: str = "", limit: int = 500) -> List[dict]:
+def fetch_visitor_logs(*, sf_property_id: Optional[str], dt_ini: Optional[datetime], dt_fim: Optional[datetime], q: str = "", limit: int = 500, escopo=None) -> List[VisitorLogSF]:
     sf = sf_connect()
-    obj = sf.__getattr__("reda__Visitor_Log__c")  # objeto alvo
+    obj = "reda__Visitor_Log__c"  # objeto alvo
 
-    # Descobre nomes reais de campos no seu org (se existirem)
-    fld_property   = _pick_fields(obj, ["reda__Property__c", "Property__c"])
-    fld_visitor    = _pick_fields(obj, ["reda__Visitor_Name__c", "Visitor_Name__c", "VisitorName__c", "reda__Visitor__c", "Contact__c", "reda__Contact__c"])
-    fld_access     = _pick_fields(obj, ["reda__Access_Type__c", "Access_Type__c", "AccessType__c"])
-    fld_result     = _pick_fields(obj, ["reda__Result__c", "Result__c", "Access_Result__c"])
+    # Descobre nomes reais de campos no seu org (se existirem); describe vem do cache
+    fld_property   = pick_field(sf, obj, ["reda__Property__c", "Property__c"])
+    fld_visitor    = pick_field(sf, obj, ["reda__Visitor_Name__c", "Visitor_Name__c", "VisitorName__c", "reda__Visitor__c", "Contact__c", "reda__Contact__c"])
+    fld_access     = pick_field(sf, obj, ["reda__Access_Type__c", "Access_Type__c", "AccessType__c"])
+    fld_result     = pick_field(sf, obj, ["reda__Result__c", "Result__c", "Access_Result__c"])
 
     # Campos sempre presentes
     select_fields = ["Id", "Name", "CreatedDate"]
@@ -138,7 +86,9 @@ def fetch_visitor_logs(*, sf_property_id: Optional[str], dt_ini: Optional[dateti
       ORDER BY CreatedDate DESC
       LIMIT {int(limit)}
     """
-    recs = sf.query_all(soql).get("records", [])
-    for r in recs:
-        r.pop("attributes", None)
-    return recs
+    recs = query_all_cached(soql, escopo=escopo, sf=sf).get("records", [])
+    # Campos ausentes no org ficam vazios no objeto
+    return VisitorLogSF.decodificar(
+        recs, property_id=fld_property, visitante=fld_visitor,
+        tipo_acesso=fld_access, resultado=fld_result,
+    )
@@ -0,0 +1,150 @@
+# integrations/sf_paginacao.py
+"""
+Paginação no servidor para as telas que listam registros do Salesforce.
+
+Em vez de query_all + Paginator sobre a lista inteira, busca só o lote do
+Salesforce (batchSize=200) que contém a página pedida. O nextRecordsUrl de
+cada lote é guardado na sessão do usuário, então ir para a próxima página ou
+voltar não refaz a query desde o início; o total vem do totalSize da
+resposta. Os lotes passam pelo query_cache (TTL, invalidação e
+single-flight).
+
+SFPaginator.get_page() devolve um django.core.paginator.Page, então os
+templates continuam usando has_next, number, paginator.num_pages etc. Com
+`transformar` (ex.: VeiculoSF.de_registro, de integrations.registros) as
+linhas da página são decodificadas em objetos; sem ele ficam dicts.
+"""
+import hashlib
+from math import ceil
+from typing import Any, Callable, Dict, Optional
+
+from django.core.paginator import Page
+from simple_salesforce.exceptions import SalesforceError
+
+from integrations import query_cache
+from integrations.session import sf_connect
+
+TAMANHO_LOTE = 200          # mínimo aceito pelo Sforce-Query-Options
+SESSAO_CHAVE = "sf_cursores"
+# Quantas consultas diferentes (filtros) guardamos na sessão por usuário
+MAX_CONSULTAS_SESSAO = 5
+
+
+class SFPaginator:
+    def __init__(self, request, soql: str, per_page: int = 20, escopo=None,
+                 objeto: Optional[str] = None, transformar: Optional[Callable[[dict], Any]] = None):
+        self.request = request
+        self.soql = query_cache.normalizar(soql)
+        self.per_page = per_page
+        self.escopo = escopo
+        self.objeto = objeto or query_cache.objeto_da_query(self.soql)
+        self.transformar = transformar
+        self._sf = None
+        self._sem_cache = False
+
+        id_consulta = f"{self.soql}|{query_cache.hash_escopo(escopo)}"
+        self._id = hashlib.sha1(id_consulta.encode()).hexdigest()[:16]
+        self._estado = self._carregar_estado()
+
+    # -- estado na sessão ----------------------------------------------------
+    def _carregar_estado(self) -> Dict:
+        consultas = self.request.session.get(SESSAO_CHAVE, {})
+        return consultas.get(self._id) or {"cursores": {}, "total": None}
+
+    def _salvar_estado(self) -> None:
+        consultas = self.request.session.get(SESSAO_CHAVE, {})
+        consultas.pop(self._id, None)
+        consultas[self._id] = self._estado
+        # Mantém só as consultas mais recentes (dict preserva a ordem de inserção)
+        while len(consultas) > MAX_CONSULTAS_SESSAO:
+            consultas.pop(next(iter(consultas)))
+        self.request.session[SESSAO_CHAVE] = consultas
+
+    # -- API do Paginator ----------------------------------------------------
+    @property
+    def count(self) -> int:
+        if self._estado["total"] is None:
+            self._lote(0)
+        return self._estado["total"]
+
+    @property
+    def num_pages(self) -> int:
+        return max(1, ceil(self.count / self.per_page))
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def get_page(self, number) -> Page:
+        try:
+            number = max(1, int(number))
+        except (TypeError, ValueError):
+            number = 1
+
+        if self._estado["total"] is not None and number > self.num_pages:
+            number = self.num_pages
+
+        inicio = (number - 1) * self.per_page
+        lote = self._lote(inicio // TAMANHO_LOTE)
+        if number > self.num_pages:
+            # Página além do fim (ex.: o total diminuiu): vai para a última
+            return self.get_page(self.num_pages)
+
+        offset = inicio % TAMANHO_LOTE
+        registros = lote.get("records", [])[offset:offset + self.per_page]
+        if self.transformar:
+            registros = [self.transformar(r) for r in registros]
+        else:
+            registros = [{k: v for k, v in r.items() if k != "attributes"} for r in registros]
+        self._salvar_estado()
+        return Page(registros, number, self)
+
+    # -- lotes do Salesforce -------------------------------------------------
+    @property
+    def sf(self):
+        if self._sf is None:
+            self._sf = sf_connect()
+        return self._sf
+
+    def _lote(self, indice: int) -> dict:
+        def buscar():
+            headers = {"Sforce-Query-Options": f"batchSize={TAMANHO_LOTE}"}
+            if indice == 0:
+                return self.sf.query(self.soql, headers=headers)
+            url = self._cursor(indice)
+            if url is None:
+                return {"records": [], "totalSize": self._estado["total"] or 0, "done": True}
+            try:
+                return self.sf.query_more(url, identifier_is_url=True, headers=headers)
+            except SalesforceError as e:
+                # Query locator expirado: refaz a navegação a partir do primeiro lote
+                if self._sem_cache:
+                    raise
+                print(f"⚠️ Cursor do Salesforce inválido, refazendo a consulta: {e}")
+                self._estado["cursores"] = {}
+                self._sem_cache = True
+                return self._lote(indice)
+
+        if self._sem_cache:
+            resultado = buscar()
+        else:
+            resultado = query_cache.cached(
+                f"{self.soql} /* lote {indice} */", buscar, escopo=self.escopo, objeto=self.objeto
+            )
+
+        self._estado["total"] = resultado.get("totalSize", 0)
+        if resultado.get("nextRecordsUrl"):
+            self._estado["cursores"][str(indice + 1)] = resultado["nextRecordsUrl"]
+        return resultado
+
+    def _cursor(self, indice: int) -> Optional[str]:
+        """nextRecordsUrl que leva ao lote `indice`, andando a partir do último conhecido."""
+        cursores = self._estado["cursores"]
+        if str(indice) in cursores:
+            return cursores[str(indice)]
+        conhecidos = [int(i) for i in cursores if int(i) < indice]
+        for i in range(max(conhecidos, default=0), indice):
+            lote = self._lote(i)
+            if not lote.get("nextRecordsUrl"):
+                return None
+        return cursores.get(str(indice))
@@ -2,26 +2,11 @@
 import os
 from typing import Optional, Dict
 from simple_salesforce import Salesforce
-from portaria.models import Parametro
 from django.conf import settings
-from core.params import get_param
-from integrations.salesforce_file import anexar_arquivo_salesforce
-
-SF_USERNAME = get_param("SF_USERNAME", "xx")
-SF_PASSWORD = get_param("SF_PASSWORD", "xx")
-SF_TOKEN    = get_param("SF_TOKEN", "xx")
-SF_DOMAIN   = get_param("SF_DOMAIN", "xx")
-
-print(f"SF_USERNAME: {SF_USERNAME}")
-print(f"SF_PASSWORD: {'set' if SF_PASSWORD else 'not set'}") 
-print(f"SF_TOKEN: {'set' if SF_TOKEN else 'not set'}")
-print(f"SF_DOMAIN: {SF_DOMAIN}")
-
-def sf_connect() -> Salesforce:
-    print("Conectando ao Salesforce sf_connect()...")
-    if not all([SF_USERNAME, SF_PASSWORD, SF_TOKEN]):
-        raise RuntimeError("Credenciais do Salesforce ausentes. Configure SF_USERNAME/SF_PASSWORD/SF_TOKEN.")
-    return Salesforce(username=SF_USERNAME, password=SF_PASSWORD, security_token=SF_TOKEN)
+from integrations.query_cache import invalidar
+from integrations.session import sf_connect
+from integrations.soql import chunked, soql_in
+from integrations.salesforce_file import anexar_arquivos_salesforce
 
 def criar_t_salesforce(
     sf: Salesforce,
@@ -56,6 +41,7 @@ def criar_t_salesforce(
     payload = {k:v for k,v in payload.items() if v not in (None, "")}
     print(f"Payload filtrado: {payload}")
     teste = sobj.create(payload)
+    invalidar("reda__Ticket__c")
     print(f"Resposta da criação do t: {teste}")
     return teste
 
@@ -69,11 +55,32 @@ def build_package_fields_from_encomenda(encomenda) -> Dict[str, str]:
     oportunidade = getattr(encomenda.destinatario, "sf_opportunity_id", "")
     return {"pacote_nome": nome, "pacote_para": para, "pacote_desc": desc, "pacote_tipo": tipo, "pacote_oportunidade": oportunidade}
 
-from typing import Optional, Dict
 
-def sync_encomenda_to_salesforce(encomenda) -> Optional[Dict[str, str]]:
+def anexar_arquivos_encomenda(encomenda, ticket_id: str, sf=None, enviados: Optional[Dict[str, str]] = None) -> None:
+    """
+    Envia arquivo_01..05 da Encomenda e vincula ao Ticket (só quando há oportunidade).
+    `enviados` guarda o progresso por arquivo (ver anexar_arquivos_salesforce).
+    """
+    opportunity_id = getattr(encomenda.destinatario, "sf_opportunity_id", "")
+    if not opportunity_id:
+        return
+    print(f"📎 Vinculando T {ticket_id} à Opportunity {opportunity_id}...")
+
+    base_dir = settings.MEDIA_ROOT
+    arquivos = []
+    for i in range(1, 6):
+        arquivo = getattr(encomenda, f"arquivo_0{i}")
+        if arquivo:
+            arquivos.append((os.path.join(base_dir, arquivo.name), f"Encomenda {encomenda.id} - Arquivo {i}"))
+    if arquivos:
+        print(f"📤 Anexando {len(arquivos)} arquivo(s) ao T {ticket_id}...")
+        anexar_arquivos_salesforce(arquivos, ticket_id, sf=sf, enviados=enviados)
+
+
+def sync_encomenda_to_salesforce(encomenda, anexar: bool = True) -> Optional[Dict[str, str]]:
     """
     Cria um reda__T__c no Salesforce a partir da Encomenda.
+    Com anexar=False os arquivos ficam para anexar_arquivos_encomenda (fila de integração).
     Retorna um dicionário com {"id": <ticket_id>, "senha": <senha>} ou None em caso de falha.
     """
     print("🔄 Tentando criar T no Salesforce...")
@@ -123,19 +130,8 @@ def sync_encomenda_to_salesforce(encomenda) -> Optional[Dict[str, str]]:
         print(f"✅ Ticket criado: {ticket_id}")
         print(f"🔑 Senha retornada: {senha_pacote}")
 
-        # 🔗 Se houver oportunidade, vincula arquivos
-        if fields["pacote_oportunidade"]:
-            opportunity_id = fields["pacote_oportunidade"]
-            print(f"📎 Vinculando T {ticket_id} à Opportunity {opportunity_id}...")
-
-            base_dir = settings.MEDIA_ROOT
-            for i in range(1, 6):
-                arquivo = getattr(encomenda, f"arquivo_0{i}")
-                if arquivo:
-                    file_path = os.path.join(base_dir, arquivo.name)
-                    titulo = f"Encomenda {encomenda.id} - Arquivo {i}"
-                    print(f"📤 Anexando arquivo {file_path} com título '{titulo}'...")
-                    anexar_arquivo_salesforce(file_path, ticket_id, titulo)
+        if anexar:
+            anexar_arquivos_encomenda(encomenda, ticket_id)
 
         # ✅ Retorna tanto o ID quanto a senha
         return {"id": ticket_id, "senha": senha_pacote}
@@ -154,8 +150,9 @@ def delete_encomenda_from_salesforce(t_id: str) -> bool:
         return False
 
     try:
-        sf = sf_connect()  # 👈 reaproveita a função existente
+        sf = sf_connect()
         sf.reda__Ticket__c.delete(t_id)  # ajuste o objeto correto
+        invalidar("reda__Ticket__c")
         return True
     except Exception as e:
         print(f"⚠️ Erro ao excluir encomenda no Salesforce: {e}")
@@ -171,8 +168,9 @@ def delete_acesso_from_salesforce(sf_visitor_log: str) -> bool:
         return False
 
     try:
-        sf = sf_connect()  # 👈 reaproveita a função existente
+        sf = sf_connect()
         sf.reda__Visitor_Log__c.delete(sf_visitor_log)  # ajuste o objeto correto
+        invalidar("reda__Visitor_Log__c")
         return True
     except Exception as e:
         print(f"⚠️ Erro ao excluir acesso no Salesforce: {e}")
@@ -201,8 +199,28 @@ def update_encomenda_in_salesforce(encomenda):
         # Atualiza no objeto correspondente
         # Ajuste o objeto para o correto da sua org (Case, T__c, Encomenda__c, etc.)
         sf.reda__Ticket__c.update(encomenda.salesforce_ticket_id, data)
+        invalidar("reda__Ticket__c")
         return True
 
     except Exception as e:
         print(f"⚠️ Erro ao atualizar encomenda no Salesforce: {e}")
         return False
+
+
+def buscar_senhas_tickets(sf, ticket_ids) -> Dict[str, str]:
+    """
+    Busca Password__c de vários Tickets com uma query por lote de Ids.
+    Retorna {ticket_id: senha}; a chave usa os 15 primeiros caracteres do Id,
+    que valem tanto para Ids de 15 quanto de 18 caracteres.
+    """
+    senhas = {}
+    for lote in chunked(sorted(set(ticket_ids))):
+        soql = f"""
+            SELECT Id, Password__c
+            FROM reda__Ticket__c
+            WHERE Id IN {soql_in(lote)}
+            AND Password__c != null
+        """
+        for r in sf.query_all(soql).get("records", []):
+            senhas[r["Id"][:15]] = r["Password__c"]
+    return senhas
@@ -0,0 +1,93 @@
+# integrations/singleflight.py
+"""
+Coalescência de chamadas idênticas (single-flight).
+
+Quando vários requests pedem a mesma coisa ao mesmo tempo (troca de turno,
+todos os porteiros abrindo a mesma tela), só um faz a chamada ao Salesforce e
+os demais esperam e recebem o mesmo resultado:
+
+- no mesmo processo, as threads esperam num threading.Event;
+- entre processos (gunicorn/Celery), um lock no cache elege o líder e o
+  resultado é publicado no cache por alguns segundos para quem esperou.
+
+Se o líder falhar ou demorar mais que o timeout, quem esperava faz a própria
+chamada.
+"""
+import copy
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from django.core.cache import cache
+
+LOCK_TTL = 30
+# Quanto tempo o resultado fica disponível para os processos que aguardavam
+RESULTADO_TTL = 5
+
+_AUSENTE = object()
+_mutex = threading.Lock()
+_em_voo: Dict[str, "_Chamada"] = {}
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+def fazer(chave: str, fn: Callable[[], Any], timeout: int = LOCK_TTL) -> Any:
+    """Executa fn() uma única vez por chave entre as chamadas simultâneas."""
+    with _mutex:
+        chamada = _em_voo.get(chave)
+        lider = chamada is None
+        if lider:
+            chamada = _em_voo[chave] = _Chamada()
+
+    if not lider:
+        if not chamada.evento.wait(timeout):
+            return fn()
+        if chamada.erro is not None:
+            raise chamada.erro
+        # Cópia própria: as views alteram os registros recebidos
+        return copy.deepcopy(chamada.resultado)
+
+    try:
+        resultado = _entre_processos(chave, fn, timeout)
+        # Os que esperam copiam desta versão intacta, não da que o líder vai alterar
+        chamada.resultado = copy.deepcopy(resultado)
+        return resultado
+    except Exception as e:
+        chamada.erro = e
+        raise
+    finally:
+        with _mutex:
+            _em_voo.pop(chave, None)
+        chamada.evento.set()
+
+
+def _entre_processos(chave: str, fn: Callable[[], Any], timeout: int) -> Any:
+    k_lock = f"sflight:{chave}:lock"
+    k_res = f"sflight:{chave}:res"
+
+    if cache.add(k_lock, 1, timeout):
+        try:
+            resultado = fn()
+            cache.set(k_res, resultado, RESULTADO_TTL)
+            return resultado
+        finally:
+            cache.delete(k_lock)
+
+    # Outro processo está buscando: aguarda o resultado publicado
+    limite = time.monotonic() + timeout
+    espera = 0.05
+    while time.monotonic() < limite:
+        time.sleep(espera)
+        espera = min(espera * 2, 0.5)
+        resultado = cache.get(k_res, _AUSENTE)
+        if resultado is not _AUSENTE:
+            return resultado
+        if cache.get(k_lock) is None:
+            # O líder terminou sem publicar (erro): busca por conta própria
+            break
+    return fn()
@@ -0,0 +1,38 @@
+# integrations/soql.py
+"""Pequenos utilitários para montar SOQL em lote."""
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+# Mantém a URL do GET /query bem abaixo do limite (~16k) com Ids de 18 chars
+IN_CHUNK_SIZE = 200
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("'", "\\'")
+
+
+def soql_in(values: Iterable[str]) -> str:
+    """('a', 'b') pronto para usar em WHERE campo IN ..."""
+    return "(" + ", ".join(f"'{escape(v)}'" for v in values) + ")"
+
+
+def chunked(values: Iterable, size: int = IN_CHUNK_SIZE) -> Iterator[List]:
+    it = iter(values)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def soql_datetime(dt) -> str:
+    """Literal datetime SOQL em UTC (2025-09-10T00:00:00Z)."""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_sf_datetime(value: Optional[str]) -> Optional[datetime]:
+    """'2025-10-31T15:00:00.000+0000' → datetime aware em UTC."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
@@ -0,0 +1,89 @@
+# integrations/sync_acessos.py
+"""
+Sincronização incremental do status dos acessos (EventoAcesso) com o
+reda__Visitor_Log__c do Salesforce.
+
+Cada execução busca apenas os Visitor Logs das nossas propriedades com
+SystemModstamp >= último high-water mark gravado, aplica status e
+liberado_ate via bulk_update (somente nas linhas que mudaram) e avança a marca.
+"""
+from typing import Dict, List, Optional
+
+from django.db.models import Min
+
+from condominio.models import Condominio
+from integrations.idmap import id18
+from integrations.marcas import gravar_marca, ler_marca
+from integrations.session import sf_connect
+from integrations.soql import chunked, parse_sf_datetime, soql_datetime, soql_in
+from portaria.models import EventoAcesso
+
+MARCA = "acessos_visitor_log"
+LOTE_LOCAL = 500
+
+
+def _marca_inicial():
+    """Sem marca gravada: começa pelo acesso integrado mais antigo."""
+    return (
+        EventoAcesso.objects
+        .exclude(sf_visitor_log_id="")
+        .aggregate(m=Min("criado_em"))["m"]
+    )
+
+
+def _aplicar_lote(registros: List[dict]) -> int:
+    """Atualiza os EventoAcesso do lote que realmente mudaram. Retorna quantos."""
+    por_id: Dict[str, dict] = {r["Id"][:15]: r for r in registros}
+    # O Salesforce devolve Ids de 18; localmente pode estar gravado o de 15
+    eventos = (
+        EventoAcesso.objects
+        .filter(sf_visitor_log_id__in=[*por_id, *(id18(i) for i in por_id)])
+        .only("id", "sf_visitor_log_id", "resultado", "liberado_ate")
+    )
+
+    alterados = []
+    for evento in eventos:
+        r = por_id.get(evento.sf_visitor_log_id[:15])
+        if not r:
+            continue
+        status_sf = r.get("reda__Status__c") or evento.resultado
+        permitted = parse_sf_datetime(r.get("reda__Permitted_Till_Datetime__c")) or evento.liberado_ate
+        if status_sf != evento.resultado or permitted != evento.liberado_ate:
+            evento.resultado = status_sf
+            evento.liberado_ate = permitted
+            alterados.append(evento)
+
+    EventoAcesso.objects.bulk_update(alterados, ["resultado", "liberado_ate"])
+    return len(alterados)
+
+
+def sincronizar_acessos(sf=None) -> Dict[str, Optional[int]]:
+    """Executa uma rodada incremental. Retorna contadores para log/monitoramento."""
+    marca = ler_marca(MARCA) or _marca_inicial()
+    if marca is None:
+        return {"lidos": 0, "atualizados": 0}
+
+    property_ids = list(Condominio.objects.exclude(sf_property_id="").values_list("sf_property_id", flat=True))
+    if not property_ids:
+        return {"lidos": 0, "atualizados": 0}
+
+    sf = sf or sf_connect()
+    lidos = atualizados = 0
+    nova_marca = marca
+
+    for props in chunked(property_ids):
+        soql = f"""
+            SELECT Id, reda__Status__c, reda__Permitted_Till_Datetime__c, SystemModstamp
+            FROM reda__Visitor_Log__c
+            WHERE SystemModstamp >= {soql_datetime(marca)}
+            AND reda__Property__r.reda__Region__c IN {soql_in(props)}
+            ORDER BY SystemModstamp
+        """
+        for lote in chunked(sf.query_all_iter(soql), LOTE_LOCAL):
+            lidos += len(lote)
+            atualizados += _aplicar_lote(lote)
+            nova_marca = max(nova_marca, parse_sf_datetime(lote[-1]["SystemModstamp"]))
+
+    gravar_marca(MARCA, nova_marca)
+    print(f"🔄 Acessos: {lidos} Visitor Logs alterados desde {marca}, {atualizados} atualizados localmente.")
+    return {"lidos": lidos, "atualizados": atualizados}
@@ -0,0 +1,168 @@
+# integrations/sync_propriedades.py
+"""
+Sincronização de propriedades (reda__Property__c), unidades e moradores.
+
+Carrega condomínios, blocos e unidades locais em dicionários uma única vez,
+busca os contatos das leases com uma query de OpportunityContactRole por lote
+de Ids e aplica a diferença com bulk_create/bulk_update. Rodar de novo não
+duplica moradores: a chave é (unidade, sf_contact_id).
+"""
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+
+from condominio.models import Bloco, Condominio, Morador, Unidade
+from integrations import idmap
+from integrations.registros import PropriedadeSF
+from integrations.session import sf_connect
+from integrations.soql import chunked, soql_in
+from portaria import busca
+
+SOQL_PROPRIEDADES = """
+    SELECT Id, reda__Active_Lease__c, reda__Region__c, Name
+    FROM reda__Property__c
+"""
+
+
+def _carregar_locais():
+    condominios = {idmap.id18(c.sf_property_id): c for c in Condominio.objects.exclude(sf_property_id="")}
+    # Primeiro bloco (menor pk) de cada condomínio
+    blocos: Dict[int, Bloco] = {}
+    for b in Bloco.objects.filter(condominio__in=condominios.values()).order_by("pk"):
+        blocos.setdefault(b.condominio_id, b)
+    unidades: Dict[Tuple[int, str], Unidade] = {
+        (u.bloco_id, u.numero): u
+        for u in Unidade.objects.filter(bloco__in=blocos.values())
+    }
+    return condominios, blocos, unidades
+
+
+def buscar_contatos_leases(sf, lease_ids) -> Dict[str, List[dict]]:
+    """{lease_id[:15]: [{ContactId, Name, CCpfTxt__c}, ...]} com uma query por lote de 200 leases."""
+    contatos: Dict[str, List[dict]] = {}
+    for lote in chunked(sorted(set(lease_ids))):
+        soql = f"""
+            SELECT OpportunityId, ContactId, Contact.Name, Contact.CCpfTxt__c
+            FROM OpportunityContactRole
+            WHERE OpportunityId IN {soql_in(lote)}
+        """
+        for r in sf.query_all_iter(soql):
+            contato = r.get("Contact") or {}
+            contatos.setdefault(r["OpportunityId"][:15], []).append({
+                "ContactId": r.get("ContactId") or "",
+                "Name": contato.get("Name") or "",
+                "CCpfTxt__c": contato.get("CCpfTxt__c") or "",
+            })
+    return contatos
+
+
+def sincronizar_propriedades(sf=None) -> Dict:
+    sf = sf or sf_connect()
+    condominios, blocos, unidades = _carregar_locais()
+
+    propriedades = PropriedadeSF.decodificar(sf.query_all_iter(SOQL_PROPRIEDADES))
+
+    # 🔹 Unidades: diff por (bloco, numero)
+    novas_unidades: List[Unidade] = []
+    unidades_alteradas: List[Unidade] = []
+    vinculos = []  # (propriedade, condominio, unidade, lease_id)
+    for p in propriedades:
+        condominio = condominios.get(idmap.id18(p.region_id))
+        if not condominio:
+            print(f"⚠️ Condomínio não encontrado: {p.region_id}")
+            continue
+        bloco = blocos.get(condominio.pk)
+        if not bloco:
+            print(f"⚠️ Nenhum bloco encontrado para {condominio.nome}")
+            continue
+
+        numero = p.nome
+        unidade = unidades.get((bloco.pk, numero))
+        if unidade is None:
+            unidade = Unidade(bloco=bloco, numero=numero, andar="0", sf_unidade_id=p.id)
+            unidades[(bloco.pk, numero)] = unidade
+            novas_unidades.append(unidade)
+        elif unidade.sf_unidade_id != p.id:
+            unidade.sf_unidade_id = p.id
+            unidades_alteradas.append(unidade)
+        vinculos.append((p, condominio, unidade, p.lease_id))
+
+    contatos = buscar_contatos_leases(sf, [lease for *_, lease in vinculos if lease])
+
+    with transaction.atomic():
+        Unidade.objects.bulk_create(novas_unidades, batch_size=500)
+        Unidade.objects.bulk_update(unidades_alteradas, ["sf_unidade_id"], batch_size=500)
+
+        # 🔹 Moradores: diff por (unidade, sf_contact_id)
+        # Todas as unidades das propriedades: sem lease, os moradores antigos ficam inativos
+        unidade_ids = {u.pk for _, _, u, _ in vinculos}
+        existentes = {
+            (m.unidade_id, m.sf_contact_id): m
+            for m in Morador.objects.filter(unidade_id__in=unidade_ids).exclude(sf_contact_id="")
+        }
+        novos: List[Morador] = []
+        alterados: List[Morador] = []
+        vistos = set()
+        for _, _, unidade, lease_id in vinculos:
+            if not lease_id:
+                continue
+            for c in contatos.get(lease_id[:15], []):
+                chave = (unidade.pk, c["ContactId"])
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+                morador = existentes.get(chave)
+                if morador is None:
+                    novos.append(Morador(
+                        nome=c["Name"][:120],
+                        documento=c["CCpfTxt__c"][:20],
+                        unidade=unidade,
+                        sf_contact_id=c["ContactId"],
+                        sf_opportunity_id=lease_id,
+                    ))
+                    continue
+                dados = {
+                    "nome": c["Name"][:120],
+                    "documento": c["CCpfTxt__c"][:20],
+                    "sf_opportunity_id": lease_id,
+                    "ativo": True,
+                }
+                if any(getattr(morador, k) != v for k, v in dados.items()):
+                    for k, v in dados.items():
+                        setattr(morador, k, v)
+                    alterados.append(morador)
+
+        # Contatos que saíram da lease ficam inativos (Morador é PROTECT)
+        for chave, morador in existentes.items():
+            if chave not in vistos and morador.ativo:
+                morador.ativo = False
+                alterados.append(morador)
+
+        Morador.objects.bulk_create(novos, batch_size=500)
+        Morador.objects.bulk_update(
+            alterados, ["nome", "documento", "sf_opportunity_id", "ativo"], batch_size=500
+        )
+
+    # bulk_create/bulk_update não disparam signals
+    if novas_unidades or unidades_alteradas or novos or alterados:
+        idmap.invalidar()
+    busca.indexar_varios(novos + alterados, "nome")
+
+    detalhes = [
+        {
+            "propriedade": p.nome,
+            "lease_id": lease_id,
+            "condominio": condominio.nome,
+            "unidade": unidade.numero,
+        }
+        for p, condominio, unidade, lease_id in vinculos
+    ]
+    resumo = {
+        "total_processado": len(detalhes),
+        "unidades_criadas": len(novas_unidades),
+        "unidades_atualizadas": len(unidades_alteradas),
+        "moradores_criados": len(novos),
+        "moradores_atualizados": len(alterados),
+    }
+    print(f"🏢 Sincronização de propriedades: {resumo}")
+    return {**resumo, "detalhes": detalhes}
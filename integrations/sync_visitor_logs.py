@@ -0,0 +1,106 @@
+# integrations/sync_visitor_logs.py
+"""
+Réplica local de reda__Visitor_Log__c (modelo VisitorLog).
+
+Cada rodada busca, via queryAll, os Visitor Logs das nossas propriedades com
+SystemModstamp >= high-water mark, faz upsert em lotes por sf_id e remove
+os que foram excluídos no Salesforce. A tela de visitantes pré-aprovados
+consulta apenas essa tabela.
+"""
+from typing import Dict, Iterable, List
+
+from django.utils import timezone
+
+from integrations import idmap
+from integrations.marcas import gravar_marca, ler_marca
+from integrations.registros import VisitorLogSF
+from integrations.session import sf_connect
+from integrations.soql import chunked, parse_sf_datetime, soql_datetime, soql_in
+from portaria.models import VisitorLog
+
+MARCA = "visitor_log_replica"
+LOTE = 500
+
+CAMPOS_SOQL = [
+    "Id", "IsDeleted", "reda__Guest_Name__c", "reda__Guest_Phone__c",
+    "reda__Contact__r.Name", "reda__Property__c", "reda__Property__r.Name",
+    "reda__Property__r.reda__Region__c", "reda__Permitted_Till_Datetime__c",
+    "CreatedDate", "SystemModstamp",
+]
+CAMPOS_UPSERT = [
+    "nome", "telefone", "contato_nome", "sf_property_id", "unidade_nome", "sf_region_id",
+    "condominio", "unidade", "permitido_ate", "created_date", "sf_modificado_em", "raw", "imported_at",
+]
+
+
+def carregar_mapas() -> idmap.MapaIds:
+    """Ids do Salesforce → PKs locais (integrations.idmap), resolvidos sem query."""
+    return idmap.mapa()
+
+
+def registro_para_visitor_log(r: dict, mapas: idmap.MapaIds, agora=None) -> VisitorLog:
+    v = VisitorLogSF.de_registro(r)
+    raw = {k: val for k, val in r.items() if k != "attributes"}
+    return VisitorLog(
+        sf_id=v.id,
+        nome=v.nome[:200],
+        telefone=v.telefone[:40],
+        contato_nome=v.contato_nome[:120],
+        sf_property_id=v.property_id,
+        unidade_nome=v.unidade_nome[:120],
+        sf_region_id=v.region_id,
+        condominio_id=mapas.condominios.pk(v.region_id),
+        unidade_id=mapas.unidades.pk(v.property_id),
+        permitido_ate=v.permitido_ate,
+        created_date=v.criado_em,
+        sf_modificado_em=v.modificado_em,
+        raw=raw,
+        imported_at=agora or timezone.now(),
+    )
+
+
+def upsert_visitor_logs(objs: List[VisitorLog], update_fields: Iterable[str] = CAMPOS_UPSERT) -> int:
+    VisitorLog.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["sf_id"],
+        update_fields=list(update_fields),
+    )
+    return len(objs)
+
+
+def sincronizar_visitor_logs(sf=None) -> Dict[str, int]:
+    mapas = carregar_mapas()
+    region_ids = mapas.condominios.sf_ids()
+    if not region_ids:
+        return {"gravados": 0, "excluidos": 0}
+
+    marca = ler_marca(MARCA)
+    sf = sf or sf_connect()
+    gravados = excluidos = 0
+    nova_marca = marca
+    agora = timezone.now()
+
+    for regioes in chunked(region_ids):
+        where = [f"reda__Property__r.reda__Region__c IN {soql_in(regioes)}"]
+        if marca:
+            where.append(f"SystemModstamp >= {soql_datetime(marca)}")
+        soql = f"""
+            SELECT {", ".join(CAMPOS_SOQL)}
+            FROM reda__Visitor_Log__c
+            WHERE {" AND ".join(where)}
+            ORDER BY SystemModstamp
+        """
+        for lote in chunked(sf.query_all_iter(soql, include_deleted=True), LOTE):
+            apagados = [r["Id"] for r in lote if r.get("IsDeleted")]
+            if apagados:
+                excluidos += VisitorLog.objects.filter(sf_id__in=apagados).delete()[0]
+            vivos = [registro_para_visitor_log(r, mapas, agora) for r in lote if not r.get("IsDeleted")]
+            gravados += upsert_visitor_logs(vivos)
+
+            ultimo = parse_sf_datetime(lote[-1]["SystemModstamp"])
+            nova_marca = max(nova_marca, ultimo) if nova_marca else ultimo
+
+    gravar_marca(MARCA, nova_marca)
+    print(f"🔄 Réplica Visitor Log: {gravados} gravados, {excluidos} excluídos.")
+    return {"gravados": gravados, "excluidos": excluidos}
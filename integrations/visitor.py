@@ -1,18 +1,11 @@
 import os
 import re
 from typing import List, Dict, Optional
-import pandas as pd
 from simple_salesforce import Salesforce
 import datetime
-from core.params import get_param
-
-# ==============================
-# Config SF (variáveis de ambiente ou fallbacks)
-# ==============================
-SF_USERNAME = get_param("SF_USERNAME", "xx")
-SF_PASSWORD = get_param("SF_PASSWORD", "xx")
-SF_TOKEN    = get_param("SF_TOKEN", "xx")
-SF_DOMAIN   = get_param("SF_DOMAIN", "xx")
+from integrations.metadata import describe_fields
+from integrations.query_cache import invalidar
+from integrations.session import sf_connect
 
 # Nome do Objeto de Property (SObject) — AJUSTE se necessário
 PROPERTY_SOBJECT = "reda__Property__c"
@@ -21,14 +14,6 @@ CSV_PROPERTIES = "properties_map.csv"
 # ==============================
 # Utils
 # ==============================
-def sf_connect() -> Salesforce:
-    return Salesforce(
-        username=SF_USERNAME,
-        password=SF_PASSWORD,
-        security_token=SF_TOKEN,
-        domain="login"  # mude para "test" se for sandbox
-    )
-
 def normalize_phone_br(p: str) -> str:
     if not p:
         return ""
@@ -61,6 +46,8 @@ def list_all_properties(sf: Salesforce, limit: int = 10000) -> List[Dict]:
     return res.get("records", [])
 
 def save_properties_csv(props: List[Dict], path: str = CSV_PROPERTIES) -> None:
+    import pandas as pd  # só este helper de linha de comando usa pandas (~400ms e ~100MB por processo)
+
     rows = [{"Id": p["Id"], "Name": p.get("Name", "")} for p in props]
     df = pd.DataFrame(rows)
     df.to_csv(path, index=False, encoding="utf-8")
@@ -74,8 +61,7 @@ def find_account_property_lookup_field(sf: Salesforce) -> Optional[str]:
     Verifica no Account se existe um lookup que referencia o SObject de Property.
     Retorna o API name (ex.: 'reda__Property__c') se existir.
     """
-    desc = sf.Account.describe()
-    for f in desc["fields"]:
+    for f in describe_fields(sf, "Account"):
         if f.get("type") == "reference":
             refs = f.get("referenceTo") or []
             if PROPERTY_SOBJECT in refs:
@@ -158,6 +144,7 @@ def criar_visitor_log_salesforce(
 
     try:
         result = sobj.create(payload)
+        invalidar("reda__Visitor_Log__c")
         print("✅ Registro criado:", result)
         return result
     except SalesforceMalformedRequest as e:
@@ -172,7 +159,7 @@ def criar_visitor_log_salesforce(
 
 
 def get_salesforce_connection():
-    return sf_connect()  # já existe no visitor.py
+    return sf_connect()
 
 # ==============================
 # MAIN: Property -> Morador -> Visitor Log
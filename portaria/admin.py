@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Encomenda, EventoAcesso, Parametro, Veiculo
+from .models import ContadorDiario, Encomenda, EventoAcesso, Parametro, Veiculo
 
 
 
@@ -27,4 +27,11 @@ class ParametroAdmin(admin.ModelAdmin):
 class VeiculoAdmin(admin.ModelAdmin):
     list_display = ("id", "placa", "modelo", "cor")
     list_filter = ("placa", "modelo", "cor")
-    search_fields = ("placa", "modelo", "cor")
\ No newline at end of file
+    search_fields = ("placa", "modelo", "cor")
+
+
+@admin.register(ContadorDiario)
+class ContadorDiarioAdmin(admin.ModelAdmin):
+    list_display = ("condominio", "dia", "metrica", "valor", "atualizado_em")
+    list_filter = ("metrica", "condominio")
+    date_hierarchy = "dia"
@@ -0,0 +1,210 @@
+# portaria/busca.py
+"""
+Busca parcial ("contém") por nome, placa e modelo usando índice, sem
+diferenciar maiúsculas nem acentos ("joao" encontra "João").
+
+PostgreSQL: o filtro vira UPPER(portaria_unaccent(campo)) LIKE UPPER(portaria_unaccent('%termo%')),
+e índices GIN gin_trgm_ops na mesma expressão atendem o LIKE com curinga nas
+duas pontas. portaria_unaccent é um wrapper IMMUTABLE de unaccent (que é só
+STABLE e não pode ir para índice). Extensões, função e índices vêm da
+migração portaria 0029.
+
+SQLite: para cada campo indexado há uma tabela sombra (pk, valor) com o
+texto já sem acento e em minúsculas, e uma tabela FTS5 (tokenizer trigram)
+de conteúdo externo sobre ela, mantida por triggers do próprio SQLite. As
+tabelas vêm da migração portaria 0029. A tabela sombra é atualizada pelos
+signals de save/delete (portaria/signals.py); bulk_create/bulk_update não
+passam por eles e quem os usa chama indexar_varios; para cargas diretas no
+banco, `manage.py reindexar_busca` reconstrói tudo. O trigram só casa termos
+com 3+ letras; termos menores caem no icontains.
+
+Outros bancos, ou SQLite sem as tabelas: icontains comum.
+"""
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import CharField, TextField, Transform
+from django.db.models.expressions import RawSQL
+
+# (app, modelo, campo) com índice de busca
+INDEXADOS = (
+    ("portaria", "EventoAcesso", "pessoa_nome"),
+    ("portaria", "Veiculo", "placa"),
+    ("condominio", "Morador", "nome"),
+    ("condominio", "Bicicleta", "modelo"),
+)
+
+MIN_TRIGRAM = 3
+
+_fts_ok: Dict[str, bool] = {}
+
+
+class SemAcento(Transform):
+    """campo__sem_acento__icontains: tira acentos no PostgreSQL (nos outros bancos não altera o campo)."""
+    lookup_name = "sem_acento"
+    function = "portaria_unaccent"
+    bilateral = True
+
+    def as_sql(self, compiler, connection):
+        return compiler.compile(self.lhs)
+
+    def as_postgresql(self, compiler, connection):
+        return super().as_sql(compiler, connection)
+
+
+CharField.register_lookup(SemAcento)
+TextField.register_lookup(SemAcento)
+
+
+def dobrar(texto: Optional[str]) -> str:
+    """Texto sem acentos e em minúsculas (mesma forma gravada na tabela sombra)."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def tabelas(db_table: str, coluna: str) -> Tuple[str, str]:
+    """(tabela sombra, tabela FTS5) do campo no SQLite."""
+    base = f"busca_{db_table}_{coluna}"
+    return f"{base}_dados", base
+
+
+def indice_pg(db_table: str, coluna: str) -> str:
+    return f"{db_table}_{coluna}_trgm"
+
+
+def _indexado(modelo, campo: str) -> bool:
+    return (modelo._meta.app_label, modelo.__name__, campo) in INDEXADOS
+
+
+def modelos_indexados():
+    for app_label, nome, campo in INDEXADOS:
+        yield apps.get_model(app_label, nome), campo
+
+
+def _resolver(modelo, caminho: str):
+    """'destinatario__nome' → ('destinatario', Morador, 'nome')."""
+    partes = caminho.split("__")
+    for parte in partes[:-1]:
+        modelo = modelo._meta.get_field(parte).related_model
+    return "__".join(partes[:-1]), modelo, partes[-1]
+
+
+def _fts_disponivel(alias: str) -> bool:
+    # Só o resultado positivo fica guardado: um processo que consultou antes da
+    # migração (tabelas ainda ausentes) passa a usar o índice assim que elas existirem
+    if not _fts_ok.get(alias):
+        with connections[alias].cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'busca\\_%' ESCAPE '\\'")
+            _fts_ok[alias] = cur.fetchone()[0] > 0
+    return _fts_ok[alias]
+
+
+def esquecer_tabelas() -> None:
+    """Descarta o que se sabe das tabelas (depois de migrate, que pode tê-las removido)."""
+    _fts_ok.clear()
+
+
+def filtrar(qs, campo: str, termo: Optional[str]):
+    """qs com `campo` contendo `termo` (campo pode atravessar FKs: destinatario__nome)."""
+    termo = (termo or "").strip()
+    if not termo:
+        return qs
+
+    conexao = connections[qs.db]
+    if conexao.vendor == "postgresql":
+        return qs.filter(**{f"{campo}__sem_acento__icontains": termo})
+
+    if conexao.vendor == "sqlite":
+        prefixo, modelo, coluna = _resolver(qs.model, campo)
+        dobrado = dobrar(termo)
+        if _indexado(modelo, coluna) and len(dobrado) >= MIN_TRIGRAM and _fts_disponivel(qs.db):
+            dados, fts = tabelas(modelo._meta.db_table, modelo._meta.get_field(coluna).column)
+            pks = RawSQL(
+                f'SELECT pk FROM "{dados}" WHERE id IN (SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s)',
+                ['"' + dobrado.replace('"', '""') + '"'],
+            )
+            return qs.filter(**{f"{prefixo}__in" if prefixo else "pk__in": pks})
+
+    return qs.filter(**{f"{campo}__icontains": termo})
+
+
+# -- manutenção das tabelas sombra (SQLite) --------------------------------------
+def criar_tabelas_sqlite(cursor, db_table: str, coluna: str) -> None:
+    dados, fts = tabelas(db_table, coluna)
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS "{dados}" (id INTEGER PRIMARY KEY, pk UNIQUE NOT NULL, valor TEXT)')
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+        f"valor, content='{dados}', content_rowid='id', tokenize='trigram')"
+    )
+    # Triggers padrão de conteúdo externo do FTS5 (só SQL nativo)
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{dados}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, valor) VALUES (new.id, new.valor); END'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{dados}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, valor) VALUES (\'delete\', old.id, old.valor); END'
+    )
+    cursor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE ON "{dados}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, valor) VALUES (\'delete\', old.id, old.valor); '
+        f'INSERT INTO "{fts}"(rowid, valor) VALUES (new.id, new.valor); END'
+    )
+
+
+def reindexar(modelo, campo: str, alias: str = "default") -> int:
+    """Reconstrói a tabela sombra de `modelo.campo` a partir da tabela original."""
+    conexao = connections[alias]
+    coluna = modelo._meta.get_field(campo).column
+    dados, _ = tabelas(modelo._meta.db_table, coluna)
+    pk = modelo._meta.pk
+    linhas = [
+        (pk.get_db_prep_value(valor_pk, conexao), dobrar(texto))
+        for valor_pk, texto in modelo._default_manager.using(alias).values_list("pk", campo).iterator()
+    ]
+    with conexao.cursor() as cur:
+        cur.execute(f'DELETE FROM "{dados}"')
+        cur.executemany(f'INSERT INTO "{dados}"(pk, valor) VALUES (%s, %s)', linhas)
+    return len(linhas)
+
+
+def _sqlite_com_busca(instance) -> Optional[str]:
+    alias = instance._state.db or "default"
+    if connections[alias].vendor != "sqlite" or not _fts_disponivel(alias):
+        return None
+    return alias
+
+
+def indexar(instance, campo: str) -> None:
+    indexar_varios([instance], campo)
+
+
+def indexar_varios(instancias, campo: str) -> None:
+    """Atualiza a tabela sombra para várias instâncias (ex.: depois de bulk_create/bulk_update)."""
+    if not instancias:
+        return
+    alias = _sqlite_com_busca(instancias[0])
+    if alias is None:
+        return
+    conexao = connections[alias]
+    modelo = instancias[0]._meta
+    dados, _ = tabelas(modelo.db_table, modelo.get_field(campo).column)
+    with conexao.cursor() as cur:
+        cur.executemany(
+            f'INSERT INTO "{dados}"(pk, valor) VALUES (%s, %s) '
+            f"ON CONFLICT(pk) DO UPDATE SET valor = excluded.valor",
+            [(modelo.pk.get_db_prep_value(i.pk, conexao), dobrar(getattr(i, campo))) for i in instancias],
+        )
+
+
+def desindexar(instance, campo: str) -> None:
+    alias = _sqlite_com_busca(instance)
+    if alias is None or instance.pk is None:
+        return
+    conexao = connections[alias]
+    dados, _ = tabelas(instance._meta.db_table, instance._meta.get_field(campo).column)
+    with conexao.cursor() as cur:
+        cur.execute(f'DELETE FROM "{dados}" WHERE pk = %s',
+                    [instance._meta.pk.get_db_prep_value(instance.pk, conexao)])
@@ -0,0 +1,187 @@
+# portaria/contadores.py
+"""
+Contadores do dashboard (ContadorDiario) mantidos de forma incremental.
+
+Cada Encomenda/EventoAcesso contribui com +1 para algumas linhas
+(condomínio, dia local, métrica). Os signals (portaria/signals.py) aplicam
+a diferença entre a contribuição antiga e a nova no mesmo save/delete:
+
+- criar encomenda: total, pendentes (se RECEBIDA) e recebidas no dia;
+- entregar: pendentes -1 e entregues no dia da entrega;
+- excluir: desfaz a contribuição; criar/excluir acesso: acessos no dia.
+
+O estado antigo vem de uma cópia feita no post_init, sem query extra.
+bulk_create/bulk_update e QuerySet.update() não disparam signals: a
+reconciliação (reconciliar, task periódica) recalcula a partir das tabelas e
+corrige qualquer divergência.
+
+O dashboard lê poucas linhas pelo índice único (condomínio, dia, métrica),
+então o custo não cresce com o histórico.
+"""
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from portaria.models import (ContadorDiario, Encomenda, EventoAcesso, MetricaContador,
+                             StatusEncomenda)
+from portaria.periodo import filtrar_periodo
+
+# Dia usado pelas métricas acumuladas (não são de um dia específico)
+DIA_ACUMULADO = date(1, 1, 1)
+
+CAMPOS_ENCOMENDA = ("condominio_id", "status", "data_recebimento", "data_entrega")
+CAMPOS_ACESSO = ("condominio_id", "criado_em")
+
+Chave = Tuple[int, date, str]
+
+
+def _dia(dt) -> Optional[date]:
+    return timezone.localdate(dt) if dt else None
+
+
+def estado(instance, campos: Iterable[str]) -> Optional[tuple]:
+    """Valores atuais dos campos, sem carregar campos adiados (None se faltar algum)."""
+    valores = instance.__dict__
+    campos = tuple(campos)
+    if any(c not in valores for c in campos):
+        return None
+    return tuple(valores[c] for c in campos)
+
+
+def parcelas_encomenda(estado_encomenda: Optional[tuple]) -> Counter:
+    parcelas = Counter()
+    if not estado_encomenda:
+        return parcelas
+    condominio_id, status, recebida_em, entregue_em = estado_encomenda
+    parcelas[(condominio_id, DIA_ACUMULADO, MetricaContador.ENCOMENDAS_TOTAL)] += 1
+    if status == StatusEncomenda.RECEBIDA:
+        parcelas[(condominio_id, DIA_ACUMULADO, MetricaContador.ENCOMENDAS_PENDENTES)] += 1
+    if recebida_em:
+        parcelas[(condominio_id, _dia(recebida_em), MetricaContador.ENCOMENDAS_RECEBIDAS)] += 1
+    if status == StatusEncomenda.ENTREGUE and entregue_em:
+        parcelas[(condominio_id, _dia(entregue_em), MetricaContador.ENCOMENDAS_ENTREGUES)] += 1
+    return parcelas
+
+
+def parcelas_acesso(estado_acesso: Optional[tuple]) -> Counter:
+    parcelas = Counter()
+    if estado_acesso and estado_acesso[1]:
+        condominio_id, criado_em = estado_acesso
+        parcelas[(condominio_id, _dia(criado_em), MetricaContador.ACESSOS)] += 1
+    return parcelas
+
+
+def diferenca(antes: Counter, depois: Counter) -> Dict[Chave, int]:
+    delta = Counter(depois)
+    delta.subtract(antes)
+    return {k: v for k, v in delta.items() if v}
+
+
+def _incrementar(condominio_id: int, dia: date, metrica: str, n: int) -> None:
+    linha = ContadorDiario.objects.filter(condominio_id=condominio_id, dia=dia, metrica=metrica)
+    if linha.update(valor=F("valor") + n, atualizado_em=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            ContadorDiario.objects.create(condominio_id=condominio_id, dia=dia, metrica=metrica, valor=n)
+    except IntegrityError:
+        # Outro processo criou a linha entre o UPDATE e o INSERT
+        linha.update(valor=F("valor") + n, atualizado_em=timezone.now())
+
+
+def aplicar(delta: Dict[Chave, int]) -> None:
+    """Soma `delta` nos contadores, na transação de quem salvou o registro."""
+    if not delta:
+        return
+    try:
+        with transaction.atomic():
+            # Mesma ordem do índice único: evita deadlock entre saves concorrentes
+            for (condominio_id, dia, metrica), n in sorted(delta.items()):
+                _incrementar(condominio_id, dia, metrica, n)
+    except DatabaseError as e:
+        # O registro principal não pode falhar por causa do contador; a reconciliação corrige
+        print(f"⚠️ Erro ao atualizar contadores do dashboard: {e}")
+
+
+# -- leitura -------------------------------------------------------------------
+def resumo(condominios, dia: Optional[date] = None) -> Dict[str, int]:
+    """{métrica: valor} somado sobre `condominios` (queryset ou ids) para o dia local."""
+    dia = dia or timezone.localdate()
+    valores = dict(
+        ContadorDiario.objects
+        .filter(condominio__in=condominios, dia__in=(DIA_ACUMULADO, dia))
+        .values("metrica").annotate(total=Sum("valor"))
+        .values_list("metrica", "total")
+    )
+    return {m: valores.get(m, 0) for m in MetricaContador.values}
+
+
+# -- reconciliação -------------------------------------------------------------
+def _esperado(desde: Optional[date]) -> Counter:
+    esperado = Counter()
+
+    def contar(qs, metrica, campo_dia=None):
+        if campo_dia:
+            qs = filtrar_periodo(qs, campo_dia, desde, None).annotate(dia_local=TruncDate(campo_dia))
+            grupos = qs.values("condominio_id", "dia_local").annotate(n=Count("id"))
+            for g in grupos:
+                esperado[(g["condominio_id"], g["dia_local"], metrica)] = g["n"]
+        else:
+            for g in qs.values("condominio_id").annotate(n=Count("id")):
+                esperado[(g["condominio_id"], DIA_ACUMULADO, metrica)] = g["n"]
+
+    contar(Encomenda.objects.all(), MetricaContador.ENCOMENDAS_TOTAL)
+    contar(Encomenda.objects.filter(status=StatusEncomenda.RECEBIDA), MetricaContador.ENCOMENDAS_PENDENTES)
+    contar(Encomenda.objects.all(), MetricaContador.ENCOMENDAS_RECEBIDAS, "data_recebimento")
+    contar(Encomenda.objects.filter(status=StatusEncomenda.ENTREGUE, data_entrega__isnull=False),
+           MetricaContador.ENCOMENDAS_ENTREGUES, "data_entrega")
+    contar(EventoAcesso.objects.all(), MetricaContador.ACESSOS, "criado_em")
+    return esperado
+
+
+def reconciliar(dias: Optional[int] = 2) -> dict:
+    """
+    Recalcula os acumulados e os contadores diários dos últimos `dias` dias
+    (dias=None: todo o histórico) e corrige as linhas divergentes.
+    """
+    desde = None if dias is None else timezone.localdate() - timedelta(days=max(1, dias) - 1)
+
+    with transaction.atomic():
+        # Trava as linhas antes de contar: incrementos concorrentes esperam e
+        # somam sobre o valor corrigido (no PostgreSQL; no SQLite é no-op)
+        existentes = ContadorDiario.objects.select_for_update().order_by("condominio_id", "dia", "metrica")
+        if desde:
+            existentes = existentes.filter(Q(dia=DIA_ACUMULADO) | Q(dia__gte=desde))
+        atuais = {(c.condominio_id, c.dia, c.metrica): c for c in existentes}
+
+        esperado = _esperado(desde)
+
+        agora = timezone.now()
+        novos, alterados, zerados = [], [], []
+        for chave in set(atuais) | set(esperado):
+            valor = esperado.get(chave, 0)
+            linha = atuais.get(chave)
+            if linha is None:
+                if valor:
+                    novos.append(ContadorDiario(condominio_id=chave[0], dia=chave[1], metrica=chave[2], valor=valor))
+            elif not valor:
+                # Linha já zerada (ex.: pendentes depois da entrega) está correta
+                if linha.valor:
+                    zerados.append(linha.pk)
+            elif linha.valor != valor:
+                linha.valor, linha.atualizado_em = valor, agora
+                alterados.append(linha)
+
+        ContadorDiario.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+        ContadorDiario.objects.bulk_update(alterados, ["valor", "atualizado_em"], batch_size=500)
+        ContadorDiario.objects.filter(pk__in=zerados).delete()
+
+    total = len(novos) + len(alterados) + len(zerados)
+    print(f"🧮 Contadores reconciliados desde {desde or 'o início'}: {total} corrigidos "
+          f"({len(novos)} novos, {len(alterados)} alterados, {len(zerados)} removidos)")
+    return {"novos": len(novos), "alterados": len(alterados), "removidos": len(zerados)}
@@ -0,0 +1,133 @@
+# portaria/escopo.py
+"""
+Escopo de acesso do usuário: é admin? quais condomínios pode ver?
+
+Antes cada view/form refazia `groups.filter(name="Administrador").exists()`,
+`condominios_permitidos.all()`, `.count()` e `.first()`. Agora o escopo é
+calculado uma vez e fica na sessão ({id, nome} dos condomínios), junto com
+uma versão global guardada no cache. O EscopoAcessoMiddleware expõe
+`request.escopo` (preguiçoso: só é montado se alguém usar) e deixa a sessão
+num ContextVar; o escopo fica memorizado no objeto do usuário da requisição,
+então allowed_condominios_for(user) nos forms reaproveita o mesmo cálculo.
+
+Invalidação: alterar Condominio.usuarios, os grupos de um usuário, um
+Condominio ou os flags do usuário incrementa a versão (portaria/signals.py);
+na próxima requisição cada sessão percebe a versão nova e recalcula.
+"""
+from contextvars import ContextVar
+from typing import List, Optional
+
+from django.db.models import QuerySet
+from django.utils.functional import SimpleLazyObject
+
+from condominio.models import Condominio
+from core import versao_cache
+
+GRUPO_ADMIN = "Administrador"
+
+_K_VERSAO = "escopo:versao"
+_K_SESSAO = "escopo_acesso"
+
+_sessao: ContextVar = ContextVar("escopo_sessao", default=None)
+
+
+class EscopoAcesso:
+    __slots__ = ("user_id", "admin", "grupos", "permitidos")
+
+    def __init__(self, user_id: Optional[int], admin: bool, grupos: List[str], permitidos: List[dict]):
+        self.user_id = user_id
+        self.admin = admin
+        self.grupos = grupos
+        # [{"id": .., "nome": ..}] em ordem de nome; vazio para admin (vê todos)
+        self.permitidos = permitidos
+
+    @classmethod
+    def calcular(cls, user) -> "EscopoAcesso":
+        if not user.is_authenticated:
+            return cls(None, False, [], [])
+        grupos = list(user.groups.order_by("name").values_list("name", flat=True))
+        admin = user.is_superuser or GRUPO_ADMIN in grupos
+        permitidos = [] if admin else list(user.condominios_permitidos.order_by("nome").values("id", "nome"))
+        return cls(user.pk, admin, grupos, permitidos)
+
+    def como_sessao(self, versao) -> dict:
+        return {"v": versao, "u": self.user_id, "admin": self.admin,
+                "grupos": self.grupos, "condominios": self.permitidos}
+
+    @property
+    def ids(self) -> Optional[List[int]]:
+        """Ids permitidos (None para admin: sem restrição)."""
+        return None if self.admin else [c["id"] for c in self.permitidos]
+
+    @property
+    def condominios(self) -> QuerySet:
+        """Queryset dos condomínios permitidos (para filtros e selects)."""
+        if self.admin:
+            return Condominio.objects.all()
+        return Condominio.objects.filter(id__in=self.ids)
+
+    @property
+    def primeiro(self) -> Optional[int]:
+        """Id do primeiro condomínio permitido por nome (None para admin ou sem acesso)."""
+        return self.permitidos[0]["id"] if self.permitidos else None
+
+    @property
+    def unico(self) -> Optional[int]:
+        """Id do condomínio quando o usuário só tem acesso a um."""
+        return self.primeiro if len(self.permitidos) == 1 else None
+
+    def permite(self, condominio_id) -> bool:
+        if self.admin:
+            return True
+        try:
+            return int(condominio_id) in self.ids
+        except (TypeError, ValueError):
+            return False
+
+
+def versao():
+    return versao_cache.atual(_K_VERSAO)
+
+
+def invalidar() -> None:
+    """Chamada quando permissões mudam: todas as sessões recalculam o escopo."""
+    versao_cache.incrementar(_K_VERSAO)
+
+
+def do_usuario(user, session=None) -> EscopoAcesso:
+    """Escopo do usuário, memorizado no objeto e guardado na sessão da requisição."""
+    escopo = getattr(user, "_escopo_acesso", None)
+    if escopo is not None:
+        return escopo
+
+    if session is None:
+        session = _sessao.get()
+    v = versao()
+    dados = session.get(_K_SESSAO) if session is not None else None
+    if dados and dados.get("v") == v and dados.get("u") == user.pk:
+        escopo = EscopoAcesso(user.pk, dados["admin"], dados.get("grupos", []), dados["condominios"])
+    else:
+        escopo = EscopoAcesso.calcular(user)
+        if session is not None and user.is_authenticated:
+            session[_K_SESSAO] = escopo.como_sessao(v)
+    user._escopo_acesso = escopo
+    return escopo
+
+
+def limpar_sessao(session) -> None:
+    session.pop(_K_SESSAO, None)
+
+
+class EscopoAcessoMiddleware:
+    """Disponibiliza request.escopo (depois do AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.escopo = SimpleLazyObject(lambda: do_usuario(request.user, request.session))
+        token = _sessao.set(request.session)
+        try:
+            return self.get_response(request)
+        finally:
+            _sessao.reset(token)
@@ -1,7 +1,7 @@
 from django import forms
 from condominio.models import Unidade, Condominio, Morador, Bicicleta, Bloco
 from portaria.models import Encomenda, EventoAcesso, Veiculo
-from portaria.permissions import allowed_condominios_for
+from portaria import escopo
 
 class EncomendaForm(forms.ModelForm):
     def __init__(self, *args, user=None, is_create=False, allowed_condominios=None, **kwargs):
@@ -10,13 +10,13 @@ class EncomendaForm(forms.ModelForm):
 
         # --- FILTRAR CONDOMÍNIO PELOS PERMITIDOS DO USUÁRIO ---
         if "condominio" in self.fields:
-            if user and not user.is_superuser and hasattr(user, "condominios_permitidos"):
-                qs = user.condominios_permitidos.all().order_by("nome")
-                self.fields["condominio"].queryset = qs
+            escopo_usuario = escopo.do_usuario(user) if user else None
+            if escopo_usuario and not escopo_usuario.admin:
+                self.fields["condominio"].queryset = escopo_usuario.condominios.order_by("nome")
 
                 # ✅ Se só houver 1 condomínio, já define como valor inicial e remove a opção em branco
-                if qs.count() == 1:
-                    self.fields["condominio"].initial = qs.first()
+                if escopo_usuario.unico:
+                    self.fields["condominio"].initial = escopo_usuario.unico
                     self.fields["condominio"].empty_label = None
             else:
                 # superuser ou sem restrição → todos os condomínios
@@ -26,7 +26,7 @@ class EncomendaForm(forms.ModelForm):
         cond_id = (
             self.data.get("condominio") if self.data else None
         ) or getattr(self.instance, "condominio_id", None) or (
-            self.fields["condominio"].initial.id if self.fields["condominio"].initial else None
+            self.fields["condominio"].initial
         )
 
         if cond_id:
@@ -103,8 +103,8 @@ class EventoAcessoForm(forms.ModelForm):
 
 
         # 🔹 Filtra condomínios permitidos
-        if user and not user.is_superuser:
-            self.fields["condominio"].queryset = user.condominios_permitidos.all()
+        if user and not escopo.do_usuario(user).admin:
+            self.fields["condominio"].queryset = escopo.do_usuario(user).condominios
 
         # 🔹 Condomínio escolhido
         cond_id = (
@@ -182,10 +182,10 @@ class BicicletaForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         # 🔹 Condominios — todos se admin, apenas os do usuário comum
-        if user and (user.is_staff or user.is_superuser):
+        if user and (user.is_staff or escopo.do_usuario(user).admin):
             self.fields["condominio"].queryset = Condominio.objects.all().order_by("nome")
         elif user:
-            self.fields["condominio"].queryset = Condominio.objects.filter(usuarios=user).order_by("nome")
+            self.fields["condominio"].queryset = escopo.do_usuario(user).condominios.order_by("nome")
         else:
             self.fields["condominio"].queryset = Condominio.objects.none()
 
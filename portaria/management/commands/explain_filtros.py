@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, QuerySet
+from django.utils import timezone
+
+from portaria.models import Encomenda, EventoAcesso, StatusEncomenda
+from portaria.periodo import filtrar_periodo
+
+
+def _legado(qs: QuerySet, campo: str, d0, d1) -> QuerySet:
+    """Filtro antigo das listas: converte cada linha para data (não usa índice)."""
+    return qs.filter(**{f"{campo}__date__gte": d0, f"{campo}__date__lte": d1})
+
+
+def _cenarios(condominio_id):
+    encomendas = Encomenda.objects.filter(condominio_id=condominio_id) if condominio_id else Encomenda.objects.all()
+    acessos = EventoAcesso.objects.filter(condominio_id=condominio_id) if condominio_id else EventoAcesso.objects.all()
+    pendentes = encomendas.filter(status=StatusEncomenda.RECEBIDA)
+    return {
+        # Filtro padrão da lista de encomendas (mês até hoje) — a query mais frequente
+        "encomendas_mes": (encomendas, "data_recebimento", "-data_recebimento", False),
+        "encomendas_status": (pendentes, "data_recebimento", "-data_recebimento", False),
+        "encomendas_pendentes": (pendentes, "data_recebimento", None, True),
+        "acessos_mes": (acessos, "criado_em", "-criado_em", False),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra o plano (EXPLAIN) e o tempo dos filtros de data das listas: "
+        "__date (antigo) x intervalo [início, fim) em horário local. "
+        "Para ver o efeito dos índices, rode antes e depois de "
+        "`migrate portaria 0027` (ou `migrate portaria 0026` para voltar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("cenarios", nargs="*", help="encomendas_mes, encomendas_status, "
+                                                         "encomendas_pendentes, acessos_mes (padrão: todos)")
+        parser.add_argument("--condominio", type=int, help="ID do condomínio (padrão: o com mais encomendas)")
+        parser.add_argument("--repeat", type=int, default=5, help="Execuções por query; mostra a mediana")
+        parser.add_argument("--analyze", action="store_true",
+                            help="EXPLAIN ANALYZE (só PostgreSQL: executa a query)")
+
+    def handle(self, *args, **opts):
+        condominio_id = opts["condominio"] or (
+            Encomenda.objects.values("condominio_id").annotate(n=Count("id"))
+            .order_by("-n").values_list("condominio_id", flat=True).first()
+        )
+        hoje = timezone.localdate()
+        d0, d1 = hoje.replace(day=1), hoje
+
+        cenarios = _cenarios(condominio_id)
+        escolhidos = opts["cenarios"] or list(cenarios)
+        invalidos = set(escolhidos) - set(cenarios)
+        if invalidos:
+            raise CommandError(f"Cenário desconhecido: {', '.join(sorted(invalidos))}")
+
+        explain = {"analyze": True} if opts["analyze"] else {}
+        self.stdout.write(f"📅 Período {d0} → {d1} (America/Sao_Paulo), condomínio {condominio_id or 'todos'}")
+
+        for nome in escolhidos:
+            base, campo, ordem, contagem = cenarios[nome]
+            for rotulo, qs in (("__date (antigo)", _legado(base, campo, d0, d1)),
+                               ("intervalo", filtrar_periodo(base, campo, d0, d1))):
+                if ordem:
+                    qs = qs.order_by(ordem, "-id")[:20]
+                executar = qs.count if contagem else (lambda q=qs: list(q))
+                tempos = []
+                for _ in range(max(1, opts["repeat"])):
+                    inicio = time.perf_counter()
+                    executar()
+                    tempos.append(time.perf_counter() - inicio)
+
+                self.stdout.write(f"\n=== {nome} · {rotulo} · {statistics.median(tempos) * 1000:.2f} ms")
+                try:
+                    self.stdout.write(qs.explain(**explain))
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"⚠️ EXPLAIN indisponível: {e}"))
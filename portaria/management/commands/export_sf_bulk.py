@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from integrations.bulk_extract import FORMATOS, campos_bulk, extrair
+from integrations.session import sf_connect
+
+
+class Command(BaseCommand):
+    help = "Exporta um sObject via Bulk API 2.0 para NDJSON/CSV com gzip (retomável)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("sobject", nargs="?", default="reda__Visitor_Log__c",
+                            help="sObject a exportar (ex.: reda__Visitor_Log__c, reda__Ticket__c)")
+        parser.add_argument("--fields", default=None,
+                            help="Campos separados por vírgula (padrão: todos, via describe)")
+        parser.add_argument("--where", default=None, help="Condição SOQL (sem o WHERE)")
+        parser.add_argument("--format", dest="formato", choices=FORMATOS, default="ndjson")
+        parser.add_argument("--out", default=None,
+                            help="Arquivo de saída (padrão: <sobject>.<formato>.gz)")
+        parser.add_argument("--query-all", action="store_true",
+                            help="Inclui registros excluídos/arquivados (queryAll)")
+        parser.add_argument("--page-size", type=int, default=50000,
+                            help="Registros por página de resultado")
+
+    def handle(self, *args, **opts):
+        sf = sf_connect()
+        sobject = opts["sobject"]
+        if opts["fields"]:
+            fields = [f.strip() for f in opts["fields"].split(",") if f.strip()]
+        else:
+            fields = campos_bulk(sf, sobject)
+        if not fields:
+            raise CommandError(f"Nenhum campo encontrado para {sobject}")
+
+        soql = f"SELECT {', '.join(fields)} FROM {sobject}"
+        if opts["where"]:
+            soql += f" WHERE {opts['where']}"
+        destino = opts["out"] or f"{sobject}.{opts['formato']}.gz"
+
+        resultado = extrair(
+            sf, soql, destino,
+            formato=opts["formato"],
+            incluir_excluidos=opts["query_all"],
+            registros_por_pagina=opts["page_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Exportados {resultado['registros']} registros para {resultado['arquivo']} (job {resultado['job_id']})"
+        ))
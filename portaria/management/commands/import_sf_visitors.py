@@ -1,10 +1,15 @@
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.utils import timezone
 from typing import Optional
-from portaria.integrations.sf import fetch_visitor_logs
+from integrations import idmap
+from integrations.marcas import gravar_marca, ler_marca
+from integrations.sf import iter_visitor_logs
+from integrations.soql import chunked, parse_sf_datetime
+from integrations.sync_visitor_logs import CAMPOS_UPSERT as CAMPOS_REPLICA, upsert_visitor_logs
 from portaria.models import VisitorLog
 from condominio.models import Condominio, Unidade
-from django.utils.dateparse import parse_datetime
+
+MARCA = "import_sf_visitors"
 
 # heurísticas de mapeamento (ajuste de acordo com seus campos no SF)
 F_NAME = ["reda__VisitorName__c", "VisitorName__c", "Name"]
@@ -13,86 +18,129 @@ F_CHECKIN  = ["reda__CheckIn__c", "CheckIn__c", "Check_In__c"]
 F_CHECKOUT = ["reda__CheckOut__c", "CheckOut__c", "Check_Out__c"]
 F_CONDO = ["reda__Condominium__c", "Condominium__c", "Condo__c", "Condominio__c"]
 F_UNIT  = ["reda__Unit__c", "Unit__c", "Unidade__c"]
+F_PROPERTY = ["reda__Property__c"]
 F_CREATED = ["CreatedDate"]
 
+# As linhas de VisitorLog pertencem à réplica (sync_visitor_logs), que resolve
+# condomínio/unidade pelos Ids do Salesforce. Num registro que já existe o
+# importador só atualiza as colunas que a réplica não grava; as demais ele
+# preenche apenas ao criar a linha.
+CAMPOS_IMPORTADOR = [
+    "nome", "documento", "condominio", "unidade", "checkin", "checkout",
+    "created_date", "sf_modificado_em", "raw", "imported_at",
+]
+CAMPOS_UPSERT = [c for c in CAMPOS_IMPORTADOR if c not in CAMPOS_REPLICA]
+
 def pick(rec: dict, keys: list[str]) -> Optional[str]:
     for k in keys:
         if k in rec and rec[k]:
             return rec[k]
     return None
 
+
+class Mapas:
+    """Condomínios e unidades carregados uma vez, para resolver cada registro sem query."""
+
+    def __init__(self):
+        # Ids do Salesforce (15 ou 18 chars) vêm do mapa compartilhado
+        self.ids = idmap.mapa()
+        self.condo_por_nome = {}
+        for pk, nome in Condominio.objects.values_list("id", "nome"):
+            self.condo_por_nome.setdefault(nome.lower(), pk)
+        self.unidade_por_numero = {}
+        for pk, numero, condo_id in Unidade.objects.values_list("id", "numero", "bloco__condominio_id"):
+            self.unidade_por_numero.setdefault((condo_id, numero.lower()), pk)
+
+    def resolver(self, r: dict):
+        condominio_id = None
+        condo = pick(r, F_CONDO)
+        if condo:
+            condominio_id = self.ids.condominios.pk(condo) or self.condo_por_nome.get(condo.lower())
+
+        # reda__Property__c aponta direto para a unidade
+        unidade_id = self.ids.unidades.pk(pick(r, F_PROPERTY))
+        if unidade_id:
+            return condominio_id or self.ids.condominio_da_unidade.get(unidade_id), unidade_id
+
+        unit_label = pick(r, F_UNIT)
+        unidade_id = None
+        if unit_label and condominio_id:
+            unidade_id = self.unidade_por_numero.get((condominio_id, unit_label.lower()))
+        return condominio_id, unidade_id
+
+
 class Command(BaseCommand):
-    help = "Importa visitantes do Salesforce e grava em VisitorLog"
+    help = "Importa visitantes do Salesforce e grava em VisitorLog (streaming, upsert em lotes)"
 
     def add_arguments(self, parser):
         parser.add_argument("--created", dest="created", default=None,
                             help='Filtro de data SF: TODAY, LAST_N_DAYS:30, 2025-09-01T00:00:00Z etc.')
         parser.add_argument("--limit", dest="limit", type=int, default=None,
                             help="Limite de registros")
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=1000,
+                            help="Registros por upsert (default 1000)")
+        parser.add_argument("--since-watermark", dest="since_watermark", action="store_true",
+                            help=f"Incremental: só o que mudou desde a última execução (marca '{MARCA}')")
 
-    @transaction.atomic
     def handle(self, *args, **opts):
         created = opts.get("created")
         limit = opts.get("limit")
-        recs = fetch_visitor_logs(created_filter=created, limit=limit)
+        batch_size = opts["batch_size"]
+        incremental = opts["since_watermark"]
+
+        marca = ler_marca(MARCA) if incremental else None
+        if incremental:
+            self.stdout.write(f"Marca atual: {marca.isoformat() if marca else 'nenhuma (carga completa)'}")
 
-        if not recs:
+        mapas = Mapas()
+        recs = iter_visitor_logs(created_filter=created, limit=limit, since=marca, ordenar=incremental)
+        # Com --created a consulta fica restrita: avançar a marca pularia o que ficou de fora
+        marca_por_lote = incremental and not created
+
+        total = created_count = 0
+        nova_marca = marca
+        for lote in chunked(recs, batch_size):
+            agora = timezone.now()
+            existentes = set(
+                VisitorLog.objects.filter(sf_id__in=[r["Id"] for r in lote]).values_list("sf_id", flat=True)
+            )
+            objs = []
+            for r in lote:
+                condominio_id, unidade_id = mapas.resolver(r)
+                modificado = parse_sf_datetime(r.get("SystemModstamp"))
+                if modificado and (nova_marca is None or modificado > nova_marca):
+                    nova_marca = modificado
+                objs.append(VisitorLog(
+                    sf_id=r["Id"],
+                    nome=(pick(r, F_NAME) or "")[:200],
+                    documento=(pick(r, F_DOC) or "")[:50],
+                    condominio_id=condominio_id,
+                    unidade_id=unidade_id,
+                    checkin=parse_sf_datetime(pick(r, F_CHECKIN)),
+                    checkout=parse_sf_datetime(pick(r, F_CHECKOUT)),
+                    created_date=parse_sf_datetime(pick(r, F_CREATED)),
+                    sf_modificado_em=modificado,
+                    raw=r,
+                    imported_at=agora,
+                ))
+            upsert_visitor_logs(objs, CAMPOS_UPSERT)
+            total += len(objs)
+            created_count += len(objs) - len(existentes)
+
+            # Em ordem de SystemModstamp (inclusive na primeira carga): dá para
+            # avançar a marca a cada lote e retomar daqui se a execução cair
+            if marca_por_lote:
+                gravar_marca(MARCA, nova_marca)
+            self.stdout.write(f"  … {total} registros gravados")
+
+        if not total:
             self.stdout.write(self.style.WARNING("Nenhum registro retornado do SF."))
             return
 
-        created_count = 0
-        updated_count = 0
-
-        for r in recs:
-            sf_id = r.get("Id")
-            nome = pick(r, F_NAME) or ""
-            documento = pick(r, F_DOC) or ""
-
-            # datas
-            created_date_raw = pick(r, F_CREATED)
-            created_date = parse_datetime(created_date_raw) if created_date_raw else None
-            checkin_raw = pick(r, F_CHECKIN)
-            checkout_raw = pick(r, F_CHECKOUT)
-            checkin = parse_datetime(checkin_raw) if checkin_raw else None
-            checkout = parse_datetime(checkout_raw) if checkout_raw else None
-
-            # mapeamento condominio/unidade (opcional/heurístico)
-            condominio = None
-            unidade = None
-            condo_name_or_id = pick(r, F_CONDO)
-            unit_label = pick(r, F_UNIT)
-
-            # Tente associar pelo nome (ajuste conforme seu dado)
-            if condo_name_or_id:
-                try:
-                    condominio = Condominio.objects.filter(nome__iexact=condo_name_or_id).first()
-                except Exception:
-                    condominio = None
-
-            if unit_label and condominio:
-                try:
-                    unidade = Unidade.objects.filter(bloco__condominio=condominio, numero__iexact=unit_label).first()
-                except Exception:
-                    unidade = None
-
-            obj, created_flag = VisitorLog.objects.update_or_create(
-                sf_id=sf_id,
-                defaults={
-                    "nome": nome,
-                    "documento": documento,
-                    "condominio": condominio,
-                    "unidade": unidade,
-                    "checkin": checkin,
-                    "checkout": checkout,
-                    "created_date": created_date,
-                    "raw": r,
-                },
-            )
-            if created_flag:
-                created_count += 1
-            else:
-                updated_count += 1
+        # Carga completa sem filtros também serve de ponto de partida para o incremental
+        if not incremental and not created and not limit:
+            gravar_marca(MARCA, nova_marca)
 
         self.stdout.write(self.style.SUCCESS(
-            f"Importação concluída. Criados: {created_count}, Atualizados: {updated_count} (Total SF: {len(recs)})"
+            f"Importação concluída. Criados: {created_count}, Atualizados: {total - created_count} (Total SF: {total})"
         ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from portaria.contadores import reconciliar
+
+
+class Command(BaseCommand):
+    help = ("Recalcula os contadores do dashboard (ContadorDiario) a partir de Encomenda/EventoAcesso. "
+            "Sem --dias, refaz todo o histórico (use após o deploy da tabela).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, help="Só os últimos N dias (além dos acumulados)")
+
+    def handle(self, *args, **opts):
+        resultado = reconciliar(opts.get("dias"))
+        self.stdout.write(self.style.SUCCESS(f"✅ {resultado}"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from integrations.metadata import SOBJECTS_PADRAO, refresh
+from integrations.session import sf_connect
+
+
+class Command(BaseCommand):
+    help = "Recarrega o cache de describe (metadados) dos sObjects do Salesforce"
+
+    def add_arguments(self, parser):
+        parser.add_argument("sobjects", nargs="*", default=SOBJECTS_PADRAO,
+                            help="sObjects a recarregar (padrão: objetos usados pelas integrações)")
+
+    def handle(self, *args, **opts):
+        resultado = refresh(sf_connect(), opts["sobjects"])
+        for sobject, total in resultado.items():
+            self.stdout.write(f"{sobject}: {total} campos")
+        self.stdout.write(self.style.SUCCESS(f"Metadados atualizados: {len(resultado)} objetos."))
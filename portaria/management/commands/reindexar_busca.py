@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from portaria import busca
+
+
+class Command(BaseCommand):
+    help = ("Reconstrói as tabelas de busca FTS5 do SQLite (portaria/busca.py). "
+            "Use após importações diretas no banco, restore ou ao incluir campos em INDEXADOS.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **opts):
+        alias = opts["database"]
+        if connections[alias].vendor != "sqlite":
+            self.stdout.write("ℹ️ Fora do SQLite a busca usa índices do próprio banco (pg_trgm): nada a fazer.")
+            return
+        for modelo, campo in busca.modelos_indexados():
+            # Campos incluídos em INDEXADOS depois da migração 0029 ganham as tabelas aqui
+            with connections[alias].cursor() as cur:
+                busca.criar_tabelas_sqlite(cur, modelo._meta.db_table, modelo._meta.get_field(campo).column)
+            total = busca.reindexar(modelo, campo, alias)
+            self.stdout.write(f"🔎 {modelo.__name__}.{campo}: {total} registros indexados")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from integrations.governanca import uso
+
+
+class Command(BaseCommand):
+    help = "Mostra o consumo da API do Salesforce no dia, por origem (view/task) e por condomínio"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dia", help="Dia no formato AAAA-MM-DD (padrão: hoje)")
+
+    def handle(self, *args, **opts):
+        dados = uso(opts.get("dia"))
+
+        limite = dados["limite"]
+        if limite:
+            self.stdout.write(
+                f"Limite diário da org: {limite['usado']}/{limite['max']} "
+                f"(saldo {dados['saldo']:.0%})"
+            )
+        else:
+            self.stdout.write("Limite diário da org: ainda sem Sforce-Limit-Info")
+
+        for titulo, chave in (("Por origem", "origens"), ("Por condomínio", "condominios")):
+            contagens = dados[chave]
+            self.stdout.write(f"\n{titulo} ({dados['dia']}): {sum(contagens.values())} chamadas")
+            for nome, total in sorted(contagens.items(), key=lambda x: -x[1]):
+                self.stdout.write(f"  {nome:<55} {total:>7}")
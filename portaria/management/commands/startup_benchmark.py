@@ -0,0 +1,99 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Cada cenário roda num processo Python novo, que mede a si mesmo e imprime um JSON
+_MEDIDOR = """
+import json, os, resource, sys, time
+inicio = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", {settings_module!r})
+{codigo}
+fim = time.perf_counter()
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kb //= 1024
+print("@@" + json.dumps({{"segundos": fim - inicio, "rss_mb": rss_kb / 1024,
+                          "modulos": len(sys.modules)}}))
+"""
+
+CENARIOS = {
+    # manage.py check: setup + checks (importa urls e views)
+    "check": (
+        "import django\n"
+        "django.setup()\n"
+        "from django.core.management import call_command\n"
+        "call_command('check', verbosity=0)\n"
+    ),
+    # Boot de um worker WSGI (gunicorn): aplicação + middlewares + URLconf
+    "wsgi": (
+        "from condominio_portaria.wsgi import application\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    # Boot de um worker Celery: app + importação dos módulos de tasks
+    "celery": (
+        "import django\n"
+        "django.setup()\n"
+        "from condominio_portaria.celery import app\n"
+        "app.loader.import_default_modules()\n"
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = "Mede tempo de importação e memória (RSS) do boot: manage.py check, worker WSGI e worker Celery"
+
+    def add_arguments(self, parser):
+        parser.add_argument("cenarios", nargs="*",
+                            help=f"Cenários a medir: {', '.join(CENARIOS)} (padrão: todos)")
+        parser.add_argument("--repeat", type=int, default=3,
+                            help="Execuções por cenário; mostra a mediana (padrão 3)")
+        parser.add_argument("--top", type=int, default=0,
+                            help="Lista os N módulos mais lentos de importar (python -X importtime)")
+
+    def handle(self, *args, **opts):
+        cenarios = opts["cenarios"] or list(CENARIOS)
+        invalidos = set(cenarios) - set(CENARIOS)
+        if invalidos:
+            raise CommandError(f"Cenário desconhecido: {', '.join(sorted(invalidos))}")
+        settings_module = os.environ.get("DJANGO_SETTINGS_MODULE") or settings.SETTINGS_MODULE
+
+        self.stdout.write(f"{'cenário':<10} {'tempo (s)':>10} {'RSS (MB)':>10} {'módulos':>9}")
+        for nome in cenarios:
+            codigo = _MEDIDOR.format(settings_module=settings_module, codigo=CENARIOS[nome])
+            medidas = [self._rodar(codigo)[0] for _ in range(max(1, opts["repeat"]))]
+            self.stdout.write(
+                f"{nome:<10} "
+                f"{statistics.median(m['segundos'] for m in medidas):>10.3f} "
+                f"{statistics.median(m['rss_mb'] for m in medidas):>10.1f} "
+                f"{medidas[-1]['modulos']:>9}"
+            )
+            if opts["top"]:
+                _, stderr = self._rodar(codigo, importtime=True)
+                for modulo, micros in self._mais_lentos(stderr, opts["top"]):
+                    self.stdout.write(f"    {micros / 1e6:>8.3f}s  {modulo}")
+
+    def _rodar(self, codigo: str, importtime: bool = False):
+        cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", codigo]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=settings.BASE_DIR)
+        linha = next((l for l in proc.stdout.splitlines() if l.startswith("@@")), None)
+        if proc.returncode != 0 or linha is None:
+            raise CommandError(f"Falha ao medir o boot:\n{proc.stderr[-2000:]}")
+        return json.loads(linha[2:]), proc.stderr
+
+    @staticmethod
+    def _mais_lentos(stderr: str, n: int):
+        """Módulos importados no nível de cima (sem indentação) com maior tempo acumulado."""
+        tempos = []
+        for linha in stderr.splitlines():
+            if not linha.startswith("import time:") or "|" not in linha:
+                continue
+            _, acumulado, modulo = linha[len("import time:"):].split("|")
+            if acumulado.strip().isdigit() and modulo.startswith(" ") and not modulo.startswith("  "):
+                tempos.append((modulo.strip(), int(acumulado)))
+        return sorted(tempos, key=lambda x: -x[1])[:n]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0023_marcasincronizacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filaintegracao',
+            name='proxima_tentativa',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='filaintegracao',
+            name='ultimo_erro',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='filaintegracao',
+            index=models.Index(fields=['integrado_em', 'proxima_tentativa'], name='portaria_fi_integra_c14937_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0011_morador_boleto_id_morador_face_id_morador_foto'),
+        ('portaria', '0024_filaintegracao_backoff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitorlog',
+            name='contato_nome',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='visitorlog',
+            name='permitido_ate',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='visitorlog',
+            name='sf_modificado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='visitorlog',
+            name='sf_property_id',
+            field=models.CharField(blank=True, max_length=18),
+        ),
+        migrations.AddField(
+            model_name='visitorlog',
+            name='sf_region_id',
+            field=models.CharField(blank=True, max_length=18),
+        ),
+        migrations.AddField(
+            model_name='visitorlog',
+            name='telefone',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='visitorlog',
+            name='unidade_nome',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddIndex(
+            model_name='visitorlog',
+            index=models.Index(fields=['condominio', '-created_date'], name='portaria_vi_condomi_e3b521_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitorlog',
+            index=models.Index(fields=['sf_region_id', '-created_date'], name='portaria_vi_sf_regi_18fe85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitorlog',
+            index=models.Index(fields=['sf_property_id'], name='portaria_vi_sf_prop_842d98_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitorlog',
+            index=models.Index(fields=['telefone'], name='portaria_vi_telefon_80ca08_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitorlog',
+            index=models.Index(fields=['contato_nome'], name='portaria_vi_contato_0cdd8a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitorlog',
+            index=models.Index(fields=['permitido_ate'], name='portaria_vi_permiti_47ddf6_idx'),
+        ),
+    ]
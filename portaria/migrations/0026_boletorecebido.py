@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0025_visitorlog_replica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoletoRecebido',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('lote', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('documento', models.CharField(max_length=20)),
+                ('arquivo', models.FileField(blank=True, upload_to='boletos/')),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDO', 'Concluído'), ('ERRO', 'Erro')], default='PENDENTE', max_length=12)),
+                ('tentativas', models.IntegerField(default=0)),
+                ('resultado', models.JSONField(blank=True, default=dict)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('processado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='portaria_bo_status_158621_idx')],
+            },
+        ),
+    ]
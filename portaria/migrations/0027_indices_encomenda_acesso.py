@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0011_morador_boleto_id_morador_face_id_morador_foto'),
+        ('portaria', '0026_boletorecebido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='encomenda',
+            index=models.Index(fields=['condominio', '-data_recebimento'], name='encomenda_cond_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='encomenda',
+            index=models.Index(fields=['condominio', 'status', '-data_recebimento'], name='encomenda_cond_st_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='encomenda',
+            index=models.Index(condition=models.Q(('status', 'RECEBIDA')), fields=['condominio', '-data_recebimento'], name='encomenda_pendente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoacesso',
+            index=models.Index(fields=['condominio', '-criado_em'], name='acesso_cond_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoacesso',
+            index=models.Index(fields=['-criado_em'], name='acesso_criado_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('condominio', '0011_morador_boleto_id_morador_face_id_morador_foto'),
+        ('portaria', '0027_indices_encomenda_acesso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('metrica', models.CharField(choices=[('ENC_TOTAL', 'Encomendas (total)'), ('ENC_PENDENTES', 'Encomendas pendentes'), ('ENC_RECEBIDAS', 'Encomendas recebidas no dia'), ('ENC_ENTREGUES', 'Encomendas entregues no dia'), ('ACESSOS', 'Acessos no dia')], max_length=15)),
+                ('valor', models.IntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('condominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores', to='condominio.condominio')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('condominio', 'dia', 'metrica'), name='contador_cond_dia_metrica_uniq')],
+            },
+        ),
+    ]
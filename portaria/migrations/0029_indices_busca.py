@@ -0,0 +1,136 @@
+# Índices de busca parcial sem acento (portaria/busca.py):
+# PostgreSQL → pg_trgm + unaccent com índices GIN; SQLite → tabelas sombra FTS5 (trigram).
+#
+# DDL, campos e normalização do texto ficam copiados aqui (e não importados de
+# portaria.busca) para que mudanças futuras no código não alterem o que esta
+# migração faz.
+
+import unicodedata
+
+from django.db import migrations
+
+# (app, modelo, campo) indexados nesta migração
+CAMPOS = (
+    ("portaria", "EventoAcesso", "pessoa_nome"),
+    ("portaria", "Veiculo", "placa"),
+    ("condominio", "Morador", "nome"),
+    ("condominio", "Bicicleta", "modelo"),
+)
+
+FUNCAO_PG = """
+CREATE OR REPLACE FUNCTION portaria_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+"""
+
+
+def _dobrar(texto):
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def _campos(apps):
+    for app_label, nome, campo in CAMPOS:
+        modelo = apps.get_model(app_label, nome)
+        yield modelo, campo, modelo._meta.get_field(campo).column
+
+
+def _indice_pg(tabela, coluna):
+    return f"{tabela}_{coluna}_trgm"
+
+
+def _tabelas_sqlite(tabela, coluna):
+    base = f"busca_{tabela}_{coluna}"
+    return f"{base}_dados", base
+
+
+def _criar_sqlite(cur, tabela, coluna):
+    dados, fts = _tabelas_sqlite(tabela, coluna)
+    cur.execute(f'CREATE TABLE IF NOT EXISTS "{dados}" (id INTEGER PRIMARY KEY, pk UNIQUE NOT NULL, valor TEXT)')
+    cur.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+        f"valor, content='{dados}', content_rowid='id', tokenize='trigram')"
+    )
+    # Triggers padrão de conteúdo externo do FTS5 (só SQL nativo)
+    cur.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{dados}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, valor) VALUES (new.id, new.valor); END'
+    )
+    cur.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{dados}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, valor) VALUES (\'delete\', old.id, old.valor); END'
+    )
+    cur.execute(
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE ON "{dados}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, valor) VALUES (\'delete\', old.id, old.valor); '
+        f'INSERT INTO "{fts}"(rowid, valor) VALUES (new.id, new.valor); END'
+    )
+
+
+def _popular_sqlite(cur, conexao, modelo, campo, coluna):
+    dados, _ = _tabelas_sqlite(modelo._meta.db_table, coluna)
+    pk = modelo._meta.pk
+    linhas = [
+        (pk.get_db_prep_value(valor_pk, conexao), _dobrar(texto))
+        for valor_pk, texto in modelo._default_manager.using(conexao.alias).values_list("pk", campo).iterator()
+    ]
+    cur.execute(f'DELETE FROM "{dados}"')
+    cur.executemany(f'INSERT INTO "{dados}"(pk, valor) VALUES (%s, %s)', linhas)
+
+
+def criar(apps, schema_editor):
+    conexao = schema_editor.connection
+    with conexao.cursor() as cur:
+        if conexao.vendor == "postgresql":
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+            cur.execute(FUNCAO_PG)
+            for modelo, _, coluna in _campos(apps):
+                tabela = modelo._meta.db_table
+                indice = _indice_pg(tabela, coluna)
+                # Um CONCURRENTLY que falhou deixa o índice INVALID, e o IF NOT EXISTS
+                # o manteria assim: remove antes de criar de novo
+                cur.execute(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = %s AND NOT i.indisvalid",
+                    [indice],
+                )
+                if cur.fetchone():
+                    cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{indice}"')
+                # CONCURRENTLY: não bloqueia gravações nas tabelas grandes (migração não atômica)
+                cur.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{indice}" '
+                    f'ON "{tabela}" USING gin (UPPER(portaria_unaccent("{coluna}")) gin_trgm_ops)'
+                )
+        elif conexao.vendor == "sqlite":
+            for modelo, campo, coluna in _campos(apps):
+                _criar_sqlite(cur, modelo._meta.db_table, coluna)
+                _popular_sqlite(cur, conexao, modelo, campo, coluna)
+
+
+def remover(apps, schema_editor):
+    conexao = schema_editor.connection
+    with conexao.cursor() as cur:
+        for modelo, _, coluna in _campos(apps):
+            tabela = modelo._meta.db_table
+            if conexao.vendor == "postgresql":
+                cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{_indice_pg(tabela, coluna)}"')
+            elif conexao.vendor == "sqlite":
+                dados, fts = _tabelas_sqlite(tabela, coluna)
+                cur.execute(f'DROP TABLE IF EXISTS "{fts}"')
+                cur.execute(f'DROP TABLE IF EXISTS "{dados}"')
+        if conexao.vendor == "postgresql":
+            cur.execute("DROP FUNCTION IF EXISTS portaria_unaccent(text)")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('condominio', '0011_morador_boleto_id_morador_face_id_morador_foto'),
+        ('portaria', '0028_contador_diario'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar, remover),
+    ]
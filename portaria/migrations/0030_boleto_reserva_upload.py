@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0029_indices_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boletorecebido',
+            name='content_version_id',
+            field=models.CharField(blank=True, max_length=18),
+        ),
+        migrations.AddField(
+            model_name='boletorecebido',
+            name='reservado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
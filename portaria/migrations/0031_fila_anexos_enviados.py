@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portaria', '0030_boleto_reserva_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filaintegracao',
+            name='anexos_enviados',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -52,6 +52,25 @@ class Encomenda(models.Model):
             ("pode_entregar_encomenda", "Pode entregar/baixar encomenda"),
             ("pode_receber_encomenda", "Pode receber/registrar chegada de encomenda"),
         ]
+        indexes = [
+            # Lista de encomendas: condomínio + período (+ status), mais recentes primeiro
+            models.Index(fields=["condominio", "-data_recebimento"], name="encomenda_cond_data_idx"),
+            models.Index(fields=["condominio", "status", "-data_recebimento"], name="encomenda_cond_st_data_idx"),
+            # Só as pendentes (dashboard, sincronização de senhas)
+            models.Index(
+                fields=["condominio", "-data_recebimento"],
+                condition=models.Q(status="RECEBIDA"),
+                name="encomenda_pendente_idx",
+            ),
+        ]
+
+    @property
+    def status_integracao(self):
+        """Status da integração com o Salesforce (usa fila_integracao pré-carregada)."""
+        fila = next(iter(self.fila_integracao.all()), None)
+        if fila:
+            return fila.status
+        return "Integrada" if self.salesforce_ticket_id else "—"
 
 
 def __str__(self):
@@ -96,6 +115,12 @@ class EventoAcesso(models.Model):
     sf_visitor_log_id = models.CharField("Salesforce VisitorLog Id", max_length=18, blank=True)
     data_checkin = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["condominio", "-criado_em"], name="acesso_cond_criado_idx"),
+            models.Index(fields=["-criado_em"], name="acesso_criado_idx"),
+        ]
+
 
 class Meta:
     permissions = [
@@ -123,10 +148,25 @@ class VisitorLog(models.Model):
 
     sf_visitor_log_id = models.CharField(max_length=32, blank=True)  # VisitorLogId do SF
 
+    # Réplica de reda__Visitor_Log__c usada pela tela de pré-aprovados
+    telefone = models.CharField(max_length=40, blank=True)                  # reda__Guest_Phone__c
+    contato_nome = models.CharField(max_length=120, blank=True)             # reda__Contact__r.Name
+    sf_property_id = models.CharField(max_length=18, blank=True)            # reda__Property__c (unidade)
+    unidade_nome = models.CharField(max_length=120, blank=True)             # reda__Property__r.Name
+    sf_region_id = models.CharField(max_length=18, blank=True)              # reda__Property__r.reda__Region__c
+    permitido_ate = models.DateTimeField(null=True, blank=True)             # reda__Permitted_Till_Datetime__c
+    sf_modificado_em = models.DateTimeField(null=True, blank=True)          # SystemModstamp
+
     class Meta:
         indexes = [
             models.Index(fields=["created_date"]),
             models.Index(fields=["nome"]),
+            models.Index(fields=["condominio", "-created_date"]),
+            models.Index(fields=["sf_region_id", "-created_date"]),
+            models.Index(fields=["sf_property_id"]),
+            models.Index(fields=["telefone"]),
+            models.Index(fields=["contato_nome"]),
+            models.Index(fields=["permitido_ate"]),
         ]
         ordering = ["-created_date", "-imported_at"]
 
@@ -159,13 +199,117 @@ class Veiculo(models.Model):
         return f"{self.placa} - {self.modelo} ({self.cor})"
 
 class FilaIntegracao(models.Model):
+    MAX_TENTATIVAS = 8
+
     Encomenda = models.ForeignKey(Encomenda, on_delete=models.CASCADE,related_name="fila_integracao")
     Tentativas = models.IntegerField(default=0)
     criado_em = models.DateTimeField(auto_now_add=True)
     integrado_em = models.DateTimeField(null=True, blank=True)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    # Arquivos já enviados ({caminho: ContentVersion Id}): nova tentativa só vincula
+    anexos_enviados = models.JSONField(default=dict, blank=True)
 
     class Meta:
         unique_together = ("Encomenda",)
+        indexes = [
+            models.Index(fields=["integrado_em", "proxima_tentativa"]),
+        ]
+
+    @property
+    def status(self):
+        if self.integrado_em:
+            return "Integrada"
+        if self.Tentativas >= self.MAX_TENTATIVAS:
+            return "Falhou"
+        return "Pendente"
 
     def __str__(self):
         return f"{self.Encomenda} - Criado em {self.criado_em}"
+
+
+class MarcaSincronizacao(models.Model):
+    """High-water mark (SystemModstamp) das sincronizações incrementais com o Salesforce."""
+    nome = models.CharField(max_length=100, unique=True)
+    ultima_modificacao = models.DateTimeField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nome}: {self.ultima_modificacao}"
+
+
+class MetricaContador(models.TextChoices):
+    ENCOMENDAS_TOTAL = 'ENC_TOTAL', 'Encomendas (total)'
+    ENCOMENDAS_PENDENTES = 'ENC_PENDENTES', 'Encomendas pendentes'
+    ENCOMENDAS_RECEBIDAS = 'ENC_RECEBIDAS', 'Encomendas recebidas no dia'
+    ENCOMENDAS_ENTREGUES = 'ENC_ENTREGUES', 'Encomendas entregues no dia'
+    ACESSOS = 'ACESSOS', 'Acessos no dia'
+
+
+class ContadorDiario(models.Model):
+    """
+    Contadores do dashboard por condomínio, dia (local) e métrica, mantidos
+    pelos signals de Encomenda/EventoAcesso (portaria/contadores.py).
+    Totais que não são do dia (total, pendentes) ficam em dia=DIA_ACUMULADO.
+    """
+    condominio = models.ForeignKey(Condominio, on_delete=models.CASCADE, related_name="contadores")
+    dia = models.DateField()
+    metrica = models.CharField(max_length=15, choices=MetricaContador.choices)
+    valor = models.IntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["condominio", "dia", "metrica"], name="contador_cond_dia_metrica_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.condominio_id} {self.dia} {self.metrica}={self.valor}"
+
+
+class StatusBoleto(models.TextChoices):
+    PENDENTE = 'PENDENTE', 'Pendente'
+    PROCESSANDO = 'PROCESSANDO', 'Processando'
+    CONCLUIDO = 'CONCLUIDO', 'Concluído'
+    ERRO = 'ERRO', 'Erro'
+
+
+class BoletoRecebido(models.Model):
+    """Boleto recebido pelo webhook, gravado em disco e enviado ao REDA por um worker."""
+    MAX_TENTATIVAS = 3
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lote = models.UUIDField(null=True, blank=True, db_index=True)
+    documento = models.CharField(max_length=20)
+    arquivo = models.FileField(upload_to="boletos/", blank=True)
+    nome_arquivo = models.CharField(max_length=255)
+    status = models.CharField(max_length=12, choices=StatusBoleto.choices, default=StatusBoleto.PENDENTE)
+    tentativas = models.IntegerField(default=0)
+    resultado = models.JSONField(default=dict, blank=True)
+    erro = models.TextField(blank=True)
+    # Upload já feito: numa nova tentativa só falta vincular (evita cópias do PDF na pasta)
+    content_version_id = models.CharField(max_length=18, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    # Início do processamento: PROCESSANDO mais antigo que boletos.RESERVA volta para a fila
+    reservado_em = models.DateTimeField(null=True, blank=True)
+    processado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "criado_em"]),
+        ]
+
+    def __str__(self):
+        return f"Boleto {self.nome_arquivo} ({self.documento}) - {self.get_status_display()}"
+
+    def como_dict(self):
+        return {
+            "job_id": str(self.id),
+            "lote": str(self.lote) if self.lote else None,
+            "arquivo": self.nome_arquivo,
+            "status": self.status,
+            "resultado": self.resultado,
+            "erro": self.erro,
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "processado_em": self.processado_em.isoformat() if self.processado_em else None,
+        }
@@ -0,0 +1,111 @@
+# portaria/paginacao.py
+"""
+Paginação por keyset (cursor) para as listas grandes da portaria.
+
+Em vez de OFFSET, cada página continua a partir da última linha da anterior:
+WHERE (campo, id) < (valor, id) ORDER BY campo DESC, id DESC LIMIT n+1.
+O custo não cresce com o número da página. Os links de próxima/anterior
+levam um token opaco e assinado (django.core.signing) com a posição.
+
+O total exibido ("Página 3 de 40") vem de um COUNT guardado no cache por
+TOTAL_TTL segundos por filtro, e não é refeito a cada página.
+"""
+import hashlib
+from math import ceil
+from typing import List, Optional
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
+
+TOTAL_TTL = 60
+_SALT = "portaria.paginacao"
+
+
+class PaginaKeyset:
+    """Página com a mesma interface usada pelos templates (has_next, number, paginator...)."""
+
+    def __init__(self, objetos: List, paginator: "KeysetPaginator", number: int,
+                 next_token: Optional[str], previous_token: Optional[str]):
+        self.object_list = objetos
+        self.paginator = paginator
+        self.number = number
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_token is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_token is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    def __init__(self, qs: QuerySet, campo: str, per_page: int = 20):
+        self.qs = qs.order_by(f"-{campo}", "-id")
+        self.campo = campo
+        self.per_page = per_page
+
+    # -- total (em cache) ----------------------------------------------------
+    @property
+    def count(self) -> int:
+        sql, params = self.qs.query.sql_with_params()
+        digest = hashlib.sha1(f"{sql}|{params}".encode()).hexdigest()
+        return cache.get_or_set(f"pag:total:{digest}", self.qs.count, TOTAL_TTL)
+
+    @property
+    def num_pages(self) -> int:
+        return max(1, ceil(self.count / self.per_page))
+
+    # -- tokens --------------------------------------------------------------
+    def _token(self, obj, direcao: str, number: int) -> str:
+        valor = getattr(obj, self.campo)
+        return signing.dumps(
+            {"v": valor.isoformat() if valor else None, "id": str(obj.pk), "d": direcao, "n": number},
+            salt=_SALT,
+        )
+
+    def _ler_token(self, token: Optional[str]) -> Optional[dict]:
+        if not token:
+            return None
+        try:
+            return signing.loads(token, salt=_SALT)
+        except signing.BadSignature:
+            return None
+
+    # -- página --------------------------------------------------------------
+    def get_page(self, token: Optional[str] = None) -> PaginaKeyset:
+        pos = self._ler_token(token)
+        if pos is None:
+            return self._montar(list(self.qs[: self.per_page + 1]), number=1, tem_anterior=False)
+
+        valor, pk = pos["v"], pos["id"]
+        if pos["d"] == "p":
+            # Página anterior: anda para trás na ordem crescente e inverte
+            filtro = Q(**{f"{self.campo}__gt": valor}) | Q(**{self.campo: valor, "id__gt": pk})
+            linhas = list(self.qs.filter(filtro).order_by(self.campo, "id")[: self.per_page + 1])
+            tem_anterior = len(linhas) > self.per_page
+            linhas = linhas[: self.per_page][::-1]
+            pagina = self._montar(linhas, number=max(1, pos["n"]), tem_anterior=tem_anterior, tem_proxima=True)
+            return pagina if linhas else self.get_page()
+
+        filtro = Q(**{f"{self.campo}__lt": valor}) | Q(**{self.campo: valor, "id__lt": pk})
+        return self._montar(list(self.qs.filter(filtro)[: self.per_page + 1]), number=pos["n"], tem_anterior=True)
+
+    def _montar(self, linhas: List, number: int, tem_anterior: bool,
+                tem_proxima: Optional[bool] = None) -> PaginaKeyset:
+        if tem_proxima is None:
+            tem_proxima = len(linhas) > self.per_page
+            linhas = linhas[: self.per_page]
+        next_token = self._token(linhas[-1], "n", number + 1) if tem_proxima and linhas else None
+        previous_token = self._token(linhas[0], "p", number - 1) if tem_anterior and linhas else None
+        return PaginaKeyset(linhas, self, number, next_token, previous_token)
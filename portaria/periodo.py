@@ -0,0 +1,51 @@
+# portaria/periodo.py
+"""
+Filtros de data das listas como intervalos semiabertos de timestamp.
+
+`campo__date__gte` obriga o banco a converter cada linha (CAST/AT TIME ZONE)
+e impede o uso do índice. Aqui o dia local (TIME_ZONE = America/Sao_Paulo) é
+convertido uma vez em [início, fim) aware, e o filtro vira
+campo >= início AND campo < fim, que usa os índices (condominio, campo).
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple, Union
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+DataOuTexto = Union[date, str, None]
+
+
+def _data(valor: DataOuTexto) -> Optional[date]:
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    try:
+        return parse_date(valor)
+    except ValueError:
+        return None
+
+
+def inicio_do_dia(d: date) -> datetime:
+    """00:00 do dia `d` no fuso local, como datetime aware."""
+    return timezone.make_aware(datetime.combine(d, time.min), timezone.get_default_timezone())
+
+
+def intervalo_local(dt_ini: DataOuTexto, dt_fim: DataOuTexto) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """(início inclusivo, fim exclusivo) para os dias locais dt_ini..dt_fim."""
+    d0, d1 = _data(dt_ini), _data(dt_fim)
+    return (
+        inicio_do_dia(d0) if d0 else None,
+        inicio_do_dia(d1 + timedelta(days=1)) if d1 else None,
+    )
+
+
+def filtrar_periodo(qs: QuerySet, campo: str, dt_ini: DataOuTexto, dt_fim: DataOuTexto) -> QuerySet:
+    inicio, fim = intervalo_local(dt_ini, dt_fim)
+    if inicio:
+        qs = qs.filter(**{f"{campo}__gte": inicio})
+    if fim:
+        qs = qs.filter(**{f"{campo}__lt": fim})
+    return qs
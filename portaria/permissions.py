@@ -1,8 +1,10 @@
-from condominio.models import Condominio
+from portaria import escopo
+
 
 def allowed_condominios_for(user):
-    if not user.is_authenticated:
-        return Condominio.objects.none()
-    if user.is_superuser or user.groups.filter(name="Administrador").exists():
-        return Condominio.objects.all()
-    return user.condominios_permitidos.all()
+    # Memorizado no usuário da requisição (portaria/escopo.py): sem queries repetidas
+    return escopo.do_usuario(user).condominios
+
+
+def is_admin_like(user) -> bool:
+    return escopo.do_usuario(user).admin
@@ -1,12 +1,131 @@
 # portaria/signals.py
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_migrate, post_save
 from django.dispatch import receiver
 from django.db import transaction
 
-from .models import Encomenda
-from integrations.sf_tickets import sync_encomenda_to_salesforce
+from .models import Encomenda, EventoAcesso, Parametro, Veiculo
+from core import params
+from portaria import busca, contadores, escopo
+from condominio.models import Bicicleta, Bloco, Condominio, Morador, Unidade
+from integrations import idmap, session as sf_session
 
 
+@receiver([post_save, post_delete], sender=Condominio)
+@receiver([post_save, post_delete], sender=Bloco)
+@receiver([post_save, post_delete], sender=Unidade)
+@receiver([post_save, post_delete], sender=Morador)
+def invalidar_mapa_ids(sender, **kwargs):
+    # Depois do commit: os outros processos recarregam já vendo o dado novo
+    transaction.on_commit(idmap.invalidar)
+
+
+# -- escopo de acesso (portaria/escopo.py) -------------------------------------
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=Condominio.usuarios.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_escopo_m2m(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(escopo.invalidar)
+
+
+@receiver([post_save, post_delete], sender=Condominio)
+@receiver([post_save, post_delete], sender=User)
+def invalidar_escopo(sender, update_fields=None, **kwargs):
+    # O login grava só last_login: não muda permissões
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(escopo.invalidar)
+
+
+@receiver(user_logged_in)
+def gravar_escopo_na_sessao(sender, request, user, **kwargs):
+    escopo.limpar_sessao(request.session)
+    escopo.do_usuario(user, request.session)
+
+
+@receiver(user_logged_out)
+def limpar_escopo_da_sessao(sender, request, user, **kwargs):
+    if request is not None:
+        escopo.limpar_sessao(request.session)
+
+
+# -- tabelas de busca do SQLite (portaria/busca.py) ---------------------------
+_CAMPO_BUSCA = {EventoAcesso: "pessoa_nome", Veiculo: "placa", Morador: "nome", Bicicleta: "modelo"}
+
+
+@receiver(post_save, sender=EventoAcesso)
+@receiver(post_save, sender=Veiculo)
+@receiver(post_save, sender=Morador)
+@receiver(post_save, sender=Bicicleta)
+def indexar_busca(sender, instance, update_fields=None, **kwargs):
+    campo = _CAMPO_BUSCA[sender]
+    if update_fields and campo not in update_fields:
+        return
+    busca.indexar(instance, campo)
+
+
+@receiver(post_delete, sender=EventoAcesso)
+@receiver(post_delete, sender=Veiculo)
+@receiver(post_delete, sender=Morador)
+@receiver(post_delete, sender=Bicicleta)
+def desindexar_busca(sender, instance, **kwargs):
+    busca.desindexar(instance, _CAMPO_BUSCA[sender])
+
+
+@receiver(post_migrate)
+def reconhecer_tabelas_busca(sender, **kwargs):
+    busca.esquecer_tabelas()
+
+
+@receiver([post_save, post_delete], sender=Parametro)
+def invalidar_parametros(sender, instance, **kwargs):
+    transaction.on_commit(params.invalidar)
+    # Credenciais novas: descarta a sessão compartilhada para o próximo uso logar com elas
+    if instance.ParametroNome.startswith("SF_"):
+        transaction.on_commit(sf_session.invalidate_session)
+
+
+# -- contadores do dashboard (portaria/contadores.py) ---------------------------
+_RASTREADOS = {
+    Encomenda: (contadores.CAMPOS_ENCOMENDA, contadores.parcelas_encomenda),
+    EventoAcesso: (contadores.CAMPOS_ACESSO, contadores.parcelas_acesso),
+}
+
+
+@receiver(post_init, sender=Encomenda)
+@receiver(post_init, sender=EventoAcesso)
+def guardar_estado_contadores(sender, instance, **kwargs):
+    campos, _ = _RASTREADOS[sender]
+    instance._estado_contadores = contadores.estado(instance, campos)
+
+
+@receiver(post_save, sender=Encomenda)
+@receiver(post_save, sender=EventoAcesso)
+def atualizar_contadores(sender, instance, created, update_fields=None, **kwargs):
+    campos, parcelas = _RASTREADOS[sender]
+    if update_fields and not {c.removesuffix("_id") for c in campos} & set(update_fields):
+        return
+    antes = None if created else getattr(instance, "_estado_contadores", None)
+    depois = contadores.estado(instance, campos)
+    if depois is None or (antes is None and not created):
+        return  # estado desconhecido: fica para a reconciliação
+    contadores.aplicar(contadores.diferenca(parcelas(antes), parcelas(depois)))
+    instance._estado_contadores = depois
+
+
+@receiver(post_delete, sender=Encomenda)
+@receiver(post_delete, sender=EventoAcesso)
+def descontar_contadores(sender, instance, **kwargs):
+    campos, parcelas = _RASTREADOS[sender]
+    antes = getattr(instance, "_estado_contadores", None) or contadores.estado(instance, campos)
+    contadores.aplicar(contadores.diferenca(parcelas(antes), parcelas(None)))
+
+
+# from integrations.sf_tickets import sync_encomenda_to_salesforce
 # @receiver(post_save, sender=Encomenda)
 # def criar_ticket_sf_quando_criar_encomenda(sender, instance, created, **kwargs):
 #     if not created:
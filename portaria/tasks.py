@@ -1,48 +1,101 @@
 from celery import shared_task
-from integrations.allvisitorlogs import sf_connect
-from portaria.models import Encomenda
+from integrations.governanca import tarefa_salesforce
+from integrations.session import sf_connect
+from integrations.sf_tickets import buscar_senhas_tickets
+from portaria.models import Encomenda, StatusEncomenda
 
 @shared_task
+@tarefa_salesforce
 def atualizar_senhas_encomendas():
     """
     Sincroniza periodicamente o campo SenhaRetirada das encomendas com o Salesforce.
+    Só considera encomendas ainda não retiradas (RECEBIDA) e busca as senhas
+    em lotes de Ids, gravando tudo com um único bulk_update.
     """
-    sf = sf_connect()
-    total = 0
-    erros = 0
+    encomendas = list(
+        Encomenda.objects
+        .filter(status=StatusEncomenda.RECEBIDA)
+        .exclude(salesforce_ticket_id="")
+        .exclude(salesforce_ticket_id__isnull=True)
+        .only("id", "salesforce_ticket_id", "SenhaRetirada")
+    )
+    if not encomendas:
+        return {"atualizadas": 0, "erros": 0}
 
-    encomendas = Encomenda.objects.filter(
-        salesforce_ticket_id__isnull=False
-    ).exclude(salesforce_ticket_id="")
+    sf = sf_connect()
+    try:
+        senhas = buscar_senhas_tickets(sf, [e.salesforce_ticket_id for e in encomendas])
+    except Exception as ex:
+        print(f"⚠️ Erro ao buscar senhas no Salesforce: {ex}")
+        return {"atualizadas": 0, "erros": 1}
 
+    alteradas = []
     for e in encomendas:
-        try:
-            soql = f"""
-                SELECT Id, Password__c
-                FROM reda__Ticket__c
-                WHERE Id = '{e.salesforce_ticket_id}'
-                AND Password__c != null
-            """
-            result = sf.query(soql).get("records", [])
-            if result:
-                senha = result[0].get("Password__c")
-                if senha and e.SenhaRetirada != senha:
-                    e.SenhaRetirada = senha
-                    e.save(update_fields=["SenhaRetirada"])
-                    total += 1
-                    print(f"✅ Atualizado {e.id}: nova senha {senha}")
-        except Exception as ex:
-            erros += 1
-            print(f"⚠️ Erro ao atualizar {e.id}: {ex}")
-
-    print(f"📦 Atualização concluída: {total} encomendas atualizadas, {erros} erros.")
-    return {"atualizadas": total, "erros": erros}
+        senha = senhas.get(e.salesforce_ticket_id[:15])
+        if senha and e.SenhaRetirada != senha:
+            e.SenhaRetirada = senha
+            alteradas.append(e)
+
+    Encomenda.objects.bulk_update(alteradas, ["SenhaRetirada"], batch_size=500)
+
+    print(f"📦 Atualização concluída: {len(alteradas)} encomendas atualizadas de {len(encomendas)} pendentes.")
+    return {"atualizadas": len(alteradas), "erros": 0}
 
 @shared_task
+@tarefa_salesforce
+def processar_fila_integracao(limite=20):
+    """Drena a FilaIntegracao (criação de Tickets das encomendas) em lotes."""
+    from integrations.fila_integracao import processar_fila
+
+    return processar_fila(limite)
+
+@shared_task
+@tarefa_salesforce
+def sincronizar_visitor_logs_task():
+    """Mantém a réplica local de reda__Visitor_Log__c (VisitorLog) atualizada."""
+    from integrations.sync_visitor_logs import sincronizar_visitor_logs
+
+    return sincronizar_visitor_logs()
+
+@shared_task
+@tarefa_salesforce
 def atualiza_acesso_salesforce_task():
-    from .views import atualiza_acesso_salesforce
+    from integrations.sync_acessos import sincronizar_acessos
 
-    # Chama sua rotina sem request
     print("🔄 Iniciando atualização de acessos no Salesforce...")
-    atualiza_acesso_salesforce(None)
-    print("✅ Atualização concluída com sucesso.")
\ No newline at end of file
+    resultado = sincronizar_acessos()
+    print("✅ Atualização concluída com sucesso.")
+    return resultado
+
+@shared_task
+@tarefa_salesforce
+def processar_boleto_task(boleto_id):
+    """Envia ao REDA um boleto recebido pelo webhook."""
+    from integrations.boletos import processar_boleto
+
+    return processar_boleto(boleto_id)
+
+@shared_task
+@tarefa_salesforce
+def processar_boletos_pendentes_task(limite=100):
+    """Reprocessa boletos pendentes (retentativas e disparos perdidos)."""
+    from integrations.boletos import processar_pendentes
+
+    return processar_pendentes(limite)
+
+@shared_task
+@tarefa_salesforce
+def sincronizar_propriedades_task():
+    """Sincroniza propriedades, unidades e moradores do Salesforce."""
+    from integrations.sync_propriedades import sincronizar_propriedades
+
+    resultado = sincronizar_propriedades()
+    resultado.pop("detalhes", None)
+    return resultado
+
+@shared_task
+def reconciliar_contadores_task(dias=2):
+    """Corrige divergências dos contadores do dashboard (ContadorDiario) com as tabelas."""
+    from portaria.contadores import reconciliar
+
+    return reconciliar(dias)
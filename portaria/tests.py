@@ -1,3 +1,1031 @@
-from django.test import TestCase
+from datetime import timedelta
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from condominio.models import Bloco, Condominio, Morador, Unidade
+from core.versao_cache import Recarregavel
+from integrations import fila_integracao, governanca, idmap, query_cache, salesforce_file, session as sf_session, sf as sf_visitantes
+from integrations.marcas import gravar_marca, ler_marca
+from integrations.sf_tickets import buscar_senhas_tickets
+from integrations.sync_acessos import MARCA as MARCA_ACESSOS, sincronizar_acessos
+from integrations.sync_propriedades import sincronizar_propriedades
+from integrations.soql import parse_sf_datetime, soql_datetime
+from portaria import busca, contadores, escopo
+from portaria.models import (Encomenda, EventoAcesso, FilaIntegracao, MetricaContador, Parametro,
+                             ResultadoAcesso, StatusEncomenda, TipoPessoa, VisitorLog)
+from portaria.paginacao import KeysetPaginator
+from portaria.tasks import atualizar_senhas_encomendas
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def criar_unidade(nome="Residencial Aurora"):
+    condominio = Condominio.objects.create(nome=nome)
+    bloco = Bloco.objects.create(condominio=condominio, nome="A")
+    return Unidade.objects.create(bloco=bloco, numero="101")
+
+
+def criar_usuario(username="porteiro"):
+    return get_user_model().objects.create_user(username=username, password="x")
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class BuscaTests(TestCase):
+    def setUp(self):
+        busca._fts_ok.clear()
+        self.unidade = criar_unidade()
+        self.joao = Morador.objects.create(nome="João Ávila", unidade=self.unidade)
+        self.maria = Morador.objects.create(nome="MARIA CONCEIÇÃO", unidade=self.unidade)
+
+    def buscar(self, termo, campo="nome", qs=None):
+        return busca.filtrar(Morador.objects.all() if qs is None else qs, campo, termo)
+
+    def test_ignora_acentos_e_maiusculas(self):
+        self.assertEqual(list(self.buscar("joao")), [self.joao])
+        self.assertEqual(list(self.buscar("AVILA")), [self.joao])
+        self.assertEqual(list(self.buscar("conceicao")), [self.maria])
+        self.assertEqual(list(self.buscar("Conceição")), [self.maria])
+        self.assertFalse(self.buscar("pedro").exists())
+
+    @skipUnless(connection.vendor == "sqlite", "tabelas FTS5 só existem no SQLite")
+    def test_termo_longo_usa_indice_e_curto_cai_no_icontains(self):
+        self.assertIn("MATCH", str(self.buscar("joa").query))
+
+        curto = self.buscar("Jo")
+        self.assertNotIn("MATCH", str(curto.query))
+        self.assertEqual(list(curto), [self.joao])
+
+    def test_busca_atravessa_fk(self):
+        unidades = busca.filtrar(Unidade.objects.all(), "moradores__nome", "joao")
+        self.assertEqual(list(unidades), [self.unidade])
+
+    @skipUnless(connection.vendor == "sqlite", "tabelas sombra só existem no SQLite")
+    def test_tabela_sombra_acompanha_save_e_delete(self):
+        dados, _ = busca.tabelas(Morador._meta.db_table, "nome")
+
+        self.joao.nome = "Zé Ninguém"
+        self.joao.save()
+        self.assertFalse(self.buscar("joao").exists())
+        self.assertEqual(list(self.buscar("ninguem")), [self.joao])
+
+        pk = self.joao.pk
+        self.joao.delete()
+        self.assertFalse(self.buscar("ninguem").exists())
+        with connection.cursor() as cur:
+            cur.execute(f'SELECT COUNT(*) FROM "{dados}" WHERE pk = %s', [pk])
+            self.assertEqual(cur.fetchone()[0], 0)
+
+    @skipUnless(connection.vendor == "sqlite", "tabelas sombra só existem no SQLite")
+    def test_indexar_varios_depois_de_bulk(self):
+        novos = Morador.objects.bulk_create([Morador(nome="Antônio Gonçalves", unidade=self.unidade)])
+        self.assertFalse(self.buscar("goncalves").exists())
+
+        busca.indexar_varios(novos, "nome")
+        self.assertEqual(list(self.buscar("goncalves")), novos)
+
+    @skipUnless(connection.vendor == "sqlite", "tabelas FTS5 só existem no SQLite")
+    def test_ausencia_das_tabelas_nao_fica_guardada(self):
+        # Processo que consultou antes da migração criar as tabelas
+        busca._fts_ok[connection.alias] = False
+        self.assertIn("MATCH", str(self.buscar("joao").query))
+
+    def test_sem_acento_fora_do_postgresql_nao_altera_o_campo(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("no PostgreSQL o transform usa portaria_unaccent")
+        sql = str(Morador.objects.filter(nome__sem_acento__icontains="joao").query)
+        self.assertNotIn("portaria_unaccent", sql)
+
+    @skipUnless(connection.vendor == "postgresql", "índice GIN só existe no PostgreSQL")
+    def test_expressao_do_filtro_usa_o_indice_trigram(self):
+        indice = busca.indice_pg(Morador._meta.db_table, "nome")
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+        plano = self.buscar("joao").explain()
+        self.assertIn(indice, plano)
+
+
+class ContadoresTests(TestCase):
+    SEM_CORRECAO = {"novos": 0, "alterados": 0, "removidos": 0}
+
+    def setUp(self):
+        self.usuario = criar_usuario()
+        self.unidade = criar_unidade()
+        self.condominio = self.unidade.bloco.condominio
+        self.morador = Morador.objects.create(nome="João", unidade=self.unidade)
+
+    def receber(self, unidade=None, morador=None):
+        unidade = unidade or self.unidade
+        return Encomenda.objects.create(
+            condominio=unidade.bloco.condominio, unidade=unidade,
+            destinatario=morador or self.morador, recebido_por=self.usuario,
+        )
+
+    def registrar_acesso(self):
+        return EventoAcesso.objects.create(
+            condominio=self.condominio, pessoa_tipo=TipoPessoa.AMIGOS, pessoa_nome="Visitante",
+            resultado=ResultadoAcesso.PERMITIDO, criado_por=self.usuario,
+        )
+
+    def assertConsistente(self):
+        self.assertEqual(contadores.reconciliar(None), self.SEM_CORRECAO)
+
+    def test_signals_mantem_contadores_sem_correcao(self):
+        encomenda = self.receber()
+        self.assertConsistente()
+
+        encomenda.status = StatusEncomenda.ENTREGUE
+        encomenda.data_entrega = timezone.now()
+        encomenda.entregue_por = self.usuario
+        encomenda.save()
+        self.assertConsistente()
+
+        Encomenda.objects.get(pk=encomenda.pk).delete()
+        self.assertConsistente()
+
+        acesso = self.registrar_acesso()
+        self.assertConsistente()
+        acesso.delete()
+        self.assertConsistente()
+
+    def test_reconciliar_corrige_escrita_sem_signal(self):
+        encomenda = self.receber()
+        Encomenda.objects.filter(pk=encomenda.pk).update(status=StatusEncomenda.DEVOLVIDA)
+
+        self.assertEqual(contadores.reconciliar(None), {"novos": 0, "alterados": 0, "removidos": 1})
+        self.assertEqual(contadores.resumo([self.condominio.pk])[MetricaContador.ENCOMENDAS_PENDENTES], 0)
+        self.assertConsistente()
+
+    def test_resumo_soma_so_os_condominios_pedidos(self):
+        outra = criar_unidade("Residencial Boreal")
+        self.receber()
+        self.receber()
+        self.receber(outra, Morador.objects.create(nome="Maria", unidade=outra))
+        self.registrar_acesso()
+
+        resumo = contadores.resumo([self.condominio.pk])
+        self.assertEqual(resumo[MetricaContador.ENCOMENDAS_TOTAL], 2)
+        self.assertEqual(resumo[MetricaContador.ENCOMENDAS_PENDENTES], 2)
+        self.assertEqual(resumo[MetricaContador.ENCOMENDAS_RECEBIDAS], 2)
+        self.assertEqual(resumo[MetricaContador.ACESSOS], 1)
+
+        outro = contadores.resumo(Condominio.objects.filter(pk=outra.bloco.condominio_id))
+        self.assertEqual(outro[MetricaContador.ENCOMENDAS_TOTAL], 1)
+        self.assertEqual(outro[MetricaContador.ACESSOS], 0)
+
+        todos = contadores.resumo(Condominio.objects.all())
+        self.assertEqual(todos[MetricaContador.ENCOMENDAS_TOTAL], 3)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = criar_usuario()
+        self.condominio = criar_unidade().bloco.condominio
+        # 7 acessos, 5 deles no mesmo instante: o desempate é pelo id
+        base = timezone.now().replace(microsecond=0)
+        instantes = [base] * 5 + [base - timedelta(minutes=1), base + timedelta(minutes=1)]
+        for i, instante in enumerate(instantes):
+            acesso = EventoAcesso.objects.create(
+                condominio=self.condominio, pessoa_tipo=TipoPessoa.AMIGOS, pessoa_nome=f"Visitante {i}",
+                resultado=ResultadoAcesso.PERMITIDO, criado_por=self.usuario,
+            )
+            EventoAcesso.objects.filter(pk=acesso.pk).update(criado_em=instante)
+        self.qs = EventoAcesso.objects.all()
+        self.ordem = list(self.qs.order_by("-criado_em", "-id"))
+
+    def paginas(self, paginator):
+        pagina = paginator.get_page()
+        paginas = [pagina]
+        while pagina.has_next():
+            pagina = paginator.get_page(pagina.next_token)
+            paginas.append(pagina)
+        return paginas
+
+    def test_empates_no_timestamp_nao_repetem_nem_pulam_linhas(self):
+        paginas = self.paginas(KeysetPaginator(self.qs, "criado_em", per_page=2))
+
+        self.assertEqual([p.number for p in paginas], [1, 2, 3, 4])
+        self.assertEqual([len(p) for p in paginas], [2, 2, 2, 1])
+        self.assertEqual([obj for p in paginas for obj in p], self.ordem)
+        self.assertFalse(paginas[0].has_previous())
+        self.assertFalse(paginas[-1].has_next())
+
+    def test_anterior_volta_as_mesmas_paginas_na_mesma_ordem(self):
+        paginator = KeysetPaginator(self.qs, "criado_em", per_page=2)
+        paginas = self.paginas(paginator)
+
+        pagina = paginas[-1]
+        for esperada in reversed(paginas[:-1]):
+            pagina = paginator.get_page(pagina.previous_token)
+            self.assertEqual(pagina.number, esperada.number)
+            self.assertEqual(list(pagina), list(esperada))
+            self.assertTrue(pagina.has_next())
+        self.assertFalse(pagina.has_previous())
+
+        # Ida e volta: a próxima da página anterior é a mesma de antes
+        self.assertEqual(list(paginator.get_page(pagina.next_token)), list(paginas[1]))
+
+    def test_token_invalido_volta_para_a_primeira_pagina(self):
+        paginator = KeysetPaginator(self.qs, "criado_em", per_page=3)
+        primeira = paginator.get_page()
+        for token in ("lixo", primeira.next_token[:-2] + "xx"):
+            pagina = paginator.get_page(token)
+            self.assertEqual(pagina.number, 1)
+            self.assertEqual(list(pagina), self.ordem[:3])
+
+    def test_total_fica_em_cache_por_filtro(self):
+        paginator = KeysetPaginator(self.qs, "criado_em", per_page=3)
+        self.assertEqual(paginator.count, 7)
+        self.assertEqual(paginator.num_pages, 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(KeysetPaginator(EventoAcesso.objects.all(), "criado_em", per_page=3).count, 7)
+
+        filtrado = KeysetPaginator(self.qs.filter(pessoa_nome="Visitante 0"), "criado_em")
+        self.assertEqual(filtrado.count, 1)
+
+        cache.clear()
+        EventoAcesso.objects.filter(pessoa_nome="Visitante 0").delete()
+        self.assertEqual(KeysetPaginator(self.qs, "criado_em").count, 6)
+
+
+@mock.patch.object(fila_integracao, "sf_connect")
+@mock.patch.object(fila_integracao, "buscar_senhas_tickets", return_value={})
+@mock.patch.object(fila_integracao, "anexar_arquivos_encomenda")
+@mock.patch.object(fila_integracao, "sync_encomenda_to_salesforce")
+class FilaIntegracaoTests(TestCase):
+    def setUp(self):
+        self.usuario = criar_usuario()
+        self.unidade = criar_unidade()
+        morador = Morador.objects.create(nome="João", unidade=self.unidade)
+        self.encomenda = Encomenda.objects.create(
+            condominio=self.unidade.bloco.condominio, unidade=self.unidade,
+            destinatario=morador, recebido_por=self.usuario,
+        )
+        self.item = fila_integracao.enfileirar_encomenda(self.encomenda)
+
+    def test_reserva_tira_o_lote_da_fila_ate_expirar(self, sync, anexar, senhas, sf_connect):
+        with CaptureQueriesContext(connection) as consultas:
+            reservados = fila_integracao._reservar_lote(10)
+        self.assertEqual([i.pk for i in reservados], [self.item.pk])
+        if connection.features.has_select_for_update_skip_locked:
+            self.assertTrue(any("SKIP LOCKED" in q["sql"] for q in consultas.captured_queries))
+
+        # Reservado: outro worker não pega o mesmo item
+        self.assertEqual(fila_integracao._reservar_lote(10), [])
+        self.item.refresh_from_db()
+        self.assertGreater(self.item.proxima_tentativa, timezone.now() + fila_integracao.RESERVA - timedelta(minutes=1))
+
+        # Reserva expirada (worker morreu no meio): volta para a fila
+        FilaIntegracao.objects.filter(pk=self.item.pk).update(proxima_tentativa=timezone.now())
+        self.assertEqual(len(fila_integracao._reservar_lote(10)), 1)
+
+    def test_falha_aplica_backoff_exponencial(self, sync, anexar, senhas, sf_connect):
+        sync.side_effect = RuntimeError("Salesforce fora do ar")
+
+        for tentativa, espera in ((1, 30), (2, 60), (3, 120)):
+            FilaIntegracao.objects.filter(pk=self.item.pk).update(proxima_tentativa=timezone.now())
+            antes = timezone.now()
+            self.assertEqual(fila_integracao.processar_fila(), {"integradas": 0, "falhas": 1})
+
+            self.item.refresh_from_db()
+            self.assertEqual(self.item.Tentativas, tentativa)
+            self.assertIsNone(self.item.integrado_em)
+            self.assertIn("Salesforce fora do ar", self.item.ultimo_erro)
+            self.assertGreaterEqual(self.item.proxima_tentativa, antes + timedelta(seconds=espera))
+            self.assertLess(self.item.proxima_tentativa, antes + timedelta(seconds=espera + 5))
+
+        # Ainda no backoff: nada a processar
+        self.assertEqual(fila_integracao.processar_fila(), {"integradas": 0, "falhas": 0})
+        self.assertEqual(sync.call_count, 3)
+
+    def test_anexos_rodam_depois_e_nova_tentativa_nao_recria_o_ticket(self, sync, anexar, senhas, sf_connect):
+        sync.return_value = {"id": "500000000000001AAA", "senha": ""}
+        anexar.side_effect = RuntimeError("falha no upload")
+
+        self.assertEqual(fila_integracao.processar_fila(), {"integradas": 0, "falhas": 1})
+        sync.assert_called_once()
+        self.assertEqual(sync.call_args.kwargs, {"anexar": False})
+        self.encomenda.refresh_from_db()
+        self.assertEqual(self.encomenda.salesforce_ticket_id, "500000000000001AAA")
+
+        anexar.side_effect = None
+        senhas.return_value = {"500000000000001": "4321"}
+        FilaIntegracao.objects.filter(pk=self.item.pk).update(proxima_tentativa=timezone.now())
+        self.assertEqual(fila_integracao.processar_fila(), {"integradas": 1, "falhas": 0})
+
+        sync.assert_called_once()
+        self.assertEqual(anexar.call_count, 2)
+        self.assertEqual(anexar.call_args.args[1], "500000000000001AAA")
+        self.item.refresh_from_db()
+        self.assertIsNotNone(self.item.integrado_em)
+        self.encomenda.refresh_from_db()
+        self.assertEqual(self.encomenda.SenhaRetirada, "4321")
+        senhas.assert_called_once_with(sf_connect.return_value, ["500000000000001AAA"])
+
+    def test_progresso_dos_anexos_fica_gravado_entre_tentativas(self, sync, anexar, senhas, sf_connect):
+        sync.return_value = {"id": "500000000000001AAA", "senha": "1"}
+
+        def upload_parcial(encomenda, ticket_id, enviados):
+            enviados["/media/a.pdf"] = "068000000000001AAA"
+            raise RuntimeError("falha no segundo arquivo")
+
+        anexar.side_effect = upload_parcial
+        fila_integracao.processar_fila()
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.anexos_enviados, {"/media/a.pdf": "068000000000001AAA"})
+
+        anexar.side_effect = None
+        FilaIntegracao.objects.filter(pk=self.item.pk).update(proxima_tentativa=timezone.now())
+        fila_integracao.processar_fila()
+        self.assertEqual(anexar.call_args.kwargs["enviados"], {"/media/a.pdf": "068000000000001AAA"})
+
+
+class AnexarArquivosTests(TestCase):
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        self.arquivos = []
+        for nome in ("a.pdf", "b.pdf"):
+            caminho = os.path.join(pasta, nome)
+            with open(caminho, "wb") as f:
+                f.write(b"%PDF")
+            self.arquivos.append((caminho, nome))
+        self.sf = mock.MagicMock()
+        self.sf.query.side_effect = lambda soql: {"records": [{"ContentDocumentId": "069" + soql[-5:]}]}
+        self.sf.restful.return_value = [{"success": True}]
+
+    def test_nova_tentativa_nao_reenvia_arquivos_ja_enviados(self):
+        falhar = {"b.pdf"}
+
+        def criar(sf, caminho, dados):
+            if dados["Title"] in falhar:
+                raise RuntimeError("timeout")
+            return "068" + dados["Title"]
+
+        enviados = {}
+        with mock.patch.object(salesforce_file, "criar_content_version", side_effect=criar) as criar_mock:
+            with self.assertRaises(RuntimeError):
+                salesforce_file.anexar_arquivos_salesforce(self.arquivos, "500X", sf=self.sf, enviados=enviados)
+            self.assertEqual(enviados, {self.arquivos[0][0]: "068a.pdf"})
+            self.sf.restful.assert_not_called()
+
+            falhar.clear()
+            criar_mock.reset_mock()
+            salesforce_file.anexar_arquivos_salesforce(self.arquivos, "500X", sf=self.sf, enviados=enviados)
+
+        self.assertEqual([c.args[1] for c in criar_mock.call_args_list], [self.arquivos[1][0]])
+        self.assertIn("'068a.pdf'", self.sf.query.call_args.args[0])
+        self.assertIn("'068b.pdf'", self.sf.query.call_args.args[0])
+
+    def test_401_em_varios_uploads_renova_a_sessao_uma_vez(self):
+        pasta = os.path.dirname(self.arquivos[0][0])
+        arquivos = []
+        for i in range(5):
+            caminho = os.path.join(pasta, f"{i}.pdf")
+            with open(caminho, "wb") as f:
+                f.write(b"%PDF")
+            arquivos.append((caminho, f"{i}.pdf"))
+
+        sf = ClienteFalso()
+        sf.query = self.sf.query
+        sf.restful = self.sf.restful
+        todos_com_401 = threading.Barrier(len(arquivos), timeout=5)
+
+        def request(metodo, url, data, headers):
+            b"".join(iter(lambda: data.read(1024), b""))
+            if headers["Authorization"] == "Bearer antiga":
+                todos_com_401.wait()
+                return mock.Mock(status_code=401)
+            return mock.Mock(status_code=201, json=lambda: {"id": "068" + data.boundary[:5]})
+
+        sf.session.request = request
+        salesforce_file.anexar_arquivos_salesforce(arquivos, "500X", sf=sf)
+        self.assertEqual(sf.renovacoes, 1)
+
+
+class ClienteFalso:
+    """Salesforce mínimo: sessão com headers e _refresh_session lento (expõe corridas)."""
+
+    base_url = "https://exemplo.my.salesforce.com/services/data/v59.0/"
+
+    def __init__(self):
+        self.session = mock.Mock()
+        self.session_id = "antiga"
+        self.headers = {"Authorization": "Bearer antiga"}
+        self.renovacoes = 0
+
+    def _refresh_session(self):
+        self.renovacoes += 1
+        time.sleep(0.05)
+        self.session_id = f"nova{self.renovacoes}"
+        self.headers = {"Authorization": f"Bearer {self.session_id}"}
+
+
+def visitor_log(i):
+    return {"Id": f"a0V{i:015d}", "Name": f"Visitante {i}",
+            "SystemModstamp": f"2025-01-01T10:{i:02d}:00.000+0000"}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ImportSfVisitorsTests(TestCase):
+    MARCA = "import_sf_visitors"
+
+    def importar(self, registros, *args, falhar=False):
+        def iterar(**kwargs):
+            yield from registros
+            if falhar:
+                raise RuntimeError("conexão caiu")
+
+        with mock.patch("portaria.management.commands.import_sf_visitors.iter_visitor_logs",
+                        side_effect=iterar) as iter_mock:
+            call_command("import_sf_visitors", "--batch-size", "2", *args, stdout=StringIO())
+        return iter_mock
+
+    def test_soql_ordena_por_systemmodstamp_quando_incremental(self):
+        sf = mock.MagicMock()
+        sf.query_all_iter.return_value = []
+        with mock.patch.object(sf_visitantes, "get_all_fields", return_value=["Id", "SystemModstamp"]):
+            list(sf_visitantes.iter_visitor_logs(sf=sf, ordenar=True))
+            list(sf_visitantes.iter_visitor_logs(sf=sf, since=timezone.now()))
+            list(sf_visitantes.iter_visitor_logs(sf=sf))
+        consultas = [c.args[0] for c in sf.query_all_iter.call_args_list]
+        self.assertTrue(consultas[0].endswith("ORDER BY SystemModstamp"))
+        self.assertIn("WHERE SystemModstamp >=", consultas[1])
+        self.assertTrue(consultas[1].endswith("ORDER BY SystemModstamp"))
+        self.assertNotIn("ORDER BY", consultas[2])
+
+    def test_primeira_carga_interrompida_retoma_do_ultimo_lote_gravado(self):
+        registros = [visitor_log(i) for i in range(1, 6)]
+        with self.assertRaises(RuntimeError):
+            self.importar(registros[:4], "--since-watermark", falhar=True)
+        self.assertEqual(ler_marca(self.MARCA), parse_sf_datetime(registros[3]["SystemModstamp"]))
+
+        iter_mock = self.importar(registros[3:], "--since-watermark")
+        self.assertEqual(iter_mock.call_args.kwargs["since"], parse_sf_datetime(registros[3]["SystemModstamp"]))
+        self.assertTrue(iter_mock.call_args.kwargs["ordenar"])
+        self.assertEqual(ler_marca(self.MARCA), parse_sf_datetime(registros[4]["SystemModstamp"]))
+        self.assertEqual(VisitorLog.objects.count(), 5)
+
+    def test_created_nao_avanca_a_marca(self):
+        inicial = parse_sf_datetime(visitor_log(1)["SystemModstamp"])
+        gravar_marca(self.MARCA, inicial)
+        self.importar([visitor_log(i) for i in range(2, 6)], "--since-watermark", "--created", "TODAY")
+        self.assertEqual(ler_marca(self.MARCA), inicial)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class VisitantesPreaprovadosTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", password="x"))
+        self.unidade = criar_unidade()
+        self.condominio = self.unidade.bloco.condominio
+        outra = Unidade.objects.create(bloco=self.unidade.bloco, numero="102")
+        amanha = timezone.now() + timedelta(days=1)
+        for sf_id, unidade, nome in (("a0V1", self.unidade, "101"), ("a0V2", None, "101"),
+                                     ("a0V3", outra, "102"), ("a0V4", None, "102")):
+            VisitorLog.objects.create(sf_id=sf_id, nome=sf_id, condominio=self.condominio, unidade=unidade,
+                                      unidade_nome=nome, permitido_ate=amanha)
+
+    def test_filtro_por_unidade_inclui_registros_ainda_sem_unidade_resolvida(self):
+        resposta = self.client.get(reverse("visitantes_preaprovados"), {"unidade": self.unidade.pk})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(sorted(v.sf_id for v in resposta.context["visitantes"]), ["a0V1", "a0V2"])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class BoletoStatusTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        configuracao = override_settings(MEDIA_ROOT=media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def enviar(self):
+        return self.client.post(reverse("webhook_boleto_reda_lote"), {
+            "documento": ["123.456.789-00", "987.654.321-00"],
+            "boleto": [SimpleUploadedFile("a.pdf", b"%PDF"), SimpleUploadedFile("b.pdf", b"%PDF")],
+        }).json()
+
+    def test_status_exige_o_token_do_webhook_e_nao_expoe_documento(self):
+        lote = self.enviar()
+        resposta = self.client.get(lote["status_url"])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["total"], 2)
+        self.assertTrue(all("documento" not in job for job in resposta.json()["jobs"]))
+
+        job_id = lote["jobs"][0]["job_id"]
+        self.assertEqual(self.client.get(reverse("boleto_status", args=[job_id])).status_code, 403)
+        # Token do lote não vale para o job (e vice-versa)
+        token_lote = lote["status_url"].split("token=")[1]
+        self.assertEqual(
+            self.client.get(reverse("boleto_status", args=[job_id]), {"token": token_lote}).status_code, 403
+        )
+        self.assertEqual(self.client.get(reverse("boleto_lote_status", args=[lote["lote"]])).status_code, 403)
+
+    def test_equipe_logada_consulta_sem_token(self):
+        job_id = self.enviar()["jobs"][0]["job_id"]
+        self.client.force_login(get_user_model().objects.create_user("equipe", password="x", is_staff=True))
+        resposta = self.client.get(reverse("boleto_status", args=[job_id]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["status"], "PENDENTE")
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ParametrosSalesforceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache.set(sf_session.SESSION_CACHE_KEY, {"session_id": "antiga", "instance": "x.my.salesforce.com"})
+
+    def test_alterar_credencial_sf_descarta_a_sessao_compartilhada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Parametro.objects.create(ParametroNome="SF_PASSWORD", ParametroValor="nova")
+        self.assertIsNone(cache.get(sf_session.SESSION_CACHE_KEY))
+        self.assertEqual(sf_session.SF_PARAMS.PASSWORD, "nova")
+
+    def test_outros_parametros_mantem_a_sessao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Parametro.objects.create(ParametroNome="GEAR_API_TOKEN", ParametroValor="abc")
+        self.assertIsNotNone(cache.get(sf_session.SESSION_CACHE_KEY))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class QueryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def consultar(self, soql, buscar):
+        return query_cache.cached(soql, buscar, objeto="reda__Ticket__c")
+
+    def test_acerto_ate_invalidar(self):
+        buscar = mock.Mock(return_value={"records": [1]})
+        soql = "SELECT Id FROM reda__Ticket__c"
+        self.assertEqual(self.consultar(soql, buscar), {"records": [1]})
+        self.assertEqual(self.consultar(soql, buscar), {"records": [1]})
+        self.assertEqual(buscar.call_count, 1)
+
+        query_cache.invalidar("reda__Ticket__c")
+        self.consultar(soql, buscar)
+        self.assertEqual(buscar.call_count, 2)
+
+    def test_cada_objeto_ocupa_no_maximo_slots_por_objeto_entradas(self):
+        buscar = mock.Mock(return_value={"records": []})
+        consultas = [f"SELECT Id FROM reda__Ticket__c WHERE Name = '{i}'" for i in range(20)]
+        with mock.patch.object(query_cache, "SLOTS_POR_OBJETO", 2):
+            for soql in consultas:
+                self.consultar(soql, buscar)
+            buscar.reset_mock()
+            for soql in consultas:
+                self.consultar(soql, buscar)
+        # No máximo 2 das 20 continuam no cache
+        self.assertGreaterEqual(buscar.call_count, 18)
+
+    def test_entrada_grande_demais_nao_vai_para_o_cache(self):
+        buscar = mock.Mock(return_value={"records": ["x" * 100]})
+        with mock.patch.object(query_cache, "MAX_BYTES_ENTRADA", 50):
+            self.consultar("SELECT Id FROM reda__Ticket__c", buscar)
+            self.consultar("SELECT Id FROM reda__Ticket__c", buscar)
+        self.assertEqual(buscar.call_count, 2)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class VersaoCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_outro_processo_recarrega_depois_de_invalidar(self):
+        valores = iter(["v1", "v2", "v3"])
+        # Duas instâncias com a mesma chave fazem o papel de dois processos
+        web = Recarregavel("teste:versao", lambda: next(valores), verificar_a_cada=0)
+        worker = Recarregavel("teste:versao", lambda: "worker", verificar_a_cada=0)
+        self.assertEqual(web.obter(), "v1")
+        self.assertEqual(worker.obter(), "worker")
+
+        self.assertEqual(web.obter(), "v1")
+        worker.invalidar()
+        self.assertEqual(web.obter(), "v2")
+
+    def test_intervalo_de_verificacao_evita_ir_ao_cache(self):
+        carregar = mock.Mock(return_value="v")
+        valor = Recarregavel("teste:versao", carregar, verificar_a_cada=60)
+        valor.obter()
+        Recarregavel("teste:versao", carregar).invalidar()
+        with mock.patch.object(cache, "get_or_set") as get_or_set:
+            self.assertEqual(valor.obter(), "v")
+        get_or_set.assert_not_called()
+
+    def test_carga_que_falha_nao_fica_guardada(self):
+        carregar = mock.Mock(side_effect=[None, "ok"])
+        valor = Recarregavel("teste:versao", carregar)
+        self.assertIsNone(valor.obter())
+        self.assertEqual(valor.obter(), "ok")
+
+    def test_versao_some_do_cache(self):
+        valor = Recarregavel("teste:versao", lambda: object(), verificar_a_cada=0)
+        primeiro = valor.obter()
+        cache.delete("teste:versao")
+        valor.invalidar()
+        self.assertIsNot(valor.obter(), primeiro)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class IdMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        idmap.invalidar()
+
+    def test_id18_com_ids_conhecidos_do_salesforce(self):
+        self.assertEqual(idmap.id18("001D000000IqhSL"), "001D000000IqhSLIAZ")
+        self.assertEqual(idmap.id18("0015000000Gv7qJ"), "0015000000Gv7qJAAR")
+        self.assertEqual(idmap.id18("001D000000IqhSLIAZ"), "001D000000IqhSLIAZ")
+        self.assertEqual(idmap.id18(" 001D000000IqhSL "), "001D000000IqhSLIAZ")
+        self.assertEqual(idmap.id18("001D000000Iqh"), "")
+        self.assertEqual(idmap.id18(None), "")
+
+    def test_busca_nos_dois_sentidos_com_15_ou_18_caracteres(self):
+        unidade = criar_unidade()
+        unidade.sf_unidade_id = "a0Q000000000001"
+        unidade.save()
+        condominio = unidade.bloco.condominio
+        condominio.sf_property_id = "001D000000IqhSLIAZ"
+        condominio.save()
+        idmap.invalidar()
+
+        self.assertEqual(idmap.condominio_pk("001D000000IqhSL"), condominio.pk)
+        self.assertEqual(idmap.condominio_pk("001D000000IqhSLIAZ"), condominio.pk)
+        self.assertEqual(idmap.condominio_sf(condominio.pk), "001D000000IqhSLIAZ")
+        self.assertEqual(idmap.unidade_sf(unidade.pk), idmap.id18("a0Q000000000001"))
+        self.assertEqual(idmap.mapa().condominio_da_unidade[unidade.pk], condominio.pk)
+        self.assertIsNone(idmap.condominio_pk("001D000000XXXXX"))
+
+    def test_save_invalida_o_mapa_depois_do_commit(self):
+        condominio = criar_unidade().bloco.condominio
+        self.assertIsNone(idmap.condominio_pk("001D000000IqhSL"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            condominio.sf_property_id = "001D000000IqhSL"
+            condominio.save()
+        self.assertEqual(idmap.condominio_pk("001D000000IqhSLIAZ"), condominio.pk)
+
+
+def ticket_id(i):
+    return f"a0T{i:012d}"
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class SenhasEncomendasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = criar_usuario()
+        self.unidade = criar_unidade()
+        self.morador = Morador.objects.create(nome="João", unidade=self.unidade)
+
+    def receber(self, ticket="", **campos):
+        return Encomenda.objects.create(
+            condominio=self.unidade.bloco.condominio, unidade=self.unidade, destinatario=self.morador,
+            recebido_por=self.usuario, salesforce_ticket_id=ticket, **campos,
+        )
+
+    def test_busca_em_lotes_de_ids_sem_repetir(self):
+        sf = mock.Mock()
+        sf.query_all.return_value = {"records": [{"Id": ticket_id(1) + "AAA", "Password__c": "1111"}]}
+        ids = [ticket_id(i) for i in range(450)] + [ticket_id(1)]
+
+        senhas = buscar_senhas_tickets(sf, ids)
+
+        self.assertEqual(sf.query_all.call_count, 3)
+        consultados = [soql.count("'a0T") for soql in (c.args[0] for c in sf.query_all.call_args_list)]
+        self.assertEqual(consultados, [200, 200, 50])
+        # Chave de 15 caracteres: serve para o Id de 15 ou de 18 gravado localmente
+        self.assertEqual(senhas, {ticket_id(1): "1111"})
+
+    def test_so_pendentes_com_ticket_e_grava_so_o_que_mudou(self):
+        nova = self.receber(ticket_id(1))
+        self.receber(ticket_id(2) + "AAA", SenhaRetirada="2222")
+        entregue = self.receber(ticket_id(3), status=StatusEncomenda.ENTREGUE)
+        self.receber()
+
+        sf = mock.Mock()
+        sf.query_all.return_value = {"records": [
+            {"Id": ticket_id(1) + "BBB", "Password__c": "1111"},
+            {"Id": ticket_id(2) + "AAA", "Password__c": "2222"},
+        ]}
+        with mock.patch("portaria.tasks.sf_connect", return_value=sf):
+            resultado = atualizar_senhas_encomendas()
+
+        self.assertEqual(resultado, {"atualizadas": 1, "erros": 0})
+        soql = sf.query_all.call_args.args[0]
+        self.assertIn(ticket_id(1), soql)
+        self.assertIn(ticket_id(2), soql)
+        self.assertNotIn(ticket_id(3), soql)
+        nova.refresh_from_db()
+        self.assertEqual(nova.SenhaRetirada, "1111")
+        entregue.refresh_from_db()
+        self.assertIsNone(entregue.SenhaRetirada)
+
+    def test_sem_pendentes_nao_conecta(self):
+        with mock.patch("portaria.tasks.sf_connect") as sf_connect:
+            self.assertEqual(atualizar_senhas_encomendas(), {"atualizadas": 0, "erros": 0})
+        sf_connect.assert_not_called()
+
+
+class SyncAcessosTests(TestCase):
+    def setUp(self):
+        self.usuario = criar_usuario()
+        self.condominio = criar_unidade().bloco.condominio
+        self.condominio.sf_property_id = "a0R000000000001"
+        self.condominio.save()
+        self.acesso = self.criar_acesso("a0V000000000001")
+
+    def criar_acesso(self, sf_id):
+        return EventoAcesso.objects.create(
+            condominio=self.condominio, pessoa_tipo=TipoPessoa.AMIGOS, pessoa_nome="Visitante",
+            resultado=ResultadoAcesso.AGUARDANDO, criado_por=self.usuario, sf_visitor_log_id=sf_id,
+        )
+
+    def sf(self, *registros, falhar=False):
+        def iterar(soql):
+            yield from registros
+            if falhar:
+                raise RuntimeError("conexão caiu")
+
+        sf = mock.Mock()
+        sf.query_all_iter.side_effect = iterar
+        return sf
+
+    def registro(self, sf_id, status, modstamp):
+        return {"Id": sf_id, "reda__Status__c": status, "SystemModstamp": modstamp,
+                "reda__Permitted_Till_Datetime__c": None}
+
+    def test_primeira_execucao_parte_do_acesso_integrado_mais_antigo(self):
+        sf = self.sf()
+        sincronizar_acessos(sf)
+        self.assertIn(f"SystemModstamp >= {soql_datetime(self.acesso.criado_em)}", sf.query_all_iter.call_args.args[0])
+
+    def test_aplica_so_o_que_mudou_e_avanca_a_marca(self):
+        outro = self.criar_acesso("a0V000000000002AAA")
+        sf = self.sf(
+            self.registro("a0V000000000001AAA", ResultadoAcesso.PERMITIDO, "2030-01-01T10:00:00.000+0000"),
+            self.registro("a0V000000000002", ResultadoAcesso.AGUARDANDO, "2030-01-01T11:00:00.000+0000"),
+        )
+        self.assertEqual(sincronizar_acessos(sf), {"lidos": 2, "atualizados": 1})
+
+        self.acesso.refresh_from_db()
+        self.assertEqual(self.acesso.resultado, ResultadoAcesso.PERMITIDO)
+        outro.refresh_from_db()
+        self.assertEqual(outro.resultado, ResultadoAcesso.AGUARDANDO)
+        self.assertEqual(ler_marca(MARCA_ACESSOS), parse_sf_datetime("2030-01-01T11:00:00.000+0000"))
+
+        sf = self.sf()
+        sincronizar_acessos(sf)
+        self.assertIn("SystemModstamp >= 2030-01-01T11:00:00Z", sf.query_all_iter.call_args.args[0])
+
+    def test_execucao_interrompida_retoma_da_marca_anterior(self):
+        marca = parse_sf_datetime("2030-01-01T09:00:00.000+0000")
+        gravar_marca(MARCA_ACESSOS, marca)
+        sf = self.sf(self.registro("a0V000000000001", ResultadoAcesso.NEGADO, "2030-01-01T10:00:00.000+0000"),
+                     falhar=True)
+        with self.assertRaises(RuntimeError):
+            sincronizar_acessos(sf)
+        self.assertEqual(ler_marca(MARCA_ACESSOS), marca)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class SyncPropriedadesTests(TestCase):
+    REGIAO = idmap.id18("a0R000000000001")
+
+    def setUp(self):
+        cache.clear()
+        busca._fts_ok.clear()
+        self.unidade = criar_unidade()
+        condominio = self.unidade.bloco.condominio
+        condominio.sf_property_id = self.REGIAO[:15]
+        condominio.save()
+        self.propriedades = [
+            {"Id": "a0P000000000101AAA", "Name": "101", "reda__Region__c": self.REGIAO,
+             "reda__Active_Lease__c": "006000000000001AAA"},
+            {"Id": "a0P000000000102AAA", "Name": "102", "reda__Region__c": self.REGIAO,
+             "reda__Active_Lease__c": "006000000000002AAA"},
+            {"Id": "a0P000000000999AAA", "Name": "999", "reda__Region__c": "a0R000000000999AAA",
+             "reda__Active_Lease__c": None},
+        ]
+        self.papeis = {
+            "006000000000001AAA": [self.contato("003000000000001AAA", "João Ávila")],
+            "006000000000002AAA": [self.contato("003000000000002AAA", "Maria"),
+                                   self.contato("003000000000003AAA", "José")],
+        }
+
+    def contato(self, contact_id, nome):
+        return {"ContactId": contact_id, "Contact": {"Name": nome, "CCpfTxt__c": "123"}}
+
+    def sincronizar(self):
+        def consultar(soql):
+            if "FROM reda__Property__c" in soql:
+                return iter(self.propriedades)
+            return iter(
+                {"OpportunityId": lease, **papel}
+                for lease, papeis in self.papeis.items() if lease in soql for papel in papeis
+            )
+
+        sf = mock.Mock()
+        sf.query_all_iter.side_effect = consultar
+        return sincronizar_propriedades(sf)
+
+    def ativos(self):
+        return sorted(Morador.objects.filter(ativo=True).values_list("unidade__numero", "nome"))
+
+    def test_primeira_carga_cria_e_vincula_e_segunda_nao_muda_nada(self):
+        resumo = self.sincronizar()
+        self.assertEqual(
+            {k: resumo[k] for k in ("unidades_criadas", "unidades_atualizadas", "moradores_criados")},
+            {"unidades_criadas": 1, "unidades_atualizadas": 1, "moradores_criados": 3},
+        )
+        self.unidade.refresh_from_db()
+        self.assertEqual(self.unidade.sf_unidade_id, "a0P000000000101AAA")
+        self.assertEqual(self.ativos(), [("101", "João Ávila"), ("102", "José"), ("102", "Maria")])
+        # Gravados com bulk_create: o índice de busca também foi atualizado
+        self.assertEqual(busca.filtrar(Morador.objects.all(), "nome", "joao").count(), 1)
+
+        resumo = self.sincronizar()
+        self.assertEqual(
+            [resumo[k] for k in ("unidades_criadas", "unidades_atualizadas", "moradores_criados",
+                                 "moradores_atualizados")],
+            [0, 0, 0, 0],
+        )
+
+    def test_contato_que_sai_da_lease_e_unidade_sem_lease_ficam_inativos(self):
+        self.sincronizar()
+        self.papeis["006000000000002AAA"] = [self.contato("003000000000002AAA", "Maria Souza")]
+        self.propriedades[0]["reda__Active_Lease__c"] = None
+
+        resumo = self.sincronizar()
+
+        self.assertEqual(resumo["moradores_atualizados"], 3)
+        self.assertEqual(self.ativos(), [("102", "Maria Souza")])
+        self.assertEqual(Morador.objects.count(), 3)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class GovernancaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def resposta(self, usado, maximo=10000):
+        return mock.Mock(headers={"Sforce-Limit-Info": f"api-usage={usado}/{maximo}"})
+
+    def test_uso_conta_por_origem_e_condominio(self):
+        with governanca.origem("acesso_create", 7):
+            for _ in range(3):
+                governanca.registrar(self.resposta(100))
+        with governanca.origem("get_all_fields"):
+            governanca.registrar(self.resposta(101))
+
+        uso = governanca.uso()
+        self.assertEqual(uso["origens"], {"acesso_create": 3, "get_all_fields": 1})
+        self.assertEqual(uso["condominios"], {"7": 3})
+        self.assertEqual(uso["limite"], {"usado": 101, "max": 10000})
+        self.assertEqual(governanca.origem_atual(), "desconhecida")
+
+    def test_saldo_baixo_barra_so_as_prioridades_menores(self):
+        self.assertTrue(governanca.permitir("get_all_fields"))  # saldo ainda desconhecido
+        governanca.registrar(self.resposta(8000))  # restam 20%
+
+        self.assertFalse(governanca.permitir("get_all_fields"))
+        self.assertTrue(governanca.permitir("qualquer_view"))
+        governanca.registrar(self.resposta(9990))
+        self.assertFalse(governanca.permitir("qualquer_view"))
+        self.assertTrue(governanca.permitir("acesso_create"))
+
+        with governanca.origem("get_all_fields"):
+            with self.assertRaises(governanca.OrcamentoApiBaixo):
+                governanca.verificar()
+        with governanca.origem("acesso_create"):
+            governanca.verificar()
+
+    def test_task_com_saldo_baixo_e_adiada(self):
+        chamadas = []
+
+        @governanca.tarefa_salesforce
+        def sincronizar_propriedades_task():
+            chamadas.append(governanca.origem_atual())
+            return "ok"
+
+        nome = f"{__name__}.sincronizar_propriedades_task"
+        with mock.patch.dict(governanca.PRIORIDADES, {nome: governanca.BAIXA}):
+            self.assertEqual(sincronizar_propriedades_task(), "ok")
+            governanca.registrar(self.resposta(8000))
+            self.assertEqual(sincronizar_propriedades_task(), {"adiado": True})
+
+        self.assertEqual(chamadas, [nome])
+
+    def test_origem_chega_as_threads_de_upload(self):
+        origens = []
+
+        def criar(sf, caminho, dados):
+            origens.append((governanca.origem_atual(), governanca._condominio.get()))
+            return "068" + dados["Title"]
+
+        sf = mock.MagicMock()
+        sf.query.return_value = {"records": [{"ContentDocumentId": "069X"}]}
+        sf.restful.return_value = [{"success": True}]
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta)
+        arquivos = []
+        for i in range(3):
+            caminho = os.path.join(pasta, f"{i}.pdf")
+            with open(caminho, "wb") as f:
+                f.write(b"%PDF")
+            arquivos.append((caminho, f"{i}.pdf"))
+        with mock.patch.object(salesforce_file, "criar_content_version", side_effect=criar):
+            with governanca.origem("encomenda_create", 7):
+                salesforce_file.anexar_arquivos_salesforce(arquivos, "500X", sf=sf)
+
+        self.assertEqual(origens, [("encomenda_create", "7")] * 3)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class EscopoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.aurora = Condominio.objects.create(nome="Aurora")
+        self.bosque = Condominio.objects.create(nome="Bosque")
+        self.usuario = criar_usuario()
+        self.session = {}
+
+    def escopo(self):
+        # Usuário recarregado: o escopo fica memorizado no objeto de cada requisição
+        return escopo.do_usuario(get_user_model().objects.get(pk=self.usuario.pk), self.session)
+
+    def test_condominios_permitidos_e_admin(self):
+        self.aurora.usuarios.add(self.usuario)
+        e = self.escopo()
+        self.assertFalse(e.admin)
+        self.assertEqual(e.ids, [self.aurora.pk])
+        self.assertEqual(e.unico, self.aurora.pk)
+        self.assertTrue(e.permite(str(self.aurora.pk)))
+        self.assertFalse(e.permite(self.bosque.pk))
+        self.assertFalse(e.permite("x"))
+
+        admin = criar_usuario("sindico")
+        admin.groups.add(Group.objects.create(name=escopo.GRUPO_ADMIN))
+        e = escopo.do_usuario(admin, {})
+        self.assertTrue(e.admin)
+        self.assertIsNone(e.ids)
+        self.assertTrue(e.permite(self.bosque.pk))
+        self.assertEqual(e.condominios.count(), 2)
+
+    def test_sessao_valida_nao_consulta_o_banco(self):
+        self.aurora.usuarios.add(self.usuario)
+        self.escopo()
+        usuario = get_user_model().objects.get(pk=self.usuario.pk)
+        with self.assertNumQueries(0):
+            e = escopo.do_usuario(usuario, self.session)
+        self.assertEqual(e.ids, [self.aurora.pk])
+
+    def test_incluir_condominio_recalcula_depois_do_commit(self):
+        self.aurora.usuarios.add(self.usuario)
+        self.assertEqual(self.escopo().ids, [self.aurora.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bosque.usuarios.add(self.usuario)
+
+        self.assertEqual(self.escopo().ids, [self.aurora.pk, self.bosque.pk])
+        self.assertEqual(self.session["escopo_acesso"]["v"], escopo.versao())
+
+    def test_entrar_no_grupo_admin_recalcula(self):
+        self.assertEqual(self.escopo().ids, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.groups.add(Group.objects.create(name=escopo.GRUPO_ADMIN))
+        self.assertTrue(self.escopo().admin)
+
+    def test_login_que_so_grava_last_login_nao_invalida(self):
+        self.escopo()
+        versao = escopo.versao()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.last_login = timezone.now()
+            self.usuario.save(update_fields=["last_login"])
+        self.assertEqual(escopo.versao(), versao)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.is_superuser = True
+            self.usuario.save()
+        self.assertNotEqual(escopo.versao(), versao)
+        self.assertTrue(self.escopo().admin)
@@ -51,5 +51,8 @@ path("ajax/blocos/<int:condominio_id>/", views.ajax_blocos, name="ajax_blocos"),
 path("ajax/unidades_por_bloco/<int:bloco_id>/", views.ajax_unidades_por_bloco, name="ajax_unidades_por_bloco"),
 
 path("api/reda/boleto/", views.webhook_boleto_reda, name="webhook_boleto_reda"),
+path("api/reda/boletos/", views.webhook_boleto_reda_lote, name="webhook_boleto_reda_lote"),
+path("api/reda/boleto/<uuid:job_id>/", views.boleto_status, name="boleto_status"),
+path("api/reda/boleto/lote/<uuid:lote>/", views.boleto_lote_status, name="boleto_lote_status"),
 
 ]
\ No newline at end of file
@@ -1,22 +1,36 @@
 import base64
 import os
+import requests
 from django.contrib.auth.decorators import login_required, permission_required
 from django.views.decorators.http import require_POST
 from django.shortcuts import render, redirect, get_object_or_404
-from portaria.permissions import allowed_condominios_for
 from django.utils import timezone
-from .models import Encomenda, EventoAcesso, StatusEncomenda, TipoPessoa, MetodoAcesso, ResultadoAcesso, Veiculo, Condominio
+from .models import Encomenda, EventoAcesso, MetricaContador, StatusEncomenda, TipoPessoa, MetodoAcesso, ResultadoAcesso, Veiculo, Condominio
 from condominio.models import Condominio, Unidade, Morador, Bloco, Bicicleta
-from portaria.models import EventoAcesso, Encomenda
+from portaria.models import EventoAcesso, Encomenda, VisitorLog
 from django.utils.dateparse import parse_date
 from django.contrib import messages
 from portaria.forms import EncomendaForm, EventoAcessoForm
+from portaria import busca
+from portaria.contadores import resumo
+from portaria.paginacao import KeysetPaginator
+from portaria.periodo import filtrar_periodo
 from integrations.sf_tickets import sync_encomenda_to_salesforce, delete_encomenda_from_salesforce, update_encomenda_in_salesforce, delete_acesso_from_salesforce
 from integrations.visitor import get_salesforce_connection, criar_visitor_log_salesforce
 from django.db import transaction
 from django.http import HttpResponse, HttpResponseBadRequest
 from datetime import date, datetime, timezone, timedelta
-from integrations.allvisitorlogs import sf_connect, get_all_fields, build_where_clause, query_chunk, SOBJECT
+from integrations.allvisitorlogs import get_all_fields, build_where_clause, query_chunk, SOBJECT
+from integrations import idmap
+from integrations.metadata import describe_fields
+from integrations.query_cache import query_all_cached
+from integrations.registros import ReservaSF, VeiculoSF, VisitorLogSF
+from integrations.sf_paginacao import SFPaginator
+from integrations.resilience import ServicoIndisponivel
+from integrations.session import sf_connect
+from integrations.sync_acessos import sincronizar_acessos
+from integrations.sync_propriedades import sincronizar_propriedades
+from integrations.fila_integracao import enfileirar_encomenda
 from .forms import VeiculoForm, BicicletaForm
 from django.http import JsonResponse
 from collections import OrderedDict
@@ -28,19 +42,27 @@ from django.db.models import Q
 
 @login_required
 def dashboard(request):
+    # Contadores mantidos pelos signals (portaria/contadores.py): poucas linhas por condomínio
+    valores = resumo(request.escopo.condominios)
     ctx = {
-    'total_encomendas': Encomenda.objects.count(),
-    'encomendas_pendentes': Encomenda.objects.filter(status=StatusEncomenda.RECEBIDA).count(),
-    'acessos_hoje': EventoAcesso.objects.filter(criado_em__date=timezone.now().date()).count(),
+    'total_encomendas': valores[MetricaContador.ENCOMENDAS_TOTAL],
+    'encomendas_pendentes': valores[MetricaContador.ENCOMENDAS_PENDENTES],
+    'recebidas_hoje': valores[MetricaContador.ENCOMENDAS_RECEBIDAS],
+    'entregues_hoje': valores[MetricaContador.ENCOMENDAS_ENTREGUES],
+    'acessos_hoje': valores[MetricaContador.ACESSOS],
     }
     return render(request, 'portaria/dashboard.html', ctx)
 
 
 @login_required
 def encomenda_list(request):
-    sf = sf_connect()
-    allowed = allowed_condominios_for(request.user)
-    qs = Encomenda.objects.select_related("unidade", "condominio").filter(condominio__in=allowed)
+    allowed = request.escopo.condominios
+    qs = (
+        Encomenda.objects
+        .select_related("unidade", "condominio")
+        .prefetch_related("fila_integracao")
+        .filter(condominio__in=allowed)
+    )
 
     condominio = request.GET.get("condominio")
     unidade = request.GET.get("unidade")
@@ -51,7 +73,7 @@ def encomenda_list(request):
 
     # 🔹 Se for a primeira carga (sem filtros), define as datas padrão
     if not any([dt_ini, dt_fim, condominio, destinatario, status]):
-        hoje = date.today()
+        hoje = timezone.localdate()
         dt_ini = hoje.replace(day=1).isoformat()  # primeiro dia do mês
         dt_fim = hoje.isoformat()                 # data atual
 
@@ -60,32 +82,17 @@ def encomenda_list(request):
         qs = qs.filter(condominio_id=condominio)
     if unidade:
         qs = qs.filter(unidade_id=unidade)
-    if dt_ini:
-        qs = qs.filter(data_recebimento__date__gte=dt_ini)
-    if dt_fim:
-        qs = qs.filter(data_recebimento__date__lte=dt_fim)
+    qs = filtrar_periodo(qs, "data_recebimento", dt_ini, dt_fim)
     if destinatario:
         #qs = qs.filter(destinatario__icontains=destinatario)
-        qs = qs.filter(destinatario__nome__icontains=destinatario)
+        qs = busca.filtrar(qs, "destinatario__nome", destinatario)
 
     if status:
         qs = qs.filter(status=status)
 
-    qs = qs.order_by("-data_recebimento")
-
-    for e in qs:
-        if not e.salesforce_ticket_id:
-            continue  # só atualiza se tiver o ID do Visitor Log salvo
-
-    # 🔹 Paginação (20 por página)
-    paginator = Paginator(qs, 20)
-    page = request.GET.get("page")
-    try:
-        encomendas = paginator.page(page)
-    except PageNotAnInteger:
-        encomendas = paginator.page(1)
-    except EmptyPage:
-        encomendas = paginator.page(paginator.num_pages)
+    # 🔹 Paginação por cursor (20 por página) em (data_recebimento, id)
+    paginator = KeysetPaginator(qs, "data_recebimento", 20)
+    encomendas = paginator.get_page(request.GET.get("cursor"))
 
     unidades = Unidade.objects.filter(bloco__condominio__in=allowed).order_by("numero")
 
@@ -102,7 +109,7 @@ def encomenda_list(request):
             "destinatario": destinatario or "",
             "status": status or "",
         },
-        "total": qs.count(),
+        "total": paginator.count,
     }
 
     return render(request, "portaria/encomenda_list.html", ctx)
@@ -111,8 +118,7 @@ def encomenda_list(request):
 
 @login_required
 def encomenda_create(request):
-    print("Acessando encomenda_create")
-    allowed_condominios = allowed_condominios_for(request.user)
+    allowed_condominios = request.escopo.condominios
 
     if request.method == "POST":
         form = EncomendaForm(
@@ -122,77 +128,20 @@ def encomenda_create(request):
             is_create=True,
             allowed_condominios=allowed_condominios,
         )
-        print("Arquivos enviados:", request.FILES)
-        print(f"Form valid: {form.is_valid()}")
         if form.is_valid():
             encomenda = form.save(commit=False)
             encomenda.status = "RECEBIDA"
             encomenda.recebido_por = request.user
             if not encomenda.data_recebimento:
                 encomenda.data_recebimento = timezone.now()
-            encomenda.save()
-            print(f"Encomenda antes de salvar: {encomenda}")
-            # ✅ Salva os arquivos associados agora
-            for i in range(1, 6):
-                arquivo = form.cleaned_data.get(f"arquivo_0{i}")
-                print(f"Arquivo na tabela encomendas {i}: {arquivo}")
-                if arquivo:
-                    setattr(encomenda, f"arquivo_0{i}", arquivo)
-                    print(f"Salvando arquivo {i} para encomenda {encomenda.id}")
-
-            encomenda.save() 
-            print(f"Encomenda {encomenda.id} salva com sucesso.")
-            print(f"id do salesforce_ticket_id antes da integração: {encomenda.salesforce_ticket_id}")
-            # 🔑 só sincroniza se ainda não estiver integrado
-            if not encomenda.salesforce_ticket_id:
-                print("Tentando integrar com Salesforce...")
-                try:
-                    resultado = sync_encomenda_to_salesforce(encomenda)
-                    print(f"Resultado da integração com Salesforce: {resultado}")
-                    ticket_id = resultado["id"]
-                    print("Ticket ID retornado:", ticket_id)
-                    senha = resultado["senha"]
-                    print("Senha retornada:", senha)
-                    if ticket_id:
-                        encomenda.salesforce_ticket_id = ticket_id
-
-                        # Consulta SOQL no Salesforce
-                        sf = sf_connect()
-                        soql = f"""
-                            SELECT Id, Password__c
-                            FROM reda__Ticket__c
-                            WHERE Id = '{ticket_id}'
-                            and Password__c != null
-                        """
-                        res_senha = sf.query(soql).get("records", [])
-                        SenhaRetirada = res_senha[0].get("Password__c")
-                        encomenda.SenhaRetirada = SenhaRetirada
-                        print(f"Salvando ticket_id {ticket_id} e senha {SenhaRetirada} na encomenda {encomenda.id}")
-                        #encomenda.save(update_fields=["salesforce_ticket_id"])
-                        encomenda.save(update_fields=["salesforce_ticket_id", "SenhaRetirada"])
-                        messages.info(request, f"Ticket criado no Salesforce: {ticket_id}")
-                except Exception:
-                    messages.warning(request, "Encomenda salva, mas houve erro ao integrar com o Salesforce.")
-            else:
-                ticket_id = encomenda.salesforce_ticket_id
-                print("Ticket ID retornado:", ticket_id)
-                if ticket_id:
-                        # Consulta SOQL no Salesforce
-                        sf = sf_connect()
-                        soql = f"""
-                            SELECT Id, Password__c
-                            FROM reda__Ticket__c
-                            WHERE Id = '{ticket_id}'
-                            and Password__c != null
-                        """
-                        res_senha = sf.query(soql).get("records", [])
-                        SenhaRetirada = res_senha[0].get("Password__c")
-                        encomenda.SenhaRetirada = SenhaRetirada
-                        print(f"Salvando ticket_id {ticket_id} e senha {SenhaRetirada} na encomenda {encomenda.id}")
-                        encomenda.save(update_fields=["salesforce_ticket_id", "SenhaRetirada"])
-                        messages.info(request, f"Ticket criado no Salesforce: {ticket_id}")
-                messages.info(request, f"Ticket criado no Salesforce: {encomenda.salesforce_ticket_id} (Senha: {encomenda.SenhaRetirada})")
 
+            # 🔹 Grava a encomenda e o item da fila de integração juntos;
+            #    o Ticket no Salesforce é criado pelo worker (portaria.tasks.processar_fila_integracao)
+            with transaction.atomic():
+                encomenda.save()
+                enfileirar_encomenda(encomenda)
+
+            messages.info(request, "Integração com o Salesforce em andamento.")
             messages.success(request, f"Encomenda {encomenda.pk} criada com sucesso.")
             return redirect("encomenda_list")
     else:
@@ -228,7 +177,7 @@ def encomenda_entregar(request, pk):
 @login_required
 @require_POST
 def encomenda_delete(request, pk):
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
     encomenda = get_object_or_404(Encomenda, pk=pk, condominio__in=allowed)
 
     # tenta excluir no Salesforce antes de apagar localmente
@@ -252,11 +201,8 @@ from django.utils.dateparse import parse_date
 @login_required
 def acesso_list(request):
 
-    allowed = allowed_condominios_for(request.user)
-    is_admin_like = (
-        request.user.is_superuser 
-        or request.user.groups.filter(name="Administrador").exists()
-    )
+    allowed = request.escopo.condominios
+    is_admin_like = request.escopo.admin
 
     # Base da query
     qs = (
@@ -287,12 +233,7 @@ def acesso_list(request):
 
         # Admin pode ver todos, demais forçam condominio padrão
         if not is_admin_like:
-            first_allowed_id = (
-                allowed.order_by("nome")
-                .values_list("id", flat=True)
-                .first()
-            )
-            condominio_id = str(first_allowed_id) if first_allowed_id else ""
+            condominio_id = str(request.escopo.primeiro or "")
 
     # -------------------------
     # FILTROS
@@ -303,27 +244,17 @@ def acesso_list(request):
     if unidade_id:
         qs = qs.filter(unidade_id=unidade_id)
 
-    if dt_ini:
-        d0 = parse_date(dt_ini)
-        if d0:
-            qs = qs.filter(criado_em__date__gte=d0)
-
-    if dt_fim:
-        d1 = parse_date(dt_fim)
-        if d1:
-            qs = qs.filter(criado_em__date__lte=d1)
+    # Dias locais (São Paulo) → intervalo [início, fim) que usa o índice
+    qs = filtrar_periodo(qs, "criado_em", dt_ini, dt_fim)
 
     if nome_q:
-        qs = qs.filter(pessoa_nome__icontains=nome_q)
-
-    qs = qs.order_by("-criado_em")
+        qs = busca.filtrar(qs, "pessoa_nome", nome_q)
 
     # -------------------------
-    # Paginação
+    # Paginação por cursor em (criado_em, id)
     # -------------------------
-    paginator = Paginator(qs, 20)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(qs, "criado_em", 20)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
     # -------------------------
     # Contexto
@@ -342,75 +273,42 @@ def acesso_list(request):
         },
 
 
-        "total": qs.count(),
+        "total": paginator.count,
     }
 
     return render(request, "portaria/acesso_list.html", ctx)
 
 @login_required
 def atualiza_acesso_salesforce(request):
-# 🔹 Conecta ao Salesforce
-    sf = sf_connect()
-
-    # 🔹 Busca todos os acessos locais
-    eventos = EventoAcesso.objects.all().select_related("unidade", "condominio")
-
-    # 🔹 Atualiza status com o Salesforce
-    for evento in eventos:
-        if not evento.sf_visitor_log_id:
-            continue  # só atualiza se tiver o ID do Visitor Log salvo
-
-        try:
-            # Consulta SOQL no Salesforce
-            soql = f"""
-                SELECT Id, reda__Status__c, reda__Permitted_Till_Datetime__c
-                FROM reda__Visitor_Log__c
-                WHERE Id = '{evento.sf_visitor_log_id}'
-            """
-            result = sf.query(soql).get("records", [])
-            print(f"Consulta SOQL para {evento.pessoa_nome} (ID {evento.sf_visitor_log_id}): {result}")
-            if result:
-                status_sf = result[0].get("reda__Status__c")
-                permitted_str = result[0].get("reda__Permitted_Till_Datetime__c")
-
-                # Traduz status Salesforce → local
-                STATUS_MAP = {
-                    "Permitido": "Permitted",
-                    "Negado": "Cancelled",
-                    "Aguardando": "Requested",
-                    "Liberado": "Checked In",
-                }
-                novo_status = STATUS_MAP.get(status_sf, evento.resultado)
-                # 🔹 Atualiza o campo "liberado_ate" se houver valor
-                if permitted_str:
-                    try:
-                        permitted_dt = datetime.fromisoformat(permitted_str.replace("Z", "+00:00"))
-                        evento.liberado_ate = permitted_dt
-                    except Exception as e:
-                        print(f"⚠️ Erro ao converter data de liberação ({permitted_str}): {e}")
-
-                print(f"Status Salesforce: {status_sf} → Novo status local: {novo_status}")
-                #if novo_status != evento.resultado:
-                #evento.resultado = status_sf
-                #evento.save(update_fields=["resultado"])
-
-                # 🔹 Atualiza se houver mudanças
-                campos_para_salvar = []
-                #if novo_status != evento.resultado:
-                evento.resultado = status_sf
-                campos_para_salvar.append("resultado")
-                #if permitted_str:
-                campos_para_salvar.append("liberado_ate")
-
-                if campos_para_salvar:
-                    evento.save(update_fields=campos_para_salvar)
-                    print(f"✅ Atualizado {evento.pessoa_nome}: {status_sf} até {evento.liberado_ate}")
-
-        except Exception as e:
-            print(f"Finalizado com sucesso")
+    """Dispara a sincronização incremental de status dos acessos."""
+    try:
+        sincronizar_acessos()
+    except Exception as e:
+        print(f"⚠️ Erro ao sincronizar acessos com o Salesforce: {e}")
+        messages.warning(request, "Não foi possível atualizar os acessos com o Salesforce.")
 
     return redirect("acesso_list")
 
+def _pre_liberacao_local(acesso):
+    """Pré-liberação pela réplica VisitorLog quando o Salesforce está fora."""
+    telefone = acesso.pessoa_telefone.strip()
+    if not telefone or not acesso.unidade or not acesso.unidade.sf_unidade_id:
+        return
+    permitido_ate = (
+        VisitorLog.objects
+        .filter(
+            sf_property_id=idmap.id18(acesso.unidade.sf_unidade_id),
+            telefone=telefone,
+            permitido_ate__gt=timezone.now(),
+        )
+        .order_by("-permitido_ate")
+        .values_list("permitido_ate", flat=True)
+        .first()
+    )
+    if permitido_ate:
+        acesso.resultado = "Permitted"
+        acesso.liberado_ate = permitido_ate
+
 @login_required
 def acesso_create(request):
     if request.method == "POST":
@@ -419,6 +317,7 @@ def acesso_create(request):
             acesso = form.save(commit=False)
             acesso.criado_por = request.user
 
+            sf = None
             try:
                 # 🔹 Conexão Salesforce
                 sf = get_salesforce_connection()
@@ -445,11 +344,10 @@ def acesso_create(request):
                         #permitted_till = datetime.fromisoformat(permitted_str.replace("Z", "+00:00"))
                         #data_salesforce = datetime.strptime(permitted_str, "%Y-%m-%dT%H:%M:%S.%f%z")
                         #permitted_till = datetime.strptime(permitted_str, "%d/%m/%Y - %H:%M") #parse_salesforce_datetime(result[0].get("reda__Permitted_Till_Datetime__c"))
-                        permitted_str = result[0].get("reda__Permitted_Till_Datetime__c")
-                        permitted_till = parse_salesforce_datetime_utc(permitted_str)
+                        permitted_till = VisitorLogSF.de_registro(result[0]).permitido_ate
                         now_utc = timezone.now()                    
                         print(f"Permitted till: {permitted_till}, Now UTC: {now_utc}")
-                        if permitted_till  > now_utc:
+                        if permitted_till and permitted_till > now_utc:
                             status_resultado = "Permitted"
                             acesso.resultado = "Permitted"  # 🔹 Liberado automaticamente
                             acesso.liberado_ate = permitted_till
@@ -458,6 +356,10 @@ def acesso_create(request):
                             #    f"Visitante já pré-aprovado no Salesforce.",
                             #)
 
+            except (ServicoIndisponivel, requests.RequestException) as e:
+                print(f"⚠️ Salesforce indisponível, usando a réplica local de pré-liberação: {e}")
+                sf = None
+                _pre_liberacao_local(acesso)
             except Exception as e:
                 print(f"⚠️ Erro ao verificar pré-liberação no Salesforce: {e}")
 
@@ -465,7 +367,9 @@ def acesso_create(request):
             acesso.save()
 
             # 🔹 Cria o VisitorLog no Salesforce (se não existir ainda)
-            if not acesso.sf_visitor_log_id:
+            if sf is None:
+                messages.warning(request, "Acesso salvo localmente; Salesforce indisponível, o Visitor Log não foi criado.")
+            elif not acesso.sf_visitor_log_id:
                 try:
                     print("Tentando criar VisitorLog no Salesforce...")
                     visitor_log_id = criar_visitor_log_salesforce(
@@ -503,7 +407,7 @@ def acesso_create(request):
 #@permission_required('portaria.delete_eventoacesso', raise_exception=True)
 @require_POST
 def acesso_delete(request, pk):
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
     evento = get_object_or_404(EventoAcesso, pk=pk, condominio__in=allowed)
 
     # tenta excluir no Salesforce antes de apagar localmente
@@ -522,7 +426,7 @@ def acesso_delete(request, pk):
 @login_required
 #@permission_required("portaria.change_encomenda", raise_exception=True)
 def encomenda_edit(request, pk):
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
     encomenda = get_object_or_404(Encomenda, pk=pk, condominio__in=allowed)
 
     if request.method == "POST":
@@ -539,7 +443,7 @@ def encomenda_edit(request, pk):
 @login_required
 #@permission_required("portaria.change_eventoacesso", raise_exception=True)
 def acesso_edit(request, pk):
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
     evento = get_object_or_404(EventoAcesso, pk=pk, condominio__in=allowed)
 
     if request.method == "POST":
@@ -560,10 +464,10 @@ def lista_bicicletas(request):
     usuario = request.user
 
     # 🔹 1. Condomínios disponíveis
-    if usuario.is_superuser or usuario.is_staff:
+    if usuario.is_staff or request.escopo.admin:
         condominios = Condominio.objects.all().order_by("nome")
     else:
-        condominios = Condominio.objects.filter(usuarios=usuario).order_by("nome")
+        condominios = request.escopo.condominios.order_by("nome")
 
     # 🔹 2. Base da queryset
     bicicletas = Bicicleta.objects.select_related(
@@ -584,7 +488,7 @@ def lista_bicicletas(request):
     if unidade_id:
         bicicletas = bicicletas.filter(unidade_id=unidade_id)
     if modelo:
-        bicicletas = bicicletas.filter(modelo__icontains=modelo)
+        bicicletas = busca.filtrar(bicicletas, "modelo", modelo)
 
     # 🔹 5. Paginação
     paginator = Paginator(bicicletas.order_by("unidade__bloco__condominio__nome", "unidade__numero"), 15)
@@ -698,115 +602,6 @@ def consulta_salesforce(limit=200):
     return recs
 
 
-from django.shortcuts import render
-from django.utils.dateparse import parse_datetime
-from integrations.allvisitorlogs import sf_connect
-
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-
-
-@login_required
-def visitantes_preaprovados(request):
-    print("Acessando visitantes_preaprovados")
-    sf = sf_connect()
-
-    # 🧭 Filtro
-    condominio_raw = request.GET.get("condominio", "").strip()
-    condominio = int(condominio_raw) if condominio_raw.isdigit() else None
-    sf_cursor = request.GET.get("sf_page")
-    print(f"Filtro condominio: {condominio} | Cursor: {sf_cursor}")
-    # -------------------------------------------------------------------
-    # ✔ Só condomínios permitidos ao usuário
-    # -------------------------------------------------------------------
-    allowed = allowed_condominios_for(request.user)
-
-    # Salesforce IDs dos allowed
-    allowed_sf_ids = list(
-        Condominio.objects.filter(id__in=allowed)
-        .values_list("sf_property_id", flat=True)
-    )
-
-    # -------------------------------------------------------------------
-    # 🧱 SOQL base
-    # -------------------------------------------------------------------
-    soql = """
-        SELECT Id,
-               reda__Contact__r.Name,
-               reda__Guest_Name__c,
-               reda__Property__r.Name,
-               reda__Guest_Phone__c,
-               CreatedDate,
-               reda__Permitted_Till_Datetime__c
-        FROM reda__Visitor_Log__c
-        WHERE reda__Permitted_Till_Datetime__c != null
-    """
-
-    # -------------------------------------------------------------------
-    # ✔ Filtro inicial AUTOMÁTICO pelos allowed, caso nenhum condomínio tenha sido escolhido
-    # -------------------------------------------------------------------
-    if not condominio:
-        print("Nenhum condomínio específico escolhido.")
-        if allowed_sf_ids:
-            lista = "', '".join(allowed_sf_ids)
-            soql += f" AND reda__Property__c IN ('{lista}')"
-            print(f"🔒 Filtrando automaticamente pelos condomínios permitidos: {allowed_sf_ids}")
-
-    # -------------------------------------------------------------------
-    # ✔ Se o usuário escolheu um condomínio específico
-    # -------------------------------------------------------------------
-    if condominio:
-        sf_property_id = (
-            Condominio.objects.filter(id=condominio)
-            .values_list("sf_property_id", flat=True)
-            .first()
-        )
-        print(f"Condomínio escolhido: {condominio} → SF ID: {sf_property_id}")
-        if sf_property_id:
-            soql += f" AND reda__Property__c = '{sf_property_id}'"
-            print(f"📍 Filtrando pelo condomínio escolhido: {sf_property_id}")
-
-
-    soql += " LIMIT 500 ORDER BY CreatedDate DESC"
-
-    # -------------------------------------------------------------------
-    # Paginação Salesforce
-    # -------------------------------------------------------------------
-    if sf_cursor:
-        print(f"🔁 Buscando próxima página via cursor: {sf_cursor}")
-        result = sf.query_more(sf_cursor, True)
-    else:
-        print(f"📡 Primeira consulta Salesforce: {soql}")
-        result = sf.query(soql)
-
-    recs = result.get("records", [])
-    next_cursor = result.get("nextRecordsUrl")
-    print(f"📦 Registros retornados: {len(recs)} | Próxima página: {bool(next_cursor)}")
-
-    # 🔹 Formata datas
-    for r in recs:
-        r.pop("attributes", None)
-        for field in ["CreatedDate", "reda__Permitted_Till_Datetime__c"]:
-            val = r.get(field)
-            if val and "T" in val:
-                r[field] = val.replace("T", " ").split(".")[0]
-            else:
-                r[field] = "—"
-
-    # Contexto final
-    ctx = {
-        "visitantes": recs,
-        "next_cursor": next_cursor,
-        "prev_cursor": sf_cursor,
-        "condominios": allowed,         # ✔ combo mostra apenas allowed
-        "total": result.get("totalSize", len(recs)),
-        "condominio_pk": condominio_raw # ✔ mantém filtro selecionado
-    }
-
-    return render(request, "portaria/visitantes_preaprovados.html", ctx)
-
-
-
-
 from django.http import JsonResponse
 from django.utils.dateparse import parse_datetime
 
@@ -814,197 +609,62 @@ from django.utils.dateparse import parse_datetime
 def visitantes_preaprovados_api(request):
     """
     API que sincroniza propriedades, unidades e moradores
-    do Salesforce com o banco local.
+    do Salesforce com o banco local (ver integrations.sync_propriedades).
     """
     if request.method not in ["GET", "POST"]:
         return JsonResponse({"erro": "Método não permitido"}, status=405)
 
     try:
-        sf = sf_connect()
-
-        soql = """
-            SELECT Id, reda__Active_Lease__c, reda__Region__c, Name
-            FROM reda__Property__c
-        """
-        #WHERE reda__Active_Lease__c != null
-        recs = sf.query_all(soql).get("records", [])
-        resultado = []
-
-        for r in recs:
-            id_propriedade = r.get("Id", "")
-            lease_id = r.get("reda__Active_Lease__c", "")
-            condominio_id = r.get("reda__Region__c", "")
-            prop_nome = r.get("Name", "")
-
-            try:
-                condominio = Condominio.objects.get(sf_property_id=condominio_id)
-            except Condominio.DoesNotExist:
-                print(f"⚠️ Condomínio não encontrado: {condominio_id}")
-                continue
-
-            bloco = Bloco.objects.filter(condominio=condominio.pk).first()
-            if not bloco:
-                print(f"⚠️ Nenhum bloco encontrado para {condominio.nome}")
-                continue
-
-            unidade = Unidade.objects.filter(bloco=bloco, numero=prop_nome).first()
-            if unidade:
-                print(f"Unidade {unidade.numero} já existe.")
-            else:
-                unidade = Unidade.objects.create(
-                    bloco=bloco,
-                    numero=prop_nome,
-                    andar="0",
-                    sf_unidade_id=id_propriedade,
-                )
-                print(f"✅ Unidade criada: {unidade}")
-                # Sincroniza moradores vinculados à lease
-                if lease_id:            
-                    nsoql = f"""
-                        SELECT Id, Name
-                        FROM Opportunity
-                        WHERE Id = '{lease_id}'
-                    """
-                    oportunidade = sf.query_all(nsoql).get("records", [])
-
-                    csoql = f"""
-                        SELECT Id, ContactId
-                        FROM OpportunityContactRole
-                        WHERE OpportunityId = '{lease_id}'
-                    """
-                    contatos = sf.query_all(csoql).get("records", [])
-
-                    for contato in contatos:
-                        contact_id = contato.get("ContactId", "")
-                        ctoql = f"""
-                            SELECT Id, Name, CCpfTxt__c
-                            FROM Contact
-                            WHERE Id = '{contact_id}'
-                        """
-                        contato_detalhes = sf.query_all(ctoql).get("records", [])
-
-                        for detalhe in contato_detalhes:
-                            nome = detalhe.get("Name", "")
-                            morador = Morador.objects.create(
-                                nome=nome,
-                                documento=detalhe.get("CCpfTxt__c", ""),
-                                unidade=unidade,
-                                sf_contact_id=contact_id,
-                                sf_opportunity_id=lease_id,
-                            )
-                            print(f"👤 Morador criado: {morador}")
-
-            resultado.append({
-                "propriedade": prop_nome,
-                "lease_id": lease_id,
-                "condominio": condominio.nome,
-                "unidade": unidade.numero if unidade else None,
-            })
-
-        return JsonResponse({
-            "status": "sucesso",
-            "total_processado": len(resultado),
-            "detalhes": resultado,
-        }, status=200, json_dumps_params={"ensure_ascii": False, "indent": 2})
+        resultado = sincronizar_propriedades()
+        return JsonResponse(
+            {"status": "sucesso", **resultado},
+            status=200, json_dumps_params={"ensure_ascii": False, "indent": 2},
+        )
 
     except Exception as e:
         print(f"❌ Erro na sincronização: {e}")
         return JsonResponse({"erro": str(e)}, status=500)
 
 
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-
 @login_required
 def visitantes_preaprovados(request):
-    sf = sf_connect()
-
+    """
+    Lista os Visitor Logs pré-aprovados a partir da réplica local (VisitorLog),
+    atualizada por portaria.tasks.sincronizar_visitor_logs_task.
+    """
     condominio_param = request.GET.get("condominio", "").strip()
     unidade_filtro = request.GET.get("unidade", "").strip()
-    print(f"🔍 Filtros recebidos - Condomínio: '{condominio_param}', Unidade: '{unidade_filtro}'")
 
+    allowed = request.escopo.condominios
 
-    # 🔹 Busca os condomínios permitidos ao usuário
-    allowed = allowed_condominios_for(request.user)
-    allowed_sf_ids = list(
-        Condominio.objects.filter(id__in=allowed)
-        .values_list("sf_property_id", flat=True)
+    qs = (
+        VisitorLog.objects
+        .filter(permitido_ate__isnull=False, condominio__in=allowed)
+        .only("nome", "telefone", "unidade_nome", "contato_nome", "created_date", "permitido_ate")
     )
-
-    print(f"✅ Condomínios permitidos (SF IDs): {allowed_sf_ids}")
-
-    # 🔹 Monta o SOQL base
-    soql = """
-        SELECT Id,
-               reda__Contact__r.Name,
-               reda__Guest_Name__c,
-               reda__Property__c,
-               reda__Property__r.Name,
-               reda__Guest_Phone__c,
-               CreatedDate,
-               reda__Permitted_Till_Datetime__c
-        FROM reda__Visitor_Log__c
-        WHERE reda__Permitted_Till_Datetime__c != null
-    """
-
-    # 🔹 Filtro manual (condomínio selecionado)
-    if condominio_param:
-        sf_property_id = (
-            Condominio.objects.filter(id=condominio_param)
-            .values_list("sf_property_id", flat=True)
-            .first()
-        )
-        if sf_property_id:
-            soql += f" AND reda__Property__r.reda__Region__c = '{sf_property_id}'"
-            #print(f"🧩 Filtro manual aplicado: reda__Property__r.reda__Region__c = '{sf_property_id}'")
-    # 🔹 Filtro automático (usuário com condomínios permitidos)
-    elif allowed_sf_ids:
-        sf_filter = ",".join(f"'{c}'" for c in allowed_sf_ids if c)
-        soql += f" AND reda__Property__r.reda__Region__c IN ({sf_filter})"
-        print(f"🔒 Filtro automático aplicado: reda__Property__r.reda__Region__c IN ({sf_filter})")
-
-    if unidade_filtro:    
-        unidade_desc = Unidade.objects.filter(id=unidade_filtro).first()
-        #unidade_desc = 'VMD-0502'
-        #print(f"🔍 Unidade filtro descrição: '{unidade_desc}'")
-        soql += f" AND reda__Property__r.Name = '{unidade_desc}'"
-
-    # 🔹 Ordenação
-    soql += " ORDER BY CreatedDate DESC"
-
-    print(f"📡 Executando consulta Salesforce:\n{soql}")
-    result = sf.query_all(soql)
-
-    recs = result.get("records", [])
-    #print(f"📦 Registros retornados: {len(recs)}")
-
-    # 🔹 Formata datas
-    for r in recs:
-        r.pop("attributes", None)
-        #print(f"Nome: {r.get('reda__Property__r.Name')}")
-        for field in ["CreatedDate", "reda__Permitted_Till_Datetime__c"]:
-            val = r.get(field)
-            if isinstance(val, str) and "T" in val:
-                val = val.replace("T", " ").split(".")[0]
-                r[field] = val
-            else:
-                r[field] = "—"
-
-    # 🔹 Paginação local — 5 registros por página
-    paginator = Paginator(recs, 20)
-    page_number = request.GET.get("page")
-
-    try:
-        visitantes = paginator.page(page_number)
-    except PageNotAnInteger:
-        visitantes = paginator.page(1)
-    except EmptyPage:
-        visitantes = paginator.page(paginator.num_pages)
+    if condominio_param.isdigit():
+        qs = qs.filter(condominio_id=condominio_param)
+    if unidade_filtro.isdigit():
+        # Registros cuja Property ainda não resolveu para uma unidade local (sem
+        # sf_unidade_id) casam pelo nome, como na consulta antiga ao Salesforce
+        numero = Unidade.objects.filter(pk=unidade_filtro).values_list("numero", flat=True).first()
+        filtro = Q(unidade_id=unidade_filtro)
+        if numero:
+            filtro |= Q(unidade_id__isnull=True, unidade_nome=numero)
+        qs = qs.filter(filtro)
+
+    qs = qs.order_by("-created_date")
+
+    # 🔹 Paginação no banco (20 por página)
+    paginator = Paginator(qs, 20)
+    visitantes = paginator.get_page(request.GET.get("page"))
 
     ctx = {
         "visitantes": visitantes,
         "condominios": allowed,
-        "total": len(recs),
+        "total": paginator.count,
         "condominio_pk": condominio_param,
+        "q": {"condominio": condominio_param, "unidade": unidade_filtro},
     }
 
     return render(request, "portaria/visitantes_preaprovados.html", ctx)
@@ -1013,7 +673,7 @@ def visitantes_preaprovados(request):
 @login_required
 def veiculo_list(request):
     # recupera os condomínios permitidos
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
 
     qs = Veiculo.objects.select_related("condominio", "unidade", "proprietario").filter(
         condominio__in=allowed
@@ -1023,7 +683,7 @@ def veiculo_list(request):
     placa_q = request.GET.get("placa")
 
     if placa_q:
-        qs = qs.filter(placa__icontains=placa_q)
+        qs = busca.filtrar(qs, "placa", placa_q)
 
     qs = qs.order_by("placa")
 
@@ -1049,27 +709,37 @@ def veiculo_create(request):
         form = VeiculoForm()
     return render(request, "portaria/veiculo_form.html", {"form": form})
 
+def _veiculos_locais(allowed, condominio_pk, placa):
+    """Veículos do cadastro local como VeiculoSF (mesmo template da lista do Salesforce)."""
+    qs = Veiculo.objects.select_related("unidade").filter(condominio__in=allowed)
+    if condominio_pk:
+        qs = qs.filter(condominio_id=condominio_pk)
+    if placa:
+        qs = busca.filtrar(qs, "placa", placa)
+    return [
+        VeiculoSF(
+            placa=v.placa,
+            modelo=v.modelo or "",
+            cor=v.cor or "",
+            unidade=str(v.unidade) if v.unidade else "",
+        )
+        for v in qs.order_by("placa")
+    ]
+
 @login_required
 def veiculos_unidades(request):
-    sf = sf_connect()
-
     placa = request.GET.get("placa", "").strip()
     condominio_pk = request.GET.get("condominio")
 
     # 🔑 Condominios permitidos
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
 
     # Se só tiver 1 condomínio permitido e nenhum filtro informado → pré-seleciona
-    if allowed.count() == 1 and not condominio_pk:
-        condominio_pk = str(allowed.first().id)
+    if request.escopo.unico and not condominio_pk:
+        condominio_pk = str(request.escopo.unico)
 
     # Converte o condominio_pk para o ID do Salesforce
-    sf_id = None
-    if condominio_pk:
-        try:
-            sf_id = Condominio.objects.get(pk=condominio_pk).sf_property_id
-        except Condominio.DoesNotExist:
-            sf_id = None
+    sf_id = idmap.condominio_sf(condominio_pk) if condominio_pk else None
 
     # Monta a query SOQL
     soql = """
@@ -1095,37 +765,22 @@ def veiculos_unidades(request):
 
     if where_clauses:
         soql += " WHERE " + " AND ".join(where_clauses)
+    soql += " ORDER BY Name, Id"
 
-    recs = sf.query_all(soql).get("records", [])
-    TIPO_TRADUZIDO = {
-        "Car": "Carro",
-        "Motorcycle": "Motocicleta",
-        "Truck": "Caminhão",
-        "Bicycle": "Bicicleta",
-        "Scooter": "Scooter",
-        "Van": "Van",
-}
-    for r in recs:
-        r.pop("attributes", None)
-        opp = r.get("reda__Opportunity__r") or {}
-        r["PropertyId"] = opp.get("reda__Region__c")
-        tipo = r.get("Type__c")
-        r["Tipo_PT"] = TIPO_TRADUZIDO.get(tipo, tipo)
-
-    # 🔹 Paginação (20 por página)
-    paginator = Paginator(recs, 20)
-    page = request.GET.get("page")
+    # 🔹 Paginação no Salesforce (20 por página, cursores na sessão)
     try:
-        veiculos_lista = paginator.page(page)
-    except PageNotAnInteger:
-        veiculos_lista = paginator.page(1)
-    except EmptyPage:
-        veiculos_lista = paginator.page(paginator.num_pages)
+        paginator = SFPaginator(request, soql, 20, escopo=request.escopo.ids, transformar=VeiculoSF.de_registro)
+        veiculos_lista = paginator.get_page(request.GET.get("page"))
+    except (ServicoIndisponivel, requests.RequestException) as e:
+        print(f"⚠️ Salesforce indisponível em veiculos_unidades: {e}")
+        messages.warning(request, "Salesforce indisponível no momento: exibindo os veículos cadastrados localmente.")
+        paginator = Paginator(_veiculos_locais(allowed, condominio_pk, placa), 20)
+        veiculos_lista = paginator.get_page(request.GET.get("page"))
 
     ctx = {
         "veiculos": veiculos_lista,
         "condominios": allowed,
-        "total": len(recs),
+        "total": paginator.count,
         "placa": placa,
         "condominio_pk": condominio_pk,  # 🔑 manda pro template saber qual option marcar
     }
@@ -1142,11 +797,11 @@ def morador_unidades(request):
     print(f"🔍 Filtro condomínio: '{condominio_pk}'")
 
     # 🔹 Condominios permitidos
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
 
     # Se o usuário tiver só 1 condomínio permitido → seleciona automaticamente
-    if allowed.count() == 1 and not condominio_pk:
-        condominio_pk = str(allowed.first().id)
+    if request.escopo.unico and not condominio_pk:
+        condominio_pk = str(request.escopo.unico)
 
     # 🔹 Base Query
     qs = (
@@ -1161,7 +816,7 @@ def morador_unidades(request):
         qs = qs.filter(unidade__bloco__condominio_id=condominio_pk)
 
     if morador_nome:
-        qs = qs.filter(nome__icontains=morador_nome)
+        qs = busca.filtrar(qs, "nome", morador_nome)
 
     if apto:
         qs = qs.filter(unidade__numero__icontains=apto)
@@ -1210,26 +865,19 @@ def morador_unidades(request):
 
 @login_required
 def reservas_unidades(request):
-    sf = sf_connect()
-
     condominio_pk = request.GET.get("condominio")
     data_inicio = request.GET.get("data_inicio")
     data_fim = request.GET.get("data_fim")
     unidade_param = request.GET.get("unidade", "").strip()
 
-    allowed = allowed_condominios_for(request.user)
+    allowed = request.escopo.condominios
 
     # 🔹 Se o usuário tiver apenas 1 condomínio, já seleciona automaticamente
-    if allowed.count() == 1 and not condominio_pk:
-        condominio_pk = str(allowed.first().id)
+    if request.escopo.unico and not condominio_pk:
+        condominio_pk = str(request.escopo.unico)
 
     # 🔹 Busca o ID Salesforce do condomínio
-    sf_id = None
-    if condominio_pk:
-        try:
-            sf_id = Condominio.objects.get(pk=condominio_pk).sf_property_id
-        except Condominio.DoesNotExist:
-            sf_id = None
+    sf_id = idmap.condominio_sf(condominio_pk) if condominio_pk else None
 
     # 🔹 Query base
     soql = """
@@ -1282,43 +930,23 @@ def reservas_unidades(request):
 
     print("SOQL final:", soql)  # 🪶 debug opcional
 
-    recs = sf.query_all(soql).get("records", [])
-
-    STATUS_TRADUZIDO = {
-        "Pending": "Pendente",
-        "Confirmed": "Confirmada",
-        "Cancelled": "Cancelada",
-        "Completed": "Concluída",
-        "Rejected": "Recusada",
-        "In Progress": "Em andamento",
-        "Draft": "Rascunho",
-    }
-    # 🔹 Formata datas legíveis
-    for r in recs:
-        r.pop("attributes", None)
-        #for field in ["reda__Start_Datetime__c", "reda__End_Datetime__c"]:
-        status = r.get("reda__Status__c")
-        r["Status_PT"] = STATUS_TRADUZIDO.get(status, status)
-    # 🕒 Converte strings ISO → datetime
-        r["reda__Start_Datetime__c"] = parse_salesforce_datetime(r.get("reda__Start_Datetime__c"))
-        r["reda__End_Datetime__c"] = parse_salesforce_datetime(r.get("reda__End_Datetime__c"))
-
-    # 🔹 Paginação (20 por página)
-    paginator = Paginator(recs, 20)
-    page = request.GET.get("page")
+    # 🔹 Paginação no Salesforce (20 por página, cursores na sessão); datas já vêm em UTC aware
     try:
-        reservas_lista = paginator.page(page)
-    except PageNotAnInteger:
-        reservas_lista = paginator.page(1)
-    except EmptyPage:
-        reservas_lista = paginator.page(paginator.num_pages)
+        paginator = SFPaginator(request, soql, 20, escopo=request.escopo.ids, transformar=ReservaSF.de_registro)
+        reservas_lista = paginator.get_page(request.GET.get("page"))
+    except (ServicoIndisponivel, requests.RequestException) as e:
+        # Reservas só existem no Salesforce: mostra a tela vazia sem travar o worker
+        print(f"⚠️ Salesforce indisponível em reservas_unidades: {e}")
+        messages.warning(request, "Salesforce indisponível no momento: não foi possível carregar as reservas.")
+        paginator = Paginator([], 20)
+        reservas_lista = paginator.get_page(1)
 
     ctx = {
         "reservas": reservas_lista,
         "unidade_pk": unidade_param,
         "unidades": Unidade.objects.filter(bloco__condominio_id=condominio_pk) if condominio_pk else [],
         "condominios": allowed,
-        "total": len(recs),
+        "total": paginator.count,
         "condominio_pk": condominio_pk,
         "data_inicio": data_inicio,
         "data_fim": data_fim,
@@ -1333,57 +961,22 @@ def ajax_responsaveis(request, unidade_id):
         options.append(f'<option value="{m.id}">{m.nome}</option>')
     return HttpResponse("\n".join(options))
 
-def parse_salesforce_datetime(dt_str):
-    """Converte '2025-10-15T12:00:00.000+0000' → '15/10/2025 - 12:00'"""
-    if not dt_str:
-        return ""
-    try:
-        dt = datetime.strptime(dt_str.split('.')[0], "%Y-%m-%dT%H:%M:%S")
-        return dt.strftime("%d/%m/%Y - %H:%M")
-    except Exception:
-        return dt_str
-    
-from datetime import datetime
-from django.utils import timezone
-
-def parse_salesforce_datetime_utc(dt_str):
-    """Converte string do Salesforce (ex: 2025-10-31T15:00:00.000+0000) em datetime com timezone UTC"""
-    if not dt_str:
-        return None
-    try:
-        # Salesforce envia timezone como +0000 → converte para +00:00
-        if dt_str.endswith('+0000'):
-            dt_str = dt_str[:-5] + '+00:00'
-
-        # Remove milissegundos, se existirem
-        if '.' in dt_str:
-            partes = dt_str.split('.')
-            if len(partes) > 1:
-                dt_str = partes[0] + dt_str[-6:]
-
-        # Converte para datetime
-        dt = datetime.fromisoformat(dt_str)
-        if timezone.is_naive(dt):
-            dt = timezone.make_aware(dt, timezone=timezone.utc)
-            dt = dt + timedelta(hours=3, minutes=30)
-        return dt
-    except Exception as e:
-        print(f"⚠️ Erro ao converter datetime Salesforce: {e} (entrada: {dt_str})")
-        return None
-
 
 def get_all_fields(request):
     """Função utilitária para pegar todos os campos de um objeto Salesforce"""
-    sf = sf_connect()
     object_name = "redafe__Folder__c"
     limit = 2000
-    metadata = sf.restful(f"sobjects/{object_name}/describe")
-    fields = [f["name"] for f in metadata["fields"]]
+    try:
+        sf = sf_connect()
+        fields = [f["name"] for f in describe_fields(sf, object_name)]
 
-    soql = f"SELECT {', '.join(fields)} FROM {object_name} LIMIT {limit}"
-    print(f"Executando SOQL:\n{soql}\n")
+        soql = f"SELECT {', '.join(fields)} FROM {object_name} LIMIT {limit}"
+        print(f"Executando SOQL:\n{soql}\n")
 
-    records = sf.query_all(soql)["records"]
+        # Consulta pesada e de baixa prioridade: sai do cache sempre que possível
+        records = query_all_cached(soql, sf=sf, ttl=60 * 60)["records"]
+    except ServicoIndisponivel as e:
+        return JsonResponse({"erro": str(e)}, status=503)
 
     for r in records:
         r.pop("attributes", None)
@@ -1398,43 +991,6 @@ def get_property_id(r):
         return r["reda__Opportunity__r"]["reda__Region__r"]["Id"]
     except (KeyError, TypeError):
         return None
-    
-def anexar_arquivo_salesforce(file_path, opportunity_id, titulo="Anexo"):
-    """Envia um arquivo local para a Opportunity no Salesforce."""
-    sf = sf_connect()
-    if not os.path.exists(file_path):
-        print(f"⚠️ Arquivo não encontrado: {file_path}")
-        return None
-
-    with open(file_path, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode("utf-8")
-
-    # Cria ContentVersion
-    filename = os.path.basename(file_path)
-    content_data = {
-        "Title": titulo,
-        "PathOnClient": filename,
-        "VersionData": encoded,
-    }
-
-    response = sf.ContentVersion.create(content_data)
-    content_version_id = response.get("id")
-    print(f"✅ ContentVersion criado: {content_version_id}")
-
-    # Obtém o ContentDocumentId
-    query = f"SELECT ContentDocumentId FROM ContentVersion WHERE Id = '{content_version_id}'"
-    result = sf.query(query)
-    content_doc_id = result["records"][0]["ContentDocumentId"]
-
-    # Faz o vínculo com a Opportunity
-    link_data = {
-        "ContentDocumentId": content_doc_id,
-        "LinkedEntityId": opportunity_id,
-        "ShareType": "V",
-        "Visibility": "AllUsers",
-    }
-    sf.ContentDocumentLink.create(link_data)
-    print(f"🔗 Arquivo {filename} vinculado à Opportunity {opportunity_id}")
 
 
 @login_required
@@ -1466,121 +1022,103 @@ def ajax_unidades_por_bloco(request, bloco_id):
     html = "".join([f"<option value='{u.id}'>{u.numero}</option>" for u in unidades])
     return HttpResponse(html)
 
-from rest_framework import viewsets, permissions
-from condominio.models import Bloco
-from condominio.serializers import BlocoSerializer
-
-class BlocoViewSet(viewsets.ModelViewSet):
-    queryset = Bloco.objects.all()
-    serializer_class = BlocoSerializer
-    permission_classes = [permissions.AllowAny]  # ajuste conforme sua necessidade
-
-
-import base64
 import json
 from django.http import JsonResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from simple_salesforce import SalesforceMalformedRequest
+from django.views.decorators.http import require_GET
+from integrations.boletos import enfileirar_boleto, token_status, token_status_valido
+from portaria.models import BoletoRecebido
+import uuid
+
+
+def _status_url(request, nome, chave):
+    return request.build_absolute_uri(f"{reverse(nome, args=[chave])}?token={token_status(chave)}")
+
+
+def _pode_ver_status(request, chave):
+    """Token assinado do status_url (quem enviou) ou usuário da equipe logado."""
+    return token_status_valido(request.GET.get("token"), chave) or request.user.is_staff
+
 
 @csrf_exempt
 def webhook_boleto_reda(request):
     """
-    Webhook que recebe um boleto e o grava na pasta 'Cubatão/Boletos'
-    dentro da biblioteca REDA, vinculando ao Account encontrado.
+    Webhook que recebe um boleto para a pasta 'Cubatão/Boletos' da biblioteca
+    REDA. O arquivo é gravado em disco e o envio ao Salesforce fica com o
+    Celery; a resposta (202) traz o job_id para consulta do status.
     """
     if request.method != "POST":
         return JsonResponse({"error": "Método não permitido"}, status=405)
 
-    try:
-        documento = request.POST.get("documento")
-        boleto_file = request.FILES.get("boleto")
+    documento = request.POST.get("documento")
+    boleto_file = request.FILES.get("boleto")
 
-        if not documento or not boleto_file:
-            return JsonResponse({"error": "Campos obrigatórios: documento e boleto"}, status=400)
+    if not documento or not boleto_file:
+        return JsonResponse({"error": "Campos obrigatórios: documento e boleto"}, status=400)
 
-        sf = sf_connect()
+    with transaction.atomic():
+        boleto = enfileirar_boleto(documento, boleto_file)
+
+    return JsonResponse({
+        "job_id": str(boleto.pk),
+        "status": boleto.status,
+        "status_url": _status_url(request, "boleto_status", boleto.pk),
+    }, status=202)
 
-        # 🔹 Normaliza documento (CPF/CNPJ)
-        doc_clean = (
-            documento.strip()
-            .replace(".", "")
-            .replace("-", "")
-            .replace("/", "")
-            .replace(" ", "")
-        )
 
-        # 🔹 Busca o Account
-        soql = f"""
-            SELECT Id, Name
-            FROM Account
-            WHERE DocumentoTxt__c = '{doc_clean}'
-            LIMIT 1
-        """
-        acc = sf.query(soql)
-        if not acc["records"]:
-            return JsonResponse({"error": f"Nenhum Account encontrado para {documento}"}, status=404)
-
-        account_id = acc["records"][0]["Id"]
-        account_name = acc["records"][0]["Name"]
-
-        # 🔹 Busca pasta "Boletos"
-        account_id = "001Np00001V9FQUIA3"
-        folder = sf.query("SELECT Id FROM redafe__Folder__c WHERE redafe__File_Folder_Label__c = 'Boletos' and redafe__Account__c = '001Np00001V9FQUIA3' and redafe__Parent_Folder__c = 'a1mNp0000011y9dIAA' LIMIT 1")
-        #print(f"Folder: {folder}")
-        if not folder["records"]:
-            return JsonResponse({"error": "Pasta 'Boletos' não encontrada no REDA"}, status=404)
-        boletos_folder_id = folder["records"][0]["Id"]
-
-        # 🔹 Lê o arquivo e converte para base64
-        boleto_base64 = base64.b64encode(boleto_file.read()).decode("utf-8")
-        boleto_nome = boleto_file.name
-
-        # 🔹 Cria ContentVersion (upload físico do boleto)
-        content = sf.ContentVersion.create({
-            "Title": boleto_nome.replace(".pdf", ""),
-            "PathOnClient": boleto_nome,
-            "VersionData": boleto_base64,
-            "FirstPublishLocationId": boletos_folder_id,  # publica direto na pasta 'Boletos'
-            "redafe__Template_Folder_Id__c": 'a1mNp0000011y4nIAA' #boletos_folder_id,  # campo customizado REDA
-            #"redafe__Parent_Folder__c": "a1mNp0000011y9dIAA"
-        })
-        content_version_id = content["id"]
-        
-        print(f"ContentVersion criado: {content_version_id}")
-
-        # 🔹 Busca ContentDocumentId
-        query_doc = sf.query(
-            f"SELECT ContentDocumentId FROM ContentVersion WHERE Id = '{content_version_id}'"
+@csrf_exempt
+def webhook_boleto_reda_lote(request):
+    """
+    Recebe vários boletos de uma vez: campos 'documento' e 'boleto' repetidos,
+    na mesma ordem. Responde 202 com o lote e um job por boleto.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Método não permitido"}, status=405)
+
+    documentos = request.POST.getlist("documento")
+    arquivos = request.FILES.getlist("boleto")
+
+    if not documentos or len(documentos) != len(arquivos):
+        return JsonResponse(
+            {"error": "Envie a mesma quantidade de campos 'documento' e 'boleto'"}, status=400
         )
-        content_doc_id = query_doc["records"][0]["ContentDocumentId"]
-        #print(f"ContentDocumentId obtido: {content_doc_id}")
 
-        # 🔹 Move o arquivo para a pasta 'Boletos'
-        try:
-            sf.ContentFolderItem.create({
-                "ContentDocumentId": content_doc_id,
-                "ParentContentFolderId": boletos_folder_id
-            })
-        except SalesforceMalformedRequest as e:
-            print(f"Aviso: não foi possível mover para a pasta Boletos ({e.content})")
-
-        # 🔹 Vincula o arquivo ao Account
-        sf.ContentDocumentLink.create({
-            "ContentDocumentId": content_doc_id,
-            "LinkedEntityId": account_id,
-            "ShareType": "V",
-            "Visibility": "AllUsers",
-        })
-
-        return JsonResponse({
-            "success": True,
-            "message": f"Boleto '{boleto_nome}' gravado com sucesso na pasta {boletos_folder_id} 'Cubatão/Boletos' e vinculado ao Account '{account_name}'.",
-            "account_id": account_id,
-            "boletos_folder_id": boletos_folder_id,
-            "content_document_id": content_doc_id,
-        })
-
-    except SalesforceMalformedRequest as e:
-        return JsonResponse({"error": e.content}, status=400)
-    except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+    lote = uuid.uuid4()
+    with transaction.atomic():
+        boletos = [enfileirar_boleto(doc, arq, lote=lote) for doc, arq in zip(documentos, arquivos)]
+
+    return JsonResponse({
+        "lote": str(lote),
+        "status_url": _status_url(request, "boleto_lote_status", lote),
+        "jobs": [
+            {"job_id": str(b.pk), "nome_arquivo": b.nome_arquivo, "status": b.status}
+            for b in boletos
+        ],
+    }, status=202)
+
+
+@require_GET
+def boleto_status(request, job_id):
+    if not _pode_ver_status(request, job_id):
+        return JsonResponse({"error": "Não autorizado"}, status=403)
+    boleto = get_object_or_404(BoletoRecebido, pk=job_id)
+    return JsonResponse(boleto.como_dict())
+
+
+@require_GET
+def boleto_lote_status(request, lote):
+    if not _pode_ver_status(request, lote):
+        return JsonResponse({"error": "Não autorizado"}, status=403)
+    boletos = list(BoletoRecebido.objects.filter(lote=lote).order_by("criado_em"))
+    if not boletos:
+        return JsonResponse({"error": "Lote não encontrado"}, status=404)
+    resumo = {}
+    for b in boletos:
+        resumo[b.status] = resumo.get(b.status, 0) + 1
+    return JsonResponse({
+        "lote": str(lote),
+        "total": len(boletos),
+        "resumo": resumo,
+        "jobs": [b.como_dict() for b in boletos],
+    })